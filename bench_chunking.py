@@ -0,0 +1,140 @@
+import os
+import math
+import random
+import logging
+import argparse
+import tempfile
+from langchain_community.document_loaders import TextLoader
+from langchain_text_splitters import CharacterTextSplitter
+from hybrid_search import BM25Index
+from ingest_pipeline import DEFAULT_BATCH_SIZE
+from manual_splitter import ManualSplitter, estimate_tokens
+
+# Report: CharacterTextSplitter(500, 0) (the old day21_ingest.py splitter) vs ManualSplitter
+# on the SAME corpus. Synthetic manuals come with known answers (spec values, whole
+# spec tables, install procedures), so we can measure how many retrieved chunks/tokens
+# it takes before the full answer is in the context.
+#   chunks / embed calls   : ingest cost
+#   k / tokens per answer  : smallest top-k that contains every fact of the answer
+# Retrieval is BM25 by default (no API key); --embed uses Gemini embeddings instead.
+
+MAX_K = 20
+
+VENDORS = ["Cisco Catalyst", "Juniper EX", "Arista DCS", "HPE Aruba", "Dell PowerEdge", "Ubiquiti USW"]
+PARAMS = ["Input voltage", "Max power draw", "Idle power", "PSU rating", "Fan count", "Airflow",
+          "Operating temp", "Humidity", "Weight", "Height", "Depth", "Ports", "Uplinks",
+          "Switching capacity", "Forwarding rate", "MAC table", "VLANs", "Jumbo frame",
+          "Flash", "DRAM", "MTBF", "Noise", "PoE budget", "Console port"]
+FILLER = ["firmware", "rack", "airflow", "chassis", "module", "uplink", "cable", "panel",
+          "controller", "redundant", "management", "interface", "thermal", "stack", "bracket"]
+
+def sentence(rng):
+    words = [rng.choice(FILLER) for _ in range(rng.randint(8, 16))]
+    return "The " + " ".join(words) + "."
+
+def make_corpus(path, files, seed=7):
+    """Write synthetic manuals and return [(source, question, [facts])]"""
+    rng = random.Random(seed)
+    questions = []
+    for n in range(files):
+        device = f"{rng.choice(VENDORS)} {rng.randint(1000, 9999)}"
+        source = f"manual_{n:04d}.txt"
+        params = rng.sample(PARAMS, rng.randint(12, len(PARAMS)))
+        values = {p: f"{rng.randint(10, 9999)}-{rng.choice('ABCDEFGH')}{n}" for p in params}
+        steps = [f"{i}. {sentence(rng)[4:].capitalize()} Torque to {rng.randint(2, 9)} Nm."
+                 for i in range(1, rng.randint(6, 12))]
+
+        lines = [f"{device} Hardware Manual", ""]
+        lines += ["1. Overview"] + [" ".join(sentence(rng) for _ in range(rng.randint(3, 7)))
+                                    for _ in range(rng.randint(1, 3))] + [""]
+        lines += ["2. Specifications", "| Parameter | Value |"]
+        lines += [f"| {p} | {values[p]} |" for p in params] + [""]
+        lines += ["3. Installation"] + steps + [""]
+        lines += ["4. Troubleshooting"] + [f"- {sentence(rng)}" for _ in range(rng.randint(4, 8))]
+        with open(os.path.join(path, source), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        for p in rng.sample(params, 3):
+            questions.append((source, f"What is the {p} of the {device}?", [values[p]]))
+        power = [values[p] for p in params if p in ("Input voltage", "Max power draw", "Idle power", "PSU rating")]
+        if power:
+            questions.append((source, f"List the power specifications of the {device}", power))
+        questions.append((source, f"How do I install the {device}?",
+                          [s.split(". ", 1)[1][:30] for s in steps]))
+    return questions
+
+def split_corpus(splitter, data_path):
+    chunks = []
+    for name in sorted(os.listdir(data_path)):
+        docs = TextLoader(os.path.join(data_path, name)).load()
+        for i, chunk in enumerate(splitter.split_documents(docs)):
+            chunk.metadata["source"] = name
+            chunk.id = f"{name}::{i}"
+            chunks.append(chunk)
+    return chunks
+
+def make_ranker(chunks, embeddings=None):
+    """query -> [chunk positions] best first"""
+    if embeddings is None:
+        bm25 = BM25Index()
+        for i, chunk in enumerate(chunks):
+            bm25.add(i, chunk.page_content)
+        return lambda q: [i for i, _ in bm25.search(q, MAX_K)]
+    from vector_index import VectorIndex
+    from embedding_cache import embed_queries
+    vectors = embeddings.embed_documents([c.page_content for c in chunks])
+    index = VectorIndex(dim=len(vectors[0]), capacity=len(vectors))
+    index.add(vectors)
+    return lambda q: list(index.search(embed_queries(embeddings, [q]), MAX_K)[0][0])
+
+def evaluate(chunks, questions, ranker):
+    ks, tokens, answered = [], [], 0
+    for source, question, facts in questions:
+        ranked = ranker(question)
+        found_k = None
+        for k in range(1, len(ranked) + 1):
+            context = [chunks[i] for i in ranked[:k] if chunks[i].metadata["source"] == source]
+            text = "\n".join(c.page_content for c in context)
+            if all(f in text for f in facts):
+                found_k = k
+                break
+        k = found_k or min(MAX_K, len(ranked))
+        answered += found_k is not None
+        ks.append(k)
+        tokens.append(sum(estimate_tokens(chunks[i].page_content) for i in ranked[:k]))
+    return {"k": sum(ks) / len(ks), "tokens": sum(tokens) / len(tokens), "answered": answered / len(questions)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the character splitter with ManualSplitter")
+    parser.add_argument("--files", type=int, default=200, help="Synthetic manuals to generate")
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--embed", action="store_true", help="Rank with Gemini embeddings instead of BM25")
+    args = parser.parse_args()
+    # The character splitter warns on every oversized block
+    logging.getLogger("langchain_text_splitters.base").setLevel(logging.ERROR)
+
+    data_path = tempfile.mkdtemp()
+    questions = make_corpus(data_path, args.files)
+    embeddings = None
+    if args.embed:
+        from dotenv import load_dotenv
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from embedding_cache import CachedEmbeddings
+        load_dotenv()
+        embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004"))
+
+    splitters = {
+        "character-500": CharacterTextSplitter(chunk_size=500, chunk_overlap=0),
+        f"manual-{args.max_tokens}t": ManualSplitter(max_tokens=args.max_tokens),
+    }
+    print(f"--- {args.files} manuals, {len(questions)} questions, ranking: "
+          f"{'Gemini embeddings' if args.embed else 'BM25'} ---")
+    print(f"{'splitter':>14} | {'chunks':>6} | {'embed calls':>11} | {'tok/chunk':>9} | {'max tok':>7} | "
+          f"{'k/answer':>8} | {'tokens/answer':>13} | answered")
+    for name, splitter in splitters.items():
+        chunks = split_corpus(splitter, data_path)
+        sizes = [estimate_tokens(c.page_content) for c in chunks]
+        r = evaluate(chunks, questions, make_ranker(chunks, embeddings))
+        calls = math.ceil(len(chunks) / DEFAULT_BATCH_SIZE)
+        print(f"{name:>14} | {len(chunks):>6} | {calls:>11} | {sum(sizes) / len(sizes):>9.0f} | {max(sizes):>7} | "
+              f"{r['k']:>8.2f} | {r['tokens']:>13.0f} | {r['answered']:.0%}")
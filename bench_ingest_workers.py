@@ -0,0 +1,61 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from day21_ingest import iter_file_diffs
+
+# Benchmark: load + split stage of day21_ingest.py with 1..N worker processes.
+# Uses a synthetic corpus, so no API key is needed (nothing is embedded).
+
+def make_corpus(path, files, sections):
+    """Write fake manuals: headed sections of filler text, split by blank lines"""
+    words = ["rack", "port", "switch", "voltage", "firmware", "fan", "PSU", "RJ45", "GPIO", "uplink"]
+    rng = random.Random(42)
+    for i in range(files):
+        with open(os.path.join(path, f"manual_{i:05d}.txt"), "w", encoding="utf-8") as f:
+            for s in range(sections):
+                body = " ".join(rng.choice(words) for _ in range(rng.randint(10, 60)))
+                f.write(f"Section {s}\n{body}\n\n")
+
+def run_stage(rel_paths, data_path, workers):
+    """Drain the load/split stage and return (seconds, [(chunk_id, text), ...])"""
+    start = time.perf_counter()
+    chunks = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _, upserts, _, _ in iter_file_diffs(rel_paths, {}, data_path, pool, workers):
+                chunks.extend((chunk_id, doc.page_content) for chunk_id, doc in upserts)
+    else:
+        for _, upserts, _, _ in iter_file_diffs(rel_paths, {}, data_path):
+            chunks.extend((chunk_id, doc.page_content) for chunk_id, doc in upserts)
+    return time.perf_counter() - start, chunks
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load/split scaling benchmark")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--sections", type=int, default=60)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    data_path = tempfile.mkdtemp()
+    print(f"--- BUILDING CORPUS: {args.files} files in {data_path} ---")
+    make_corpus(data_path, args.files, args.sections)
+    rel_paths = sorted(os.listdir(data_path))
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    baseline_time, baseline_chunks = None, None
+    print(f"{'workers':>8} | {'seconds':>8} | {'speedup':>8} | same output")
+    for workers in worker_counts:
+        seconds, chunks = run_stage(rel_paths, data_path, workers)
+        if baseline_time is None:
+            baseline_time, baseline_chunks = seconds, chunks
+        same = "yes" if chunks == baseline_chunks else "NO"
+        print(f"{workers:>8} | {seconds:>8.2f} | {baseline_time / seconds:>7.2f}x | {same}")
+    print(f"({len(baseline_chunks)} chunks)")
@@ -0,0 +1,116 @@
+import time
+import argparse
+import tempfile
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from vector_index import VectorIndex, normalize, top_k
+from metadata_index import MetadataIndex, prefiltered_search, EXACT_THRESHOLD
+
+# Benchmark: filtered top-k at filter selectivity from 0.1% to 50%.
+#   post-filter : search the top k * oversample, THEN drop non-matching rows (what HNSW-then-filter does)
+#   bitmap      : resolve the filter to rows first, then exact scoring (subset or masked scan)
+# "hits" = how many of the k requested results came back; "recall" = overlap with exact filtered top-k.
+# Second table: prefiltered_search() on a real Chroma collection, through both of its paths
+#   exact  : <= EXACT_THRESHOLD candidates, their vectors fetched by ID and scored exactly
+#   chroma : more candidates, Chroma's HNSW search with the where= filter
+
+SELECTIVITIES = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5]
+
+class LookupEmbeddings(Embeddings):
+    """Query "q<i>" -> the i-th benchmark query vector (no model involved)"""
+
+    def __init__(self, queries):
+        self.queries = queries
+
+    def embed_query(self, text):
+        return self.queries[int(text[1:])].tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+def bench_prefiltered(vectors, draws, queries, k):
+    from langchain_chroma import Chroma
+
+    n = len(vectors)
+    db = Chroma(collection_name="bench_prefilter", embedding_function=LookupEmbeddings(queries),
+                persist_directory=tempfile.mkdtemp(), collection_metadata={"hnsw:space": "cosine"})
+    metadatas = [{f"s{s}": bool(draws[i] < s) for s in SELECTIVITIES} for i in range(n)]
+    start = time.perf_counter()
+    for lo in range(0, n, 5000):
+        db._collection.add(ids=[str(i) for i in range(lo, min(n, lo + 5000))],
+                           embeddings=vectors[lo:lo + 5000].tolist(), metadatas=metadatas[lo:lo + 5000],
+                           documents=[f"doc {i}" for i in range(lo, min(n, lo + 5000))])
+    meta = MetadataIndex.from_collection(db)
+    print(f"\n--- prefiltered_search on Chroma: {n} vectors (built in {time.perf_counter() - start:.1f}s), "
+          f"exact path up to {EXACT_THRESHOLD} candidates ---")
+    print(f"{'selectivity':>11} | {'rows':>7} | {'path':>6} | {'ms':>8} | {'hits':>6} | recall")
+    for s in SELECTIVITIES:
+        where = {f"s{s}": True}
+        mask = meta.mask(where)
+        truth, _ = top_k(normalize(queries) @ vectors[mask].T, k)
+        truth = [{str(i) for i in np.flatnonzero(mask)[row]} for row in truth]
+
+        start = time.perf_counter()
+        found = [[doc.id for doc in prefiltered_search(db, meta, f"q{i}", k, where)] for i in range(len(queries))]
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(set(f) & t) / len(t) for f, t in zip(found, truth)])
+        path = "exact" if mask.sum() <= EXACT_THRESHOLD else "chroma"
+        print(f"{s * 100:>10.1f}% | {int(mask.sum()):>7} | {path:>6} | {ms:>8.2f} | "
+              f"{np.mean([len(f) for f in found]):>6.1f} | {recall:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Metadata pre-filter benchmark")
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversample", type=int, default=10)
+    parser.add_argument("--chroma-vectors", type=int, default=20_000,
+                        help="Rows for the prefiltered_search() table (0 = skip it)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = normalize(rng.standard_normal((args.vectors, args.dim), dtype=np.float32))
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    index = VectorIndex(dim=args.dim, capacity=args.vectors)
+    index.add(vectors, ids=[str(i) for i in range(args.vectors)])
+
+    # One boolean field per selectivity: {"s0.01": True} on ~1% of rows, etc.
+    draws = rng.random(args.vectors)
+    meta = MetadataIndex(capacity=args.vectors)
+    for i in range(args.vectors):
+        meta.add(str(i), {f"s{s}": bool(draws[i] < s) for s in SELECTIVITIES})
+
+    print(f"--- {args.vectors} vectors x {args.dim} dims, k={args.k} ---")
+    print(f"{'selectivity':>11} | {'rows':>7} | {'post ms':>8} | {'post hits':>9} | "
+          f"{'bitmap ms':>9} | {'bitmap hits':>11} | recall")
+    for s in SELECTIVITIES:
+        where = {f"s{s}": True}
+        mask = meta.mask(where)
+        truth, _ = top_k(normalize(queries) @ vectors[mask].T, args.k)
+        truth = [set(np.flatnonzero(mask)[row]) for row in truth]
+
+        start = time.perf_counter()
+        post_hits = []
+        for q in queries:
+            p, _ = index.search([q], args.k * args.oversample)
+            post_hits.append([x for x in p[0] if mask[x]][:args.k])
+        post_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+        start = time.perf_counter()
+        bitmap_hits = []
+        for q in queries:
+            p, _ = index.search([q], args.k, mask=meta.mask(where))
+            bitmap_hits.append(list(p[0]))
+        bitmap_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+        post_n = np.mean([len(h) for h in post_hits])
+        bitmap_n = np.mean([len(h) for h in bitmap_hits])
+        recall = np.mean([len(set(h) & t) / len(t) for h, t in zip(bitmap_hits, truth)])
+        print(f"{s * 100:>10.1f}% | {int(mask.sum()):>7} | {post_ms:>8.2f} | {post_n:>9.1f} | "
+              f"{bitmap_ms:>9.2f} | {bitmap_n:>11.1f} | {recall:.2f}")
+
+    if args.chroma_vectors:
+        n = min(args.chroma_vectors, args.vectors)
+        bench_prefiltered(vectors[:n], draws[:n], queries, args.k)
@@ -0,0 +1,50 @@
+import os
+import time
+import argparse
+import statistics
+from streamlit.testing.v1 import AppTest
+from resources import registry
+
+# Benchmark: Streamlit rerun latency of the OpsVision apps (what every widget click costs).
+#   before : registry cleared before each rerun, i.e. clients, Chroma and caches rebuilt on
+#            every click -- what the apps did when they built them at module top level
+#   after  : the shared registry as shipped; a rerun only re-renders the UI
+# Runs offline: nothing here calls the API, so a placeholder key is enough.
+
+APPS = ["day22_app.py", "day23_opsvision.py"]
+
+def time_reruns(app, reruns, clear_between):
+    at = AppTest.from_file(app, default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{app}: {at.exception[0].message}")
+    times = []
+    for _ in range(reruns):
+        if clear_between:
+            registry.clear()
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    return cold, times
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streamlit rerun latency, before/after the resource registry")
+    parser.add_argument("--apps", nargs="+", default=APPS)
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+    os.environ.setdefault("GOOGLE_API_KEY", "bench-placeholder")
+
+    print(f"--- {args.reruns} reruns per app ---")
+    print(f"{'app':<20} | {'mode':<6} | {'cold ms':>8} | {'rerun p50 ms':>12} | {'rerun p95 ms':>12}")
+    for app in args.apps:
+        for mode in ("before", "after"):
+            registry.clear()
+            cold, times = time_reruns(app, args.reruns, clear_between=mode == "before")
+            p95 = sorted(times)[int(0.95 * (len(times) - 1))]
+            print(f"{app:<20} | {mode:<6} | {cold * 1000:>8.0f} | {statistics.median(times) * 1000:>12.1f} | "
+                  f"{p95 * 1000:>12.1f}")
+    print("--- registry ---")
+    for row in registry.health():
+        print(row)
@@ -0,0 +1,46 @@
+import time
+import argparse
+import numpy as np
+from vector_index import VectorIndex
+
+# Benchmark: day6_embeddings.py's per-document cosine loop vs VectorIndex.
+# Random vectors stand in for real embeddings (768 dims = text-embedding-004).
+# Note: 1M x 768 float32 is ~3 GB of RAM; use --dim or --sizes to scale down.
+
+def cosine_similarity(a, b):
+    # Same as day6_embeddings.py
+    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+
+def loop_search(query, doc_vectors, k):
+    scores = [cosine_similarity(query, doc_vec) for doc_vec in doc_vectors]
+    return np.argsort(scores)[::-1][:k]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-pair loop vs vectorised top-k")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--loop-queries", type=int, default=3, help="The loop is slow; time fewer queries")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print(f"{'vectors':>10} | {'loop ms/query':>14} | {'index ms/query':>15} | {'speedup':>8} | same top-k")
+    for n in args.sizes:
+        docs = rng.standard_normal((n, args.dim), dtype=np.float32)
+
+        start = time.perf_counter()
+        loop_results = [loop_search(q, docs, args.k) for q in queries[:args.loop_queries]]
+        loop_ms = (time.perf_counter() - start) * 1000 / args.loop_queries
+
+        index = VectorIndex(dim=args.dim, capacity=n)
+        index.add(docs)
+        del docs
+        start = time.perf_counter()
+        positions, _ = index.search(queries, args.k)
+        index_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+        same = all((positions[i] == loop_results[i]).all() for i in range(args.loop_queries))
+        print(f"{n:>10} | {loop_ms:>14.2f} | {index_ms:>15.3f} | {loop_ms / index_ms:>7.0f}x | {'yes' if same else 'NO'}")
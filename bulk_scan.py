@@ -0,0 +1,184 @@
+import os
+import time
+import argparse
+import mimetypes
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from scan_pipeline import scan, parse_items
+
+# Bulk scanning for data hall audits: hundreds of photos -> one inventory.
+# Each image goes through scan_pipeline.scan() (vision + per-item lookups) on a
+# worker pool. A shared rate limiter caps vision calls per minute across all workers,
+# so a big batch doesn't trip Gemini's quota (images answered from a cache don't count). Results are yielded as each image
+# finishes, so the UI / log fills in progressively.
+#
+# Headless:  python bulk_scan.py ./photos --out inventory.parquet --workers 4 --rate 60
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_PER_MINUTE = 60
+COLUMNS = ["Timestamp", "Image", "Item Detected", "Status", "Manual Source", "Manual Excerpt"]
+
+class RateLimiter:
+    """Thread-safe: at most `per_minute` acquire() calls per rolling minute, evenly spaced"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+class ImageSource:
+    """A local file or a Streamlit UploadedFile, read the same way (and only when scanned)"""
+
+    def __init__(self, name, data=None, mime_type=None, path=None, upload=None):
+        self.name = name
+        self.path = path
+        self._data = data
+        self._upload = upload
+        self.mime_type = mime_type or mimetypes.guess_type(name)[0] or "image/jpeg"
+
+    @classmethod
+    def from_upload(cls, uploaded_file):
+        # No copy here: the apps build sources on every rerun, the bytes are only needed by a scan
+        return cls(uploaded_file.name, mime_type=uploaded_file.type, upload=uploaded_file)
+
+    def read(self):
+        if self._data is not None:
+            return self._data
+        if self._upload is not None:
+            return self._upload.getvalue()
+        with open(self.path, "rb") as f:
+            return f.read()
+
+def find_images(paths):
+    """Files and directories (searched recursively) -> ImageSource list, sorted by path"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.extend(os.path.join(root, n) for n in names if n.lower().endswith(IMAGE_EXTENSIONS))
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            found.append(path)
+    return [ImageSource(os.path.relpath(p), path=p) for p in sorted(set(found))]
+
+def scan_records(image, result, timestamp=None):
+    """One inventory row per detected item"""
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+    for item, docs, status in zip(result["items"], result["matches"], result["status"]):
+        doc = docs[0] if status == "ok" and docs else None
+        rows.append({
+            "Timestamp": timestamp,
+            "Image": image.name,
+            "Item Detected": item,
+            "Status": status if status != "ok" or doc else "no match",
+            "Manual Source": doc.metadata.get("source", "") if doc else "",
+            "Manual Excerpt": doc.page_content[:100] + "..." if doc else "",
+        })
+    return rows
+
+def scan_many(images, analyze, lookup, prepare=None, workers=DEFAULT_WORKERS,
+              rate_per_minute=DEFAULT_RATE_PER_MINUTE, cached=None, **scan_options):
+    """
+    analyze(data, mime_type) -> "Item, Item, Item"   (the vision call)
+    cached(data) -> "Item, ..." or None              (optional: a result that needs no vision call)
+    lookup / prepare / scan_options: as in scan_pipeline.scan()
+    Yields (image, rows, error) in completion order. error is None or the exception text.
+    """
+    limiter = RateLimiter(rate_per_minute)
+
+    def scan_one(image):
+        data = image.read()
+        text = cached(data) if cached is not None else None
+        if text is None:
+            # Wait for a slot HERE, before scan(): its vision_timeout should only time the
+            # model call, not the queue. Cache hits never take a slot.
+            limiter.acquire()
+            detect = lambda _: parse_items(analyze(data, image.mime_type))
+        else:
+            detect = lambda _: parse_items(text)
+        return scan(image, detect, lookup, prepare=prepare, **scan_options)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(scan_one, image): image for image in images}
+        for future in as_completed(futures):
+            image = futures[future]
+            try:
+                yield image, scan_records(image, future.result()), None
+            except Exception as e:
+                error = "vision timeout" if isinstance(e, TimeoutError) else str(e) or type(e).__name__
+                yield image, [{"Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "Image": image.name,
+                               "Item Detected": "", "Status": f"error: {error}",
+                               "Manual Source": "", "Manual Excerpt": ""}], error
+
+def inventory_frame(rows):
+    return pd.DataFrame(rows, columns=COLUMNS).sort_values(["Image", "Timestamp"], kind="stable")
+
+def write_inventory(rows, path):
+    """CSV or Parquet, picked by file extension"""
+    df = inventory_frame(rows)
+    if path.lower().endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return df
+
+# --- HEADLESS CLI ---
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+    from embedding_cache import CachedEmbeddings, embed_queries
+    from image_prep import IMAGE_PRESETS
+    from llm_cache import ResponseCache
+    from opsvision_backend import DB_PATH, analyze_image_bytes, open_manuals_db, open_lexical_index, search_items
+
+    parser = argparse.ArgumentParser(description="Scan many equipment photos into one inventory")
+    parser.add_argument("paths", nargs="+", help="Image files and/or directories")
+    parser.add_argument("--out", default="opsvision_inventory.csv", help=".csv or .parquet")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Images in flight at once")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_PER_MINUTE,
+                        help="Max vision calls per minute (0 = unlimited)")
+    parser.add_argument("--max-dim", type=int, default=IMAGE_PRESETS["inventory"],
+                        help="Downscale images to this many pixels on the long side before the vision call")
+    parser.add_argument("--checkpoint", type=int, default=25,
+                        help="Rewrite the output file every N images (overnight runs survive a crash)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not os.path.exists(DB_PATH):
+        raise SystemExit("Database not found! Please run day21_ingest.py first.")
+    llm = ChatGoogleGenerativeAI(google_api_key=os.getenv("GOOGLE_API_KEY"),
+                                 model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+                                 cache=ResponseCache.sqlite())
+    embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004"))
+    db = open_manuals_db(embeddings)
+    lexical = open_lexical_index()
+
+    images = find_images(args.paths)
+    print(f"--- SCANNING {len(images)} IMAGES ({args.workers} workers, {args.rate:g}/min) ---")
+    rows, start = [], time.perf_counter()
+    for done, (image, image_rows, error) in enumerate(scan_many(
+            images,
+            analyze=lambda data, mime: analyze_image_bytes(llm, data, mime, max_dim=args.max_dim),
+            lookup=lambda item: search_items(db, [item], k=1, lexical=lexical)[0],
+            prepare=lambda items: embed_queries(embeddings, items),
+            workers=args.workers, rate_per_minute=args.rate), start=1):
+        rows.extend(image_rows)
+        detail = f"ERROR {error}" if error else ", ".join(r["Item Detected"] for r in image_rows)
+        print(f"[{done}/{len(images)}] {image.name}: {detail}")
+        if done % args.checkpoint == 0:
+            write_inventory(rows, args.out)
+
+    write_inventory(rows, args.out)
+    print(f"--- SUCCESS: {len(rows)} items from {len(images)} images in "
+          f"{time.perf_counter() - start:.1f}s -> {args.out} ---")
@@ -0,0 +1,122 @@
+import re
+import hashlib
+from langchain_core.runnables import RunnableLambda
+from manual_splitter import estimate_tokens
+
+# Context assembly between the retriever and the prompt.
+# Piping retriever output straight into {context} stringifies the whole list:
+#   [Document(id='...', metadata={...}, page_content='...'), ...]
+# so every question pays for IDs, quotes, escapes and repeated chunks.
+# assemble_context() instead
+#   1. drops duplicate / mostly-overlapping chunks (at the better-ranked position)
+#   2. renders only page content plus a few useful metadata fields
+#   3. stops at a token budget, in retriever (score) order, trimming the last chunk at a sentence
+
+DEFAULT_MAX_TOKENS = 1000
+DEFAULT_METADATA_KEYS = ("source", "section", "department", "dept", "year")
+OVERLAP_THRESHOLD = 0.8   # share of the smaller chunk's 3-word shingles found in a kept chunk
+MIN_TRIM_TOKENS = 40      # don't bother adding a trimmed chunk smaller than this
+
+WORD_RE = re.compile(r"\w+")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+def shingles(text, n=3):
+    words = WORD_RE.findall(text.lower())
+    if len(words) < n:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+def dedupe_documents(docs, threshold=OVERLAP_THRESHOLD):
+    """
+    Keep docs in rank order, dropping exact repeats and chunks mostly contained in a kept one.
+    A later chunk that mostly CONTAINS a kept one replaces it (same rank, more text).
+    """
+    kept, kept_shingles, seen = [], [], set()
+    for doc in docs:
+        digest = hashlib.sha256(" ".join(doc.page_content.split()).encode("utf-8")).hexdigest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        s = shingles(doc.page_content)
+        for i, other in enumerate(kept_shingles):
+            shared = len(s & other)
+            if shared >= threshold * len(s):
+                break
+            if shared >= threshold * len(other):
+                kept[i], kept_shingles[i] = doc, s
+                break
+        else:
+            kept.append(doc)
+            kept_shingles.append(s)
+    return kept
+
+def format_document(doc, index, metadata_keys=DEFAULT_METADATA_KEYS):
+    fields = [f"{key}: {doc.metadata[key]}" for key in metadata_keys if doc.metadata.get(key) not in (None, "")]
+    header = f"[{index}]" + (f" ({', '.join(fields)})" if fields else "")
+    return f"{header}\n{doc.page_content.strip()}"
+
+def trim_to_tokens(text, max_tokens, length_function=estimate_tokens):
+    """Longest prefix of whole sentences within max_tokens ("" if not even one fits)"""
+    out = []
+    used = 0
+    for sentence in SENTENCE_END_RE.split(text):
+        size = length_function(sentence)
+        if used + size > max_tokens:
+            break
+        out.append(sentence)
+        used += size
+    return " ".join(out)
+
+def assemble_context(docs, max_tokens=DEFAULT_MAX_TOKENS, metadata_keys=DEFAULT_METADATA_KEYS,
+                     overlap_threshold=OVERLAP_THRESHOLD, length_function=estimate_tokens):
+    """
+    Retrieved Documents (best first) -> one compact context string within max_tokens.
+    Works on (Document, score) pairs too; those are re-sorted by score, highest first.
+    """
+    docs = list(docs)
+    if docs and isinstance(docs[0], tuple):
+        docs = [doc for doc, _ in sorted(docs, key=lambda pair: pair[1], reverse=True)]
+
+    blocks, used = [], 0
+    for doc in dedupe_documents(docs, overlap_threshold):
+        block = format_document(doc, len(blocks) + 1, metadata_keys)
+        size = length_function(block)
+        if used + size <= max_tokens:
+            blocks.append(block)
+            used += size
+            continue
+        # Over budget: keep the head of this chunk if a useful amount still fits, then stop
+        remaining = max_tokens - used
+        if remaining >= MIN_TRIM_TOKENS:
+            header, body = block.split("\n", 1)
+            trimmed = trim_to_tokens(body, remaining - length_function(header), length_function)
+            if trimmed:
+                blocks.append(f"{header}\n{trimmed}")
+        break
+    return "\n\n".join(blocks)
+
+def context_budget(max_tokens=DEFAULT_MAX_TOKENS, metadata_keys=DEFAULT_METADATA_KEYS):
+    """LCEL stage: {"context": retriever | context_budget(), "question": RunnablePassthrough()}"""
+    return RunnableLambda(lambda docs: assemble_context(docs, max_tokens, metadata_keys))
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    from langchain_core.documents import Document
+
+    docs = [
+        Document(id="a1", page_content="Employees can work remotely on Fridays. Approval is automatic.",
+                 metadata={"department": "IT", "year": 2024}),
+        Document(id="a2", page_content="Employees can work remotely on Fridays. Approval is automatic.",
+                 metadata={"department": "IT", "year": 2024}),
+        Document(id="a3", page_content="Employees can work remotely on Fridays. Approval is automatic. "
+                                       "Laptops must use the VPN.", metadata={"department": "IT", "year": 2024}),
+        Document(id="b1", page_content="Remote work is strictly prohibited. " * 20,
+                 metadata={"department": "Manufacturing", "year": 2024}),
+    ]
+    raw = str(docs)   # what {context} used to receive
+    packed = assemble_context(docs, max_tokens=120)
+    print("--- RAW ---")
+    print(f"{estimate_tokens(raw)} tokens")
+    print("--- ASSEMBLED ---")
+    print(packed)
+    print(f"{estimate_tokens(packed)} tokens")
@@ -1,10 +1,11 @@
 import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_core.vectorstores import InMemoryVectorStore
+from vector_index import NumpyVectorStore
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
+from context_budget import context_budget
 
 # 1. Setup Brain & Embeddings
 load_dotenv()
@@ -23,8 +24,8 @@ Usage of 'Terminator' protocols is strictly prohibited.
 """
 
 # 3. Chunking & Indexing (The "R" in RAG)
-# We turn text into vectors and store them in RAM.
-vector_store = InMemoryVectorStore(embeddings)
+# We turn text into vectors and store them in RAM (one NumPy matrix, searched with a single multiply).
+vector_store = NumpyVectorStore(embeddings)
 vector_store.add_documents([Document(page_content=private_text)])
 retriever = vector_store.as_retriever()
 
@@ -39,8 +40,9 @@ prompt = ChatPromptTemplate.from_template(template)
 # 5. The Chain (The "G" in RAG)
 # This looks complex, but it just means:
 # "Take question -> Find related chunk -> Stuff it into prompt -> Send to LLM"
+# context_budget() dedupes the chunks and keeps only their text (not the Document repr) within a token budget
 chain = (
-    {"context": retriever, "question": RunnablePassthrough()}
+    {"context": retriever | context_budget(), "question": RunnablePassthrough()}
     | prompt
     | llm
 )
@@ -6,6 +6,7 @@ from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
+from context_budget import context_budget
 
 # 1. Setup Brain & Embeddings
 load_dotenv()
@@ -51,7 +52,7 @@ Question: {question}
 prompt = ChatPromptTemplate.from_template(template)
 
 chain = (
-    {"context": retriever, "question": RunnablePassthrough()}
+    {"context": retriever | context_budget(), "question": RunnablePassthrough()}
     | prompt
     | llm
 )
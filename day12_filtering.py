@@ -7,6 +7,8 @@ from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
+from context_budget import context_budget
+from metadata_index import MetadataIndex, PrefilteredRetriever
 
 # 1. Setup Brain
 load_dotenv()
@@ -44,11 +46,14 @@ db = Chroma.from_documents(
 # 4. The "Hybrid" Retriever
 # We want to ask about "Remote Work", but ONLY for the "IT" department.
 # If we didn't filter, the AI might see the "Strictly prohibited" rule from Manufacturing!
-retriever = db.as_retriever(
-    search_kwargs={
-        "k": 2, # Get top 2 results
-        "filter": {"department": "IT"} # <--- THE CRITICAL FILTER
-    }
+# The metadata index resolves the filter to matching IDs BEFORE vector search,
+# so a selective filter still returns k hits (same filter syntax as Chroma).
+metadata_index = MetadataIndex.from_collection(db)
+retriever = PrefilteredRetriever(
+    vectorstore=db,
+    index=metadata_index,
+    k=2, # Get top 2 results
+    filter={"department": "IT"} # <--- THE CRITICAL FILTER
 )
 
 # 5. The Chain
@@ -60,7 +65,7 @@ Question: {question}
 prompt = ChatPromptTemplate.from_template(template)
 
 chain = (
-    {"context": retriever, "question": RunnablePassthrough()}
+    {"context": retriever | context_budget(), "question": RunnablePassthrough()}
     | prompt
     | llm
 )
@@ -73,11 +78,11 @@ print(f"AI Answer: {response.content}")
 # 7. Prove the Negative
 # Let's try searching the SAME question but filtering for "Manufacturing"
 print("\n--- ASKING: 'Can I work from home?' (Filter: Manufacturing) ---")
-manu_retriever = db.as_retriever(
-    search_kwargs={"filter": {"department": "Manufacturing"}}
+manu_retriever = PrefilteredRetriever(
+    vectorstore=db, index=metadata_index, filter={"department": "Manufacturing"}
 )
 manu_chain = (
-    {"context": manu_retriever, "question": RunnablePassthrough()}
+    {"context": manu_retriever | context_budget(), "question": RunnablePassthrough()}
     | prompt
     | llm
 )
@@ -1,4 +1,5 @@
 import streamlit as st
+import logging
 import shutil
 import os
 from dotenv import load_dotenv
@@ -6,7 +7,12 @@ from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmb
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from semantic_cache import SemanticCache, fingerprint_documents, DEFAULT_THRESHOLD
+from context_budget import assemble_context
+from streaming import StreamTimer
+
+# StreamTimer logs TTFT / total time of every answer to the console (no-op if already configured)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
 
 # --- 1. CONFIGURATION ---
 st.set_page_config(page_title="Day 13: Policy Bot", layout="wide")
@@ -40,16 +46,20 @@ def setup_qa_chain(api_key):
         Document(page_content="Vacation accrual is 1.5 days per month.", metadata={"dept": "HR"})
     ]
 
+    # Stable IDs (same "source::index" scheme as day21_ingest): Chroma would otherwise make up
+    # random ones on every start, and the answer cache fingerprints include the IDs
+    for i, doc in enumerate(docs):
+        doc.id = f"policy::{i}"
+
     # Create/Reset DB in memory (or disk)
     # For a demo app, using a temp directory is cleaner
     vectorstore = Chroma.from_documents(
         documents=docs,
         embedding=embeddings,
-        collection_name="streamlit_demo"
+        collection_name="streamlit_demo",
+        ids=[doc.id for doc in docs]
     )
     
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 2})
-
     # The Prompt
     template = """Answer the question based ONLY on the context below. 
     If you don't know, say "I don't know."
@@ -61,23 +71,41 @@ def setup_qa_chain(api_key):
     """
     prompt = ChatPromptTemplate.from_template(template)
 
-    # The Chain
-    chain = (
-        {"context": retriever, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-    )
-    return chain
+    # The Chain (retrieval runs first, in the chat handler, so the answer cache can see the context)
+    chain = prompt | llm
+
+    # Fingerprint of the knowledge base: editing the docs above invalidates cached answers
+    return vectorstore, embeddings, chain, fingerprint_documents(docs)
+
+@st.cache_resource
+def setup_answer_cache(corpus_fingerprint):
+    """Semantic answer cache on disk, so answers survive Streamlit restarts"""
+    cache = SemanticCache(namespace="day13_policy_bot")
+    cache.sync_corpus(corpus_fingerprint)
+    return cache
 
 # Load the chain
 try:
-    chain = setup_qa_chain(api_key)
+    vectorstore, embeddings, chain, corpus_fingerprint = setup_qa_chain(api_key)
+    answer_cache = setup_answer_cache(corpus_fingerprint)
     st.success("✅ System Ready! Knowledge Base Loaded.")
 except Exception as e:
     st.error(f"Error starting AI: {e}")
     st.stop()
 
-# --- 3. THE CHAT INTERFACE ---
+# --- 3. CACHE CONTROLS ---
+with st.sidebar:
+    st.header("⚡ Answer Cache")
+    # Per session: the cache object is shared, so the threshold is passed on each lookup
+    threshold = st.slider("Similarity threshold", 0.70, 1.00, DEFAULT_THRESHOLD, 0.01)
+    stats = answer_cache.stats()
+    st.metric("Hit rate", f"{stats['hit_rate']:.0%}", help=f"{stats['hits']} hits / {stats['misses']} misses")
+    st.metric("Latency saved", f"{stats['latency_saved_s']:.1f} s")
+    st.caption(f"{stats['entries']} cached answers")
+    if st.button("Clear cache"):
+        answer_cache.clear()
+
+# --- 4. THE CHAT INTERFACE ---
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -96,12 +124,26 @@ if prompt := st.chat_input("Ask about company policies..."):
 
     # 2. Generate AI Response
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            response = chain.invoke(prompt)
-            st.markdown(response.content)
+        with st.spinner("Searching policies..."):
+            # One question embedding serves both the retrieval and the cache lookup
+            question_vector = embeddings.embed_query(prompt)
+            context = vectorstore.similarity_search_by_vector(question_vector, k=2)
+            context_id = fingerprint_documents(context)
+            answer = answer_cache.lookup(question_vector, context_id, threshold)
+
+        if answer is not None:
+            st.markdown(answer)
+            st.caption("⚡ Answered from cache")
+        else:
+            # Stream tokens into the chat bubble as Gemini writes them
+            stream = StreamTimer(chain.stream({"context": assemble_context(context), "question": prompt}),
+                                 label="day13")
+            answer = st.write_stream(stream)
+            answer_cache.store(prompt, question_vector, context_id, answer, stream.total)
+            st.caption(stream.summary())
             
     # 3. Save History
-    st.session_state.messages.append({"role": "assistant", "content": response.content})
+    st.session_state.messages.append({"role": "assistant", "content": answer})
 
 # To configure git for committing code, use the commands below:
 #   git config --global user.name "Trent Douthat"
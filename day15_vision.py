@@ -1,9 +1,9 @@
 import os
-import base64
-import mimetypes # <--- Standard library to guess file types
+import time
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
+from image_prep import IMAGE_PRESETS, prepare_image
 
 # 1. Load Config
 load_dotenv()
@@ -19,19 +19,15 @@ llm = ChatGoogleGenerativeAI(google_api_key=api_key, model=model_name)
 image_path = "data/server_rack.png" # <--- Update this to your actual filename!
 
 # 3. Helper: Smart Encoding
-def get_image_data(path):
-    # Guess the MIME type (e.g., 'image/png' or 'image/jpeg') based on file extension
-    mime_type, _ = mimetypes.guess_type(path)
-    if not mime_type:
-        mime_type = "image/jpeg" # Default fallback
-    
-    with open(path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-        
-    return mime_type, encoded_string
+# Shrink + re-encode before upload (EXIF stripped); the cap depends on the job
+def get_image_data(path, max_dim=IMAGE_PRESETS["inventory"]):
+    prepared = prepare_image(path, max_dim=max_dim)
+    print(prepared.summary())
+    return prepared.mime_type, prepared.base64()
 
 try:
     # 4. Process the Image
+    start = time.perf_counter()
     mime_type, image_data = get_image_data(image_path)
     print(f"Loaded image as: {mime_type}")
 
@@ -46,6 +42,7 @@ try:
     print("--- SENDING TO AI ---")
     response = llm.invoke([message])
     
+    print(f"--- END-TO-END: {time.perf_counter() - start:.2f}s ---")
     print("\n--- RESULT ---")
     print(response.content)
 
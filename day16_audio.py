@@ -1,9 +1,8 @@
 import os
-import mimetypes
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
-import base64
+from media_payload import media_part
 
 # 1. Load Config
 load_dotenv()
@@ -15,32 +14,26 @@ llm = ChatGoogleGenerativeAI(google_api_key=api_key, model=model_name)
 # 2. Audio Setup
 audio_path = "data/voice3.mp3" # <--- Update this to your filename!
 
-# 3. Helper: Encode Audio
+# 3. Helper: Audio Payload
+# Raw bytes inline for short clips; long recordings go through the Files API (uploaded once per content)
 def get_audio_data(path):
-    mime_type, _ = mimetypes.guess_type(path)
-    if not mime_type:
-        mime_type = "audio/mp3" # Fallback
-    
-    with open(path, "rb") as audio_file:
-        encoded_string = base64.b64encode(audio_file.read()).decode('utf-8')
-        
-    return mime_type, encoded_string
+    return media_part(path)
 
 try:
     # 4. Process Audio
     print(f"--- LISTENING TO {audio_path} ---")
-    mime_type, audio_data = get_audio_data(audio_path)
+    audio_part = get_audio_data(audio_path)
 
     # 5. The Prompt
     # We ask for TWO things: Transcription AND Action Items.
     message = HumanMessage(
         content=[
             {"type": "text", "text": "Please transcribe this audio exactly. Then, extract any action items or technical issues mentioned."},
-            {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{audio_data}"}}
+            audio_part
         ]
     )
-    # Note: LangChain uses "image_url" for all media types (audio/video/image) right now. 
-    # It's a quirk of the library, but it works!
+    # Note: a "media" part works for any media type (audio/video/image), and unlike a
+    # base64 "image_url" data URL it isn't decoded back to bytes by LangChain.
 
     response = llm.invoke([message])
     
@@ -1,9 +1,8 @@
 import os
-import base64
-import mimetypes
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
+from media_payload import media_part
 from gtts import gTTS
 import pygame
 import time
@@ -23,23 +22,11 @@ audio_response_path = "data/response.mp3"
 
 # 2. UPDATED Helper Function
 def encode_media(path):
-    """Encodes image or audio to base64 and handles Windows .m4a files"""
-    
-    # Force the correct MIME type for Windows Voice Recorder files
-    if path.lower().endswith(".m4a"):
-        mime_type = "audio/mp4"
-    else:
-        # Let Python guess for everything else (jpg, png, mp3, wav)
-        mime_type, _ = mimetypes.guess_type(path)
-    
-    # Fallback if guessing fails
-    if not mime_type:
-        mime_type = "audio/mp3" 
-    
-    with open(path, "rb") as file:
-        data = base64.b64encode(file.read()).decode('utf-8')
-        
-    return mime_type, data
+    """
+    Content part for an image or audio file (.m4a from Windows Voice Recorder included).
+    Small files go inline as raw bytes; big recordings are uploaded once via the Files API.
+    """
+    return media_part(path)
 
 def speak_text(text):
     """Converts text to speech and plays it"""
@@ -64,18 +51,18 @@ def speak_text(text):
 
 try:
     print("--- 1. LISTENING TO YOUR QUESTION ---")
-    mime_audio, audio_data = encode_media(audio_query_path)
+    audio_part = encode_media(audio_query_path)
     
     print("--- 2. LOOKING AT THE IMAGE ---")
-    mime_image, image_data = encode_media(image_path)
+    image_part = encode_media(image_path)
 
     # We send BOTH the audio question and the image to the AI at once
     # Gemini is smart enough to know the audio is referring to the image
     message = HumanMessage(
         content=[
             {"type": "text", "text": "Listen to this audio question and answer it based on the image provided."},
-            {"type": "image_url", "image_url": {"url": f"data:{mime_audio};base64,{audio_data}"}},
-            {"type": "image_url", "image_url": {"url": f"data:{mime_image};base64,{image_data}"}}
+            audio_part,
+            image_part
         ]
     )
 
@@ -1,7 +1,7 @@
 import os
-import time
 from dotenv import load_dotenv
 import google.generativeai as genai
+from video_jobs import poll_until_active
 
 # 1. Setup
 load_dotenv()
@@ -20,13 +20,9 @@ def analyze_video(path):
 
     # 2. Wait for Processing
     print("--- 2. WAITING FOR PROCESSING ---")
-    while video_file.state.name == "PROCESSING":
-        print(".", end="", flush=True)
-        time.sleep(2)
-        video_file = genai.get_file(video_file.name)
-
-    if video_file.state.name == "FAILED":
-        raise ValueError("Video processing failed.")
+    # Backs off from 1 s to 15 s between checks (with jitter) instead of a fixed 2 s
+    video_file = poll_until_active(genai.get_file, video_file,
+                                   on_poll=lambda f: print(".", end="", flush=True))
 
     print(f"\nState: {video_file.state.name}")
 
@@ -1,9 +1,9 @@
 import os
-import time
 import json
 from dotenv import load_dotenv
 from google import genai 
 from google.genai import types
+from video_jobs import poll_until_active
 
 # 1. Setup (New "Client" Syntax)
 load_dotenv()
@@ -23,13 +23,9 @@ def analyze_video_structured(path):
 
     # 2. Wait for Processing
     print("--- 2. WAITING FOR PROCESSING ---")
-    while video_file.state.name == "PROCESSING":
-        print(".", end="", flush=True)
-        time.sleep(2)
-        video_file = client.files.get(name=video_file.name)
-
-    if video_file.state.name == "FAILED":
-        raise ValueError("Video processing failed.")
+    # Backs off from 1 s to 15 s between checks (with jitter) instead of a fixed 2 s
+    video_file = poll_until_active(lambda name: client.files.get(name=name), video_file,
+                                   on_poll=lambda f: print(".", end="", flush=True))
 
     print(f"\nState: {video_file.state.name}")
 
@@ -1,10 +1,11 @@
 import os
-import base64
-import mimetypes
+import time
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
 from langchain_core.messages import HumanMessage
+from embedding_cache import CachedEmbeddings
+from image_prep import IMAGE_PRESETS, prepare_image
+from opsvision_backend import search_items, open_manuals_db, open_lexical_index
 
 # 1. Setup
 load_dotenv()
@@ -16,20 +17,22 @@ DB_PATH = "./chroma_db_opsvision"
 image_path = "data/server_rack.png" # <--- Ensure this exists from Day 15!
 
 # 2. Connect to Database
-embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
-db = Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
+embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004"))
+db = open_manuals_db(embeddings)
+# Keyword index for exact part numbers (None until day21_ingest.py has built it)
+lexical = open_lexical_index()
 
-# 3. Helper: Encode Image
-def encode_image(path):
-    mime_type, _ = mimetypes.guess_type(path)
-    if not mime_type: mime_type = "image/png"
-    with open(path, "rb") as f:
-        return mime_type, base64.b64encode(f.read()).decode('utf-8')
+# 3. Helper: Encode Image (downscaled + EXIF stripped, see image_prep.py)
+def encode_image(path, max_dim=IMAGE_PRESETS["inventory"]):
+    prepared = prepare_image(path, max_dim=max_dim)
+    print(prepared.summary())
+    return prepared.mime_type, prepared.base64()
 
 # --- THE PIPELINE ---
 
 try:
     print(f"--- 1. ANALYZING IMAGE: {image_path} ---")
+    start = time.perf_counter()
     mime, data = encode_image(image_path)
     
     # Step A: Ask Vision to identify items (Prompt Engineering)
@@ -46,18 +49,18 @@ try:
     
     vision_response = llm.invoke([msg])
     items_detected = vision_response.content.strip()
-    print(f"DETECTED ITEMS: {items_detected}")
+    print(f"DETECTED ITEMS: {items_detected} ({time.perf_counter() - start:.2f}s end-to-end)")
     
     # Step B: Loop through items and "Recall" info
     item_list = [item.strip() for item in items_detected.split(',')]
     
     print("\n--- 2. RETRIEVING SPECS FROM DATABASE ---")
-    for item in item_list:
+    # Search the DB for ALL items in one round trip
+    all_results = search_items(db, item_list, k=1, lexical=lexical)
+
+    for item, results in zip(item_list, all_results):
         print(f"\n>> Searching manuals for: '{item}'...")
         
-        # Search the DB
-        results = db.similarity_search(item, k=1)
-        
         if results:
             print(f"   FOUND DOC: {results[0].page_content[:200]}...") # Print first 200 chars
         else:
@@ -1,38 +1,276 @@
 import os
+import json
 import shutil
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain_text_splitters import CharacterTextSplitter
+import hashlib
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from langchain_community.document_loaders import TextLoader
 from langchain_chroma import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from dotenv import load_dotenv
+from ingest_pipeline import embed_and_upsert, batched, make_chunk_id, ProgressCounter, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+from embedding_cache import CachedEmbeddings
+from hybrid_search import BM25Index, BM25_PATH
+from manual_splitter import ManualSplitter
 
 load_dotenv()
 
 # 1. Setup
 DB_PATH = "./chroma_db_opsvision"
 DATA_PATH = "data/manuals"
+# Lives NEXT to the DB folder (not inside it) so a clean rebuild can't wipe it by accident
+MANIFEST_PATH = "./chroma_db_opsvision_manifest.json"
+# Files per streaming window (the manifest is checkpointed after each one)
+DEFAULT_WINDOW_FILES = 50
 
-# Clean start: Delete old DB if it exists
-if os.path.exists(DB_PATH):
-    shutil.rmtree(DB_PATH)
+# Follows headings / spec tables / lists and sizes chunks in tokens (was CharacterTextSplitter(500, 0))
+text_splitter = ManualSplitter()
 
-# 2. Load Documents
-print("--- LOADING MANUALS ---")
-loader = DirectoryLoader(DATA_PATH, glob="*.txt", loader_cls=TextLoader)
-docs = loader.load()
+# --- HELPER FUNCTIONS ---
 
-# 3. Split Text (Chunks)
-text_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=0)
-splits = text_splitter.split_documents(docs)
+def hash_file(path):
+    """SHA-256 of a file, read in blocks so big manuals don't sit in memory"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
 
-# 4. Create Vector DB
-print("--- CREATING VECTOR DATABASE ---")
-embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-db = Chroma.from_documents(
-    documents=splits, 
-    embedding=embeddings, 
-    persist_directory=DB_PATH
-)
+def list_manual_files(data_path=DATA_PATH):
+    """File names relative to DATA_PATH, so the manifest is portable between machines"""
+    # Same scope as the old DirectoryLoader(glob="*.txt"): top-level .txt files only
+    return sorted(name for name in os.listdir(data_path) if name.endswith(".txt"))
 
-print(f"--- SUCCESS: Ingested {len(splits)} chunks into {DB_PATH} ---")
\ No newline at end of file
+def split_file(rel_path, data_path=DATA_PATH):
+    """
+    Load + split ONE manual and tag every chunk with its content-based ID.
+    Chunks are linked to their neighbours (prev_id / next_id) for expand_context().
+    """
+    docs = TextLoader(os.path.join(data_path, rel_path)).load()
+    splits = text_splitter.split_documents(docs)
+    ids, seen = [], {}
+    for chunk in splits:
+        ordinal = seen[chunk.page_content] = seen.get(chunk.page_content, -1) + 1
+        ids.append(make_chunk_id(rel_path, chunk.page_content, ordinal))
+    for i, chunk in enumerate(splits):
+        chunk.metadata["source"] = rel_path
+        if i > 0:
+            chunk.metadata["prev_id"] = ids[i - 1]
+        if i + 1 < len(ids):
+            chunk.metadata["next_id"] = ids[i + 1]
+    return ids, splits
+
+def chunk_fingerprint(chunk):
+    """Text + metadata: the text is already in the ID, so a change here means new neighbour links"""
+    return hash_text(json.dumps([chunk.page_content, chunk.metadata], sort_keys=True))
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    # Write to a temp file first so a crash mid-write can't corrupt the manifest
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+MANIFEST_VERSION = 2    # 1: positional chunk IDs (source::index)
+
+def new_manifest():
+    # files:  {rel_path: {"sha256": ..., "chunks": {chunk_id: chunk_fingerprint}}}
+    # splitter: which chunking produced those chunks
+    return {"version": MANIFEST_VERSION, "splitter": text_splitter.signature, "files": {}}
+
+# --- INGEST MODES ---
+
+def full_rebuild(embeddings, data_path=DATA_PATH, db_path=DB_PATH, manifest_path=MANIFEST_PATH, **options):
+    """Original behaviour: wipe the DB and embed everything (also writes a fresh manifest)"""
+    # Clean start: Delete old DB if it exists
+    if os.path.exists(db_path):
+        shutil.rmtree(db_path)
+    # The lexical index mirrors the DB, so it starts over too
+    bm25_path = options.get("bm25_path", BM25_PATH)
+    if os.path.exists(bm25_path):
+        os.remove(bm25_path)
+    # An empty manifest makes every chunk "new", so the incremental path does the rest
+    save_manifest(new_manifest(), manifest_path)
+    return incremental_ingest(embeddings, data_path, db_path, manifest_path, **options)
+
+def diff_file(rel_path, old_entry, data_path):
+    """
+    Compare ONE manual against its manifest entry.
+    Returns (new manifest entry, [(chunk_id, Document) to embed + upsert],
+             [(chunk_id, metadata) to relink], [chunk_ids to delete], stats)
+    IDs come from the chunk text, so an edit deletes the chunks it changed and adds their
+    replacements; the chunks around it only get new neighbour links (no re-embedding) and
+    everything else is skipped.
+    Pure function of its arguments, so it can run in a worker process.
+    """
+    stats = {"added": 0, "relinked": 0, "skipped": 0}
+    file_sha = hash_file(os.path.join(data_path, rel_path))
+
+    # Fast path: file untouched, don't even re-split it
+    if old_entry and old_entry["sha256"] == file_sha:
+        stats["skipped"] += len(old_entry["chunks"])
+        return old_entry, [], [], [], stats
+
+    old_chunks = old_entry["chunks"] if old_entry else {}
+    ids, splits = split_file(rel_path, data_path)
+    fingerprints, upserts, relinks = {}, [], []
+    for chunk_id, chunk in zip(ids, splits):
+        fingerprint = fingerprints[chunk_id] = chunk_fingerprint(chunk)
+        if chunk_id not in old_chunks:
+            stats["added"] += 1
+            upserts.append((chunk_id, chunk))
+        elif old_chunks[chunk_id] != fingerprint:
+            stats["relinked"] += 1
+            relinks.append((chunk_id, chunk.metadata))
+        else:
+            stats["skipped"] += 1
+
+    # Chunks that were edited away (or cut off the end)
+    deletes = [chunk_id for chunk_id in old_chunks if chunk_id not in fingerprints]
+    return {"sha256": file_sha, "chunks": fingerprints}, upserts, relinks, deletes, stats
+
+def _diff_file_task(args):
+    # Top-level so ProcessPoolExecutor can pickle it
+    return diff_file(*args)
+
+def iter_file_diffs(rel_paths, old_files, data_path=DATA_PATH, pool=None, workers=1):
+    """
+    Yield diff_file() results in the same order as rel_paths.
+    With a pool, files are sharded across worker processes (load + decode + split in parallel);
+    the output is identical to the serial path, only faster.
+    """
+    tasks = [(rel_path, old_files.get(rel_path), data_path) for rel_path in rel_paths]
+    if pool is None:
+        return map(_diff_file_task, tasks)
+    # A few shards per worker keeps them all busy without paying per-file IPC overhead
+    chunksize = max(1, len(tasks) // (workers * 4))
+    return pool.map(_diff_file_task, tasks, chunksize=chunksize)
+
+def incremental_ingest(embeddings, data_path=DATA_PATH, db_path=DB_PATH, manifest_path=MANIFEST_PATH,
+                       batch_size=DEFAULT_BATCH_SIZE, max_concurrency=DEFAULT_CONCURRENCY,
+                       window_files=DEFAULT_WINDOW_FILES, workers=1, bm25_path=BM25_PATH):
+    """
+    Only embed new/changed chunks, and delete chunks whose manual is gone.
+    Streams: load -> split -> embed -> upsert runs as a generator over windows of
+    files, so memory stays flat and vectors land in the DB from the first batch.
+    The BM25 index (hybrid_search.py) gets the same adds/deletes as the DB.
+    """
+    manifest = load_manifest(manifest_path)
+
+    # No manifest = we can't tell which old chunks are ours, so fall back to a clean build
+    if manifest is None:
+        print("--- NO MANIFEST FOUND: DOING A FULL REBUILD ---")
+        return full_rebuild(embeddings, data_path, db_path, manifest_path, batch_size=batch_size,
+                            max_concurrency=max_concurrency, window_files=window_files, workers=workers,
+                            bm25_path=bm25_path)
+
+    stats = {"added": 0, "relinked": 0, "skipped": 0, "deleted": 0}
+    db = Chroma(persist_directory=db_path, embedding_function=embeddings)
+    progress = ProgressCounter()
+    # DBs ingested before the lexical index existed get it backfilled from the collection
+    bm25 = BM25Index.load(bm25_path) if os.path.exists(bm25_path) else BM25Index.from_collection(db)
+
+    # 2. Load & Split only what changed
+    print("--- STREAMING MANUALS INTO VECTOR DATABASE ---")
+    current_files = list_manual_files(data_path)
+    old_files = manifest["files"]
+    # Chunking or ID scheme changed: re-split every file (forget the file hashes, keep the chunk
+    # hashes so chunks that come out identical are still skipped and leftover IDs get deleted)
+    if manifest.get("splitter") != text_splitter.signature or manifest.get("version") != MANIFEST_VERSION:
+        print(f"--- SPLITTER CHANGED ({manifest.get('splitter')} v{manifest.get('version')} -> "
+              f"{text_splitter.signature} v{MANIFEST_VERSION}): RE-SPLITTING ---")
+        old_files = {rel_path: {"sha256": None, "chunks": entry["chunks"]} for rel_path, entry in old_files.items()}
+        manifest["splitter"] = text_splitter.signature
+        manifest["version"] = MANIFEST_VERSION
+    new_files = {}
+
+    def changed_chunks(window, pool):
+        # Lazy: with no pool a file is only read when the embedder is ready for more chunks
+        for rel_path, (entry, upserts, relinks, deletes, file_stats) in zip(
+                window, iter_file_diffs(window, old_files, data_path, pool, workers)):
+            new_files[rel_path] = entry
+            for key, value in file_stats.items():
+                stats[key] += value
+            if deletes:
+                db.delete(ids=deletes)
+                bm25.remove(deletes)
+                stats["deleted"] += len(deletes)
+            if relinks:
+                # Same text, same vector: only the neighbour links in the metadata move
+                db._collection.update(ids=[chunk_id for chunk_id, _ in relinks],
+                                      metadatas=[metadata for _, metadata in relinks])
+            for chunk_id, chunk in upserts:
+                bm25.add(chunk_id, chunk.page_content)
+                yield chunk_id, chunk
+
+    # 3. Embed & Upsert, one window of files at a time
+    with (ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()) as pool:
+        for window in batched(current_files, window_files):
+            # Upsert by ID, so a re-run after a crash overwrites what it already wrote.
+            # Batches are embedded concurrently and written as each one finishes.
+            embed_and_upsert(db, embeddings, changed_chunks(window, pool), batch_size=batch_size,
+                             max_concurrency=max_concurrency, progress=progress)
+
+            # Checkpoint: everything in this window is now in the DB, so a crash only redoes the next one
+            checkpoint = dict(old_files)
+            checkpoint.update(new_files)
+            manifest["files"] = checkpoint
+            save_manifest(manifest, manifest_path)
+            bm25.save(bm25_path)
+
+    # 4. Manuals that were removed from disk
+    delete_ids = []
+    for rel_path, old_entry in old_files.items():
+        if rel_path not in new_files:
+            delete_ids.extend(old_entry["chunks"].keys())
+    if delete_ids:
+        db.delete(ids=delete_ids)
+        bm25.remove(delete_ids)
+        stats["deleted"] += len(delete_ids)
+
+    manifest["files"] = new_files
+    save_manifest(manifest, manifest_path)
+    bm25.save(bm25_path)
+    return stats
+
+# --- MAIN EXECUTION ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest manuals into the OpsVision vector DB")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only embed new/changed chunks instead of rebuilding the whole DB")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Chunks per embedding request")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Embedding requests in flight at once")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW_FILES,
+                        help="Manuals per streaming window (manifest is checkpointed after each)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for the load/split stage (try your core count)")
+    args = parser.parse_args()
+    embed_options = {"batch_size": args.batch_size, "max_concurrency": args.concurrency,
+                     "window_files": args.window, "workers": args.workers}
+
+    # Cached: a full rebuild only pays for chunks it has never seen before
+    embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004"))
+
+    if args.incremental:
+        stats = incremental_ingest(embeddings, **embed_options)
+    else:
+        stats = full_rebuild(embeddings, **embed_options)
+
+    print(f"--- SUCCESS: {DB_PATH} updated ---")
+    print(f"Added: {stats['added']} | Relinked: {stats['relinked']} | "
+          f"Skipped: {stats['skipped']} | Deleted: {stats['deleted']}")
+    cache = embeddings.stats()
+    print(f"Embedding cache: {cache['hits']} hits / {cache['misses']} misses")
@@ -1,12 +1,11 @@
 import streamlit as st
 import os
+import time
 import tempfile
-import base64
-import mimetypes
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
 from langchain_core.messages import HumanMessage
+from image_prep import IMAGE_PRESETS, prepare_image
+from opsvision_backend import search_items, opsvision_resources, opsvision_vision_cache, DB_PATH
 
 # 1. Config & Setup
 st.set_page_config(page_title="OpsVision Scanner", layout="wide")
@@ -18,37 +17,33 @@ if not api_key:
     st.error("API Key not found. Check .env")
     st.stop()
 
-# Initialize AI
 model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-llm = ChatGoogleGenerativeAI(google_api_key=api_key, model=model_name)
 
-# Initialize DB (Read-Only)
-DB_PATH = "./chroma_db_opsvision"
-embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+VISION_PROMPT = """
+Analyze this technical image. Identify the top 3 distinct pieces of equipment or infrastructure.
+Return ONLY a comma-separated list. (Example: Server, Switch, Cables)
+"""
+
 # Check if DB exists
-if os.path.exists(DB_PATH):
-    db = Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
-else:
+if not os.path.exists(DB_PATH):
     st.error("Database not found! Please run day21_ingest.py first.")
     st.stop()
 
+# Initialize AI & DB (Read-Only): built once per process, shared by every rerun (resources.py).
+# vision_cache: re-uploads and re-photographs of the same rack reuse the earlier vision result
+llm, embeddings, db, lexical, vision_cache = opsvision_resources(api_key, model_name, VISION_PROMPT)
+
 # --- HELPER FUNCTIONS ---
 
-def encode_image(image_file):
-    """Convert uploaded file to base64 for Gemini"""
-    bytes_data = image_file.getvalue()
-    mime_type = image_file.type
-    base64_data = base64.b64encode(bytes_data).decode('utf-8')
-    return mime_type, base64_data
+def encode_image(image_file, max_dim=IMAGE_PRESETS["inventory"]):
+    """Downscale + strip EXIF, then base64 for Gemini. Returns (mime, data, PreparedImage)"""
+    prepared = prepare_image(image_file, max_dim=max_dim)
+    return prepared.mime_type, prepared.base64(), prepared
 
 def identify_equipment(mime, data):
     """Ask Vision Model what is in the picture"""
-    prompt = """
-    Analyze this technical image. Identify the top 3 distinct pieces of equipment or infrastructure.
-    Return ONLY a comma-separated list. (Example: Server, Switch, Cables)
-    """
     msg = HumanMessage(content=[
-        {"type": "text", "text": prompt},
+        {"type": "text", "text": VISION_PROMPT},
         {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{data}"}}
     ])
     response = llm.invoke([msg])
@@ -62,6 +57,11 @@ st.caption("Upload a photo of a server rack or circuit board to retrieve specs."
 with st.sidebar:
     st.header("Upload Image")
     uploaded_file = st.file_uploader("Choose an image...", type=['png', 'jpg', 'jpeg'])
+    # Bigger images only help when the model has to read small print
+    image_preset = st.selectbox("Image detail", list(IMAGE_PRESETS), index=list(IMAGE_PRESETS).index("inventory"),
+                                help="Max image size sent to the vision model: fast / inventory / detail (labels, serials)")
+    # Each preset has its own vision cache: a low-res answer is never reused for a "detail" scan
+    vision_cache = opsvision_vision_cache(model_name, VISION_PROMPT, IMAGE_PRESETS[image_preset])
 
 if uploaded_file:
     # Layout: 2 Columns
@@ -74,10 +74,18 @@ if uploaded_file:
         if st.button("Analyze Equipment", type="primary"):
             with st.spinner("Scanning image..."):
                 # 1. Vision Phase
-                mime, data = encode_image(uploaded_file)
-                detected_text = identify_equipment(mime, data)
+                start = time.perf_counter()
+                prep = {}
+
+                def call_vision():
+                    mime, data, prep["image"] = encode_image(uploaded_file, IMAGE_PRESETS[image_preset])
+                    return identify_equipment(mime, data)
+
+                detected_text, distance = vision_cache.get_or_analyze(uploaded_file, call_vision)
                 
                 st.success("Analysis Complete")
+                source = prep["image"].summary() if distance is None else f"♻️ Cached result ({distance} bits away)"
+                st.caption(f"{source} · ⏱️ {time.perf_counter() - start:.2f}s end-to-end")
                 st.subheader(f"Detected: {detected_text}")
                 
                 # 2. Retrieval Phase
@@ -85,11 +93,12 @@ if uploaded_file:
                 
                 st.divider()
                 st.markdown("### 📄 Technical Documentation Found")
-                
-                for item in items:
+
+                # Search DB for every item in one round trip
+                all_results = search_items(db, items, k=1, lexical=lexical)
+
+                for item, results in zip(items, all_results):
                     with st.expander(f"Specs for: {item}", expanded=True):
-                        # Search DB
-                        results = db.similarity_search(item, k=1)
                         if results:
                             # Display the content found in the manual
                             st.markdown(f"**Source:** Internal Manuals")
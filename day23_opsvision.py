@@ -1,13 +1,17 @@
 import streamlit as st
 import pandas as pd
+import io
 import time
-import base64
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
-from langchain_core.messages import HumanMessage
+from embedding_cache import embed_queries
+from image_prep import IMAGE_PRESETS, prepare_image
+from opsvision_backend import search_items, analyze_image_bytes, opsvision_resources, opsvision_vision_cache, DB_PATH
+from resources import registry
+from scan_pipeline import scan, parse_items
+from vision_cache import DEFAULT_THRESHOLD as VISION_THRESHOLD
+from bulk_scan import ImageSource, find_images, scan_many, inventory_frame, DEFAULT_WORKERS, DEFAULT_RATE_PER_MINUTE
 
 # 1. Config & Setup
 st.set_page_config(page_title="OpsVision Pro", page_icon="👁️", layout="wide")
@@ -16,39 +20,50 @@ load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
 model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-# Initialize AI & DB
-llm = ChatGoogleGenerativeAI(google_api_key=api_key, model=model_name)
-DB_PATH = "./chroma_db_opsvision"
-embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
-
 # Safe DB Loading
-if os.path.exists(DB_PATH):
-    db = Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
-else:
+if not os.path.exists(DB_PATH):
     st.error("Database missing. Run day21_ingest.py!")
     st.stop()
 
+# Initialize AI & DB: built once per process and shared by every rerun / session (resources.py),
+# so a widget click only pays for the UI. vision_cache: perceptual-hash cache of vision results.
+llm, embeddings, db, lexical, vision_cache = opsvision_resources(api_key, model_name)
+
 # --- HELPER FUNCTIONS ---
 
-def get_base64(file):
-    return base64.b64encode(file.getvalue()).decode('utf-8')
+def analyze_image(file, max_dim=IMAGE_PRESETS["inventory"], stats=None, tolerance=None):
+    def call_vision():
+        # Downscale + strip EXIF here (not inside analyze_image_bytes) so the UI can show the savings
+        prepared = prepare_image(file, max_dim=max_dim)
+        if stats is not None:
+            stats["image"] = prepared
+        return analyze_image_bytes(llm, prepared.data, prepared.mime_type, max_dim=None)
 
-def analyze_image(file):
-    mime_type = file.type
-    base64_data = get_base64(file)
-    
-    prompt = """
-    Analyze this technical image. Return a comma-separated list of the 
-    top 3 distinct technical items visible. (e.g. Raspberry Pi, Ethernet Port, GPIO Pins)
-    """
-    
-    msg = HumanMessage(content=[
-        {"type": "text", "text": prompt},
-        {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{base64_data}"}}
-    ])
-    
-    response = llm.invoke([msg])
-    return response.content.strip()
+    result, distance = vision_cache.get_or_analyze(file, call_vision, tolerance)
+    if stats is not None and distance is not None:
+        stats["cache_distance"] = distance
+    return result
+
+def cached_vision(data, tolerance=None):
+    # Batch scans check the cache before queueing for a rate-limited vision slot
+    hit = vision_cache.lookup(vision_cache.image_hash(data), tolerance)
+    return hit[0] if hit is not None else None
+
+def batch_vision(data, mime_type, max_dim):
+    start = time.perf_counter()
+    result = analyze_image_bytes(llm, data, mime_type, max_dim=max_dim)
+    vision_cache.store(vision_cache.image_hash(data), result, time.perf_counter() - start)
+    return result
+
+def detect_items(file, max_dim=IMAGE_PRESETS["inventory"], stats=None, tolerance=None):
+    return parse_items(analyze_image(file, max_dim, stats, tolerance))
+
+def lookup_item(item):
+    return search_items(db, [item], k=1, lexical=lexical)[0]
+
+def warm_embeddings(items):
+    # ONE embedding call for every item; the per-item lookups then hit the embedding cache
+    embed_queries(embeddings, items)
 
 # --- UI LAYOUT ---
 
@@ -56,16 +71,91 @@ st.title("👁️ OpsVision Pro")
 st.markdown("### Intelligent Inventory & Spec Retrieval")
 
 with st.sidebar:
+    mode = st.radio("Mode", ["Single image", "Batch audit"], horizontal=True)
     st.header("Upload")
-    uploaded_file = st.file_uploader("Drop image here", type=['png', 'jpg', 'jpeg'])
+    if mode == "Single image":
+        uploaded_file = st.file_uploader("Drop image here", type=['png', 'jpg', 'jpeg'])
+    else:
+        uploaded_file = None
+        batch_files = st.file_uploader("Drop images here", type=['png', 'jpg', 'jpeg'], accept_multiple_files=True)
+        batch_dir = st.text_input("...or a folder on this machine", placeholder="/mnt/audits/hall-b")
+        workers = st.slider("Workers", 1, 16, DEFAULT_WORKERS)
+        rate = st.number_input("Max vision calls / minute", 0, 1000, DEFAULT_RATE_PER_MINUTE,
+                               help="0 = unlimited")
+    # Resolution cap sent to the vision model; "detail" for reading labels / serial numbers
+    image_preset = st.selectbox("Image detail", list(IMAGE_PRESETS), index=list(IMAGE_PRESETS).index("inventory"))
+    # Each preset has its own vision cache: a low-res answer is never reused for a "detail" scan
+    vision_cache = opsvision_vision_cache(model_name, max_dim=IMAGE_PRESETS[image_preset])
+    st.divider()
+    st.header("⚡ Vision Cache")
+    # Passed on each lookup: the cache is shared by every session, its default threshold isn't touched
+    tolerance = st.slider("Match tolerance (bits)", 0, 16, VISION_THRESHOLD,
+                          help="How different (out of 64 hash bits) a photo may be and still reuse "
+                               "a cached result. 0 = same image only.")
+    cache_stats = vision_cache.stats()
+    st.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}",
+              help=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+    st.caption(f"{cache_stats['entries']} cached images · {cache_stats['latency_saved_s']:.1f} s saved")
+    if st.button("Clear vision cache"):
+        vision_cache.clear()
+    with st.expander("🩺 Resources"):
+        st.dataframe(pd.DataFrame(registry.health()), hide_index=True, use_container_width=True)
     st.divider()
     st.info("Supported: Server Racks, Circuit Boards, Cabling")
 
 # Initialize Session State to hold data
 if 'inventory_data' not in st.session_state:
     st.session_state['inventory_data'] = []
+if 'bulk_inventory' not in st.session_state:
+    st.session_state['bulk_inventory'] = []
+
+if mode == "Batch audit":
+    images = [ImageSource.from_upload(f) for f in batch_files or []]
+    if batch_dir:
+        if os.path.isdir(batch_dir):
+            images += find_images([batch_dir])
+        else:
+            st.warning(f"Folder not found: {batch_dir}")
+    st.subheader(f"🗂️ Batch Audit ({len(images)} images queued)")
+
+    col_run, col_clear = st.columns([3, 1])
+    run_batch = col_run.button("🚀 Run Batch Scan", type="primary", use_container_width=True,
+                               disabled=not images)
+    if col_clear.button("🧹 Clear Inventory", use_container_width=True):
+        st.session_state['bulk_inventory'] = []
 
-if uploaded_file:
+    table = st.empty()
+    if run_batch:
+        # Results are appended (not overwritten) and shown as each image finishes
+        progress = st.progress(0.0, text="Starting...")
+        errors = 0
+        for done, (image, rows, error) in enumerate(scan_many(
+                images,
+                analyze=lambda data, mime: batch_vision(data, mime, IMAGE_PRESETS[image_preset]),
+                cached=lambda data: cached_vision(data, tolerance), lookup=lookup_item, prepare=warm_embeddings,
+                workers=workers, rate_per_minute=rate), start=1):
+            st.session_state['bulk_inventory'].extend(rows)
+            errors += error is not None
+            progress.progress(done / len(images), text=f"{done}/{len(images)} images · {image.name}")
+            table.dataframe(inventory_frame(st.session_state['bulk_inventory']), use_container_width=True)
+        st.success(f"Batch complete: {len(images)} images, {errors} failed.")
+    elif st.session_state['bulk_inventory']:
+        table.dataframe(inventory_frame(st.session_state['bulk_inventory']), use_container_width=True)
+
+    # Consolidated report
+    if st.session_state['bulk_inventory']:
+        df = inventory_frame(st.session_state['bulk_inventory'])
+        parquet = io.BytesIO()
+        df.to_parquet(parquet, index=False)
+        col_csv, col_parquet = st.columns(2)
+        col_csv.download_button("📥 Inventory (CSV)", df.to_csv(index=False).encode('utf-8'),
+                                file_name="opsvision_inventory.csv", mime="text/csv",
+                                use_container_width=True)
+        col_parquet.download_button("📥 Inventory (Parquet)", parquet.getvalue(),
+                                    file_name="opsvision_inventory.parquet",
+                                    mime="application/octet-stream", use_container_width=True)
+
+elif uploaded_file:
     col1, col2 = st.columns([1, 1.5])
     
     with col1:
@@ -73,18 +163,26 @@ if uploaded_file:
         
         if st.button("🚀 Run Analysis", type="primary", use_container_width=True):
             with st.spinner("Analyzing circuitry & components..."):
-                # Run Vision
-                detected_text = analyze_image(uploaded_file)
-                items = [x.strip() for x in detected_text.split(',')]
+                # Vision -> per-item RAG lookups (concurrent, each with its own timeout)
+                try:
+                    prep_stats = {}
+                    result = scan(uploaded_file,
+                                  lambda f: detect_items(f, IMAGE_PRESETS[image_preset], prep_stats, tolerance),
+                                  lookup_item, prepare=warm_embeddings)
+                except TimeoutError:
+                    st.error("Vision model timed out. Please try again.")
+                    st.stop()
+                items = result["items"]
                 
                 # Build Data for CSV
                 new_records = []
                 current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                for item in items:
-                    # RAG Lookup
-                    docs = db.similarity_search(item, k=1)
-                    manual_snippet = docs[0].page_content if docs else "No manual found."
+
+                for item, docs, status in zip(items, result["matches"], result["status"]):
+                    if status != "ok":
+                        manual_snippet = f"Lookup {status}."
+                    else:
+                        manual_snippet = docs[0].page_content if docs else "No manual found."
                     
                     record = {
                         "Timestamp": current_time,
@@ -96,11 +194,22 @@ if uploaded_file:
                 # Update Session State
                 st.session_state['inventory_data'] = new_records
                 st.session_state['last_items'] = items # For display
+                st.session_state['scan_timings'] = result["timings"]
+                if "image" in prep_stats:
+                    st.session_state['image_prep'] = prep_stats["image"].summary()
+                else:
+                    st.session_state['image_prep'] = (f"♻️ Reused a cached vision result "
+                                                      f"({prep_stats['cache_distance']} bits from a previous photo)")
                 st.success("Scan Complete!")
 
     with col2:
         if 'last_items' in st.session_state:
             st.subheader("🔍 Analysis Results")
+            if 'scan_timings' in st.session_state:
+                st.caption("⏱️ " + " · ".join(f"{stage}: {seconds:.2f}s"
+                                              for stage, seconds in st.session_state['scan_timings'].items()))
+            if 'image_prep' in st.session_state:
+                st.caption(st.session_state['image_prep'])
             
             # Display Cards for each item
             for i, record in enumerate(st.session_state['inventory_data']):
@@ -1,55 +1,111 @@
 import os
-import time
+import tempfile
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
+from llm_cache import ResponseCache, cached_generate_content, cached_generate_content_stream
+from resources import registry
+from upload_registry import UploadRegistry, GenaiFilesAPI, REGISTRY_PATH
+from video_jobs import VideoJobManager
 
 # Load env immediately when imported
 load_dotenv()
 
+def _shared_uploads(client, registry_path):
+    """One upload registry per file per process, shared by every session's VideoIntelligence"""
+    def build():
+        uploads = UploadRegistry(GenaiFilesAPI(client), path=registry_path)
+        uploads.refresh_expiring()   # re-upload stale handles in the background
+        return uploads
+    return registry.get(f"video_uploads:{registry_path}", build,
+                        check=lambda uploads: f"{uploads.stats()['entries']} videos")
+
 class VideoIntelligence:
-    def __init__(self):
+    def __init__(self, files_api=None, registry_path=None):
+        """
+        files_api: swap the Gemini Files API for e.g. upload_registry.LocalFilesAPI in tests.
+        Such a stand-in gets its own in-memory registry and temp store unless registry_path is given,
+        so it never touches the real ./video_uploads.sqlite3.
+        """
         self.api_key = os.getenv("GOOGLE_API_KEY")
         self.model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
         
-        if not self.api_key:
+        if not self.api_key and files_api is None:
             raise ValueError("GOOGLE_API_KEY not found in .env")
             
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = genai.Client(api_key=self.api_key) if self.api_key else None
+        # Same video (by content hash) + same question = same answer.
+        # One connection + in-memory layer per process (the OpsVision apps share the same entry)
+        self.response_cache = registry.get("response_cache", ResponseCache.sqlite,
+                                           check=lambda cache: f"{cache.stats()['entries']} responses")
+        # Same video (by content hash) = same remote file: uploaded and processed once
+        self._shared = files_api is None
+        if self._shared:
+            self.uploads = _shared_uploads(self.client, registry_path or REGISTRY_PATH)
+        else:
+            self.uploads = UploadRegistry(files_api, path=registry_path,
+                                          store_dir=tempfile.mkdtemp(prefix="video_uploads_"))
+        self._jobs = None
+
+    @property
+    def jobs(self):
+        """Background upload + processing queue (video_jobs.VideoJobManager), built on first use"""
+        if self._jobs is None:
+            if self._shared:
+                # One queue per process: the concurrency limit and queue depth cover every session
+                self._jobs = registry.get(f"video_jobs:{self.uploads.path}", lambda: VideoJobManager(self.uploads),
+                                          check=lambda jobs: f"{jobs.stats()['queued']} queued")
+            else:
+                self._jobs = VideoJobManager(self.uploads)
+        return self._jobs
+
+    def submit_video(self, path=None, data=None, suffix=".mp4", label=None):
+        """Non-blocking upload + wait: returns a job id; poll self.jobs.status(job_id)"""
+        return self.jobs.submit(path=path, data=data, suffix=suffix, label=label)
 
     def upload_video(self, file_path):
-        """Uploads a local video file to Gemini"""
-        print(f"Uploading {file_path}...")
-        video_file = self.client.files.upload(file=file_path)
-        return video_file
+        """Uploads a local video file to Gemini (reuses the earlier upload of the same content)"""
+        print(f"Preparing {file_path}...")
+        return self.uploads.ensure(file_path)
+
+    def upload_video_bytes(self, data, suffix=".mp4"):
+        """Same for in-memory video (Streamlit's uploaded_file.getbuffer()); no temp file unless it's new"""
+        return self.uploads.ensure_bytes(data, suffix=suffix)
 
     def wait_for_processing(self, video_file):
-        """Polls the API until the video is ready"""
+        """Polls the API (with backoff) until the video is ready; blocks, see submit_video for the background version"""
         print("Waiting for video processing...")
-        while video_file.state.name == "PROCESSING":
-            time.sleep(2)
-            video_file = self.client.files.get(name=video_file.name)
-        
-        if video_file.state.name == "FAILED":
-            raise ValueError("Video processing failed.")
-            
-        return video_file
+        return self.uploads.wait_active(video_file)
 
-    def query_video(self, video_file, user_question):
-        """Sends a question about the video to the AI"""
-        prompt = f"""
+    def _question_prompt(self, user_question):
+        return f"""
         Answer this question based on the video provided: "{user_question}"
         Provide a detailed answer and timestamp if applicable.
         """
-        
-        response = self.client.models.generate_content(
+
+    def query_video(self, video_file, user_question, use_cache=True):
+        """Sends a question about the video to the AI (use_cache=False forces a fresh answer)"""
+        response = cached_generate_content(
+            self.client, self.response_cache,
             model=self.model_name,
-            contents=[video_file, prompt]
+            contents=[video_file, self._question_prompt(user_question)],
+            use_cache=use_cache
         )
         return response.text
 
-    def get_video_timeline(self, video_file):
-        """Asks Gemini for a structured JSON timeline of events"""
+    def query_video_stream(self, video_file, user_question, use_cache=True):
+        """Same as query_video, but yields the answer text piece by piece as Gemini writes it"""
+        for chunk in cached_generate_content_stream(
+            self.client, self.response_cache,
+            model=self.model_name,
+            contents=[video_file, self._question_prompt(user_question)],
+            use_cache=use_cache
+        ):
+            if chunk.text:
+                yield chunk.text
+
+    def get_video_timeline(self, video_file, use_cache=True):
+        """Asks Gemini for a structured JSON timeline of events (cached per video file)"""
         from google.genai import types # Import inside function or at top
         import json
 
@@ -61,12 +117,14 @@ class VideoIntelligence:
         - event_description (string)
         """
 
-        response = self.client.models.generate_content(
+        response = cached_generate_content(
+            self.client, self.response_cache,
             model=self.model_name,
             contents=[video_file, prompt],
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
-            )
+            ),
+            use_cache=use_cache
         )
         
         # Return Python List (parsed from JSON)
@@ -91,8 +149,9 @@ if __name__ == "__main__":
             
             # 3. Ask
             print("\n--- ASKING QUESTION ---")
-            answer = ai.query_video(vf, "Describe the desk setup in detail.")
-            print(answer)
+            for piece in ai.query_video_stream(vf, "Describe the desk setup in detail."):
+                print(piece, end="", flush=True)
+            print()
             
             # Cleanup (Optional)
             # ai.client.files.delete(name=vf.name)
@@ -1,7 +1,11 @@
 import streamlit as st
+import logging
 import os
-import time
 from day24_backend import VideoIntelligence # <--- Importing your logic!
+from streaming import StreamTimer
+
+# StreamTimer logs TTFT / total time of every answer to the console (no-op if already configured)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
 
 # 1. Config
 st.set_page_config(page_title="Recall: Video Intelligence", page_icon="🎥")
@@ -25,35 +29,45 @@ with st.sidebar:
     
     # Reset button to clear state
     if st.button("Clear Video"):
-        if 'video_file' in st.session_state:
-            del st.session_state['video_file']
+        if 'video_job' in st.session_state:
+            st.session_state['ai'].jobs.cancel(st.session_state['video_job'])
+        for key in ('video_file', 'video_job', 'video_error'):
+            st.session_state.pop(key, None)
         st.rerun()
 
+@st.fragment(run_every=1.0)
+def video_job_progress(job_id):
+    """Re-runs only this block each second: the upload/processing happens on a background job"""
+    jobs = st.session_state['ai'].jobs
+    status = jobs.status(job_id)
+    if status["done"]:
+        if status["stage"] == "ready":
+            st.session_state['video_file'] = jobs.file(job_id)
+        else:
+            st.session_state['video_error'] = status["error"] or "Cancelled."
+        jobs.forget(job_id)   # the manager is process-wide: don't keep finished jobs around
+        st.rerun()   # whole page: bring up the chat
+    st.info(f"⏳ {status['stage'].title()}... ({status['elapsed']:.0f}s, "
+            f"{jobs.stats()['queued']} video(s) waiting in the queue)")
+    if st.button("Cancel"):
+        jobs.cancel(job_id)
+
 # 3. Main Logic
 if uploaded_file:
     # A. Display Video Player
     st.video(uploaded_file)
     
-    # B. Handle Processing (Only once!)
+    # B. Handle Processing (Only once!) in the background: the page stays responsive meanwhile
     if 'video_file' not in st.session_state:
-        with st.spinner("Uploading and Processing Video... (This may take a moment)"):
-            try:
-                # Save uploaded file to temp disk so we can send path to Google
-                with open("temp_video.mp4", "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                # Upload
-                vf = st.session_state['ai'].upload_video("temp_video.mp4")
-                
-                # Wait
-                vf = st.session_state['ai'].wait_for_processing(vf)
-                
-                # Save to session state so we don't re-upload
-                st.session_state['video_file'] = vf
-                st.success("Video Processed & Ready!")
-                
-            except Exception as e:
-                st.error(f"Processing Failed: {e}")
+        if 'video_error' in st.session_state:
+            st.error(f"Processing Failed: {st.session_state['video_error']}")
+        else:
+            if 'video_job' not in st.session_state:
+                # Upload (skipped if anyone already uploaded this exact video and it's still live)
+                suffix = os.path.splitext(uploaded_file.name)[1] or ".mp4"
+                st.session_state['video_job'] = st.session_state['ai'].submit_video(
+                    data=uploaded_file.getbuffer(), suffix=suffix, label=uploaded_file.name)
+            video_job_progress(st.session_state['video_job'])
 
     # C. Chat Interface
     if 'video_file' in st.session_state:
@@ -77,10 +91,11 @@ if uploaded_file:
 
             # 2. Generate Answer
             with st.chat_message("assistant"):
-                with st.spinner("Watching video..."):
-                    vf = st.session_state['video_file']
-                    response_text = st.session_state['ai'].query_video(vf, prompt)
-                    st.markdown(response_text)
+                # Tokens appear as they are generated instead of behind a spinner
+                vf = st.session_state['video_file']
+                stream = StreamTimer(st.session_state['ai'].query_video_stream(vf, prompt), label="day25")
+                response_text = st.write_stream(stream)
+                st.caption(stream.summary())
             
             # 3. Save Assistant Message
             st.session_state.messages.append({"role": "assistant", "content": response_text})
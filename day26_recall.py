@@ -1,6 +1,12 @@
 import streamlit as st
+import logging
+import os
 import pandas as pd
 from day24_backend import VideoIntelligence
+from streaming import StreamTimer
+
+# StreamTimer logs TTFT / total time of every answer to the console (no-op if already configured)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
 
 # 1. Config
 st.set_page_config(page_title="Recall Pro", page_icon="🎥", layout="wide")
@@ -14,10 +20,29 @@ with st.sidebar:
     uploaded_file = st.file_uploader("Upload MP4", type=["mp4", "mov", "avi"])
     
     if st.button("Reset App"):
+        if 'video_job' in st.session_state:
+            st.session_state['ai'].jobs.cancel(st.session_state['video_job'])
         for key in list(st.session_state.keys()):
             del st.session_state[key]
         st.rerun()
 
+@st.fragment(run_every=1.0)
+def video_job_progress(job_id):
+    """Re-runs only this block each second: the upload/processing happens on a background job"""
+    jobs = st.session_state['ai'].jobs
+    status = jobs.status(job_id)
+    if status["done"]:
+        if status["stage"] == "ready":
+            st.session_state['video_file'] = jobs.file(job_id)
+        else:
+            st.session_state['video_error'] = status["error"] or "Cancelled."
+        jobs.forget(job_id)   # the manager is process-wide: don't keep finished jobs around
+        st.rerun()   # whole page: timeline + chat
+    stages = " · ".join(f"{stage} {seconds:.0f}s" for stage, seconds in status["durations"].items())
+    st.info(f"⏳ {status['stage'].title()}... ({stages}; {jobs.stats()['queued']} video(s) queued)")
+    if st.button("Cancel"):
+        jobs.cancel(job_id)
+
 # 3. Main Layout
 st.title("Recall Pro: Video Intelligence")
 
@@ -27,18 +52,21 @@ if uploaded_file:
     
     # B. Processing & Timeline Generation
     if 'video_file' not in st.session_state:
-        with st.spinner("Processing Video & Generating Timeline..."):
+        if 'video_error' in st.session_state:
+            st.error(f"Error: {st.session_state['video_error']}")
+        else:
+            if 'video_job' not in st.session_state:
+                # 1. Upload & Wait in the background (a video already uploaded by anyone is reused by content hash)
+                suffix = os.path.splitext(uploaded_file.name)[1] or ".mp4"
+                st.session_state['video_job'] = st.session_state['ai'].submit_video(
+                    data=uploaded_file.getbuffer(), suffix=suffix, label=uploaded_file.name)
+            video_job_progress(st.session_state['video_job'])
+
+    elif 'timeline' not in st.session_state:
+        with st.spinner("Generating Timeline..."):
             try:
-                # 1. Upload & Wait
-                with open("temp_video.mp4", "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                vf = st.session_state['ai'].upload_video("temp_video.mp4")
-                vf = st.session_state['ai'].wait_for_processing(vf)
-                st.session_state['video_file'] = vf
-                
                 # 2. Generate Timeline (The New Feature)
-                timeline_data = st.session_state['ai'].get_video_timeline(vf)
+                timeline_data = st.session_state['ai'].get_video_timeline(st.session_state['video_file'])
                 st.session_state['timeline'] = timeline_data
                 
                 st.success("Analysis Complete!")
@@ -81,10 +109,11 @@ if uploaded_file:
             st.session_state.messages.append({"role": "user", "content": prompt})
 
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    vf = st.session_state['video_file']
-                    ans = st.session_state['ai'].query_video(vf, prompt)
-                    st.markdown(ans)
+                # Tokens appear as they are generated instead of behind a spinner
+                vf = st.session_state['video_file']
+                stream = StreamTimer(st.session_state['ai'].query_video_stream(vf, prompt), label="day26")
+                ans = st.write_stream(stream)
+                st.caption(stream.summary())
             st.session_state.messages.append({"role": "assistant", "content": ans})
 
 else:
@@ -2,14 +2,16 @@ import os
 import time
 import random
 import sys
-import speech_recognition as sr
-from gtts import gTTS
-import pygame
+import hashlib
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.tools import tool
-from langchain_core.messages import HumanMessage
-from langgraph.prebuilt import create_react_agent
+from startup_profile import StartupProfiler
+
+# Cold start: only the mic and the greeting are on the critical path.
+# LangChain / LangGraph, the agent + its tools, and the TTS backend (gTTS + pygame mixer)
+# load on background threads while the banner, mic and greeting come up; they are ready
+# by the time the first question has been heard. Startup breakdown -> startup_report.json
+# (view it with: python startup_profile.py).
+profiler = StartupProfiler("day29_voice_final")
 
 # 1. Setup & Config
 # Suppress the specific warning about deprecation
@@ -19,31 +21,58 @@ warnings.filterwarnings("ignore", category=UserWarning)
 load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
 model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite") # Hardcoded to your working model
-llm = ChatGoogleGenerativeAI(google_api_key=api_key, model=model_name)
 
-# Initialize Audio
-r = sr.Recognizer()
-r.dynamic_energy_threshold = False # Prevents background noise from adjusting sensitivity too much
-r.energy_threshold = 400 # Higher = less sensitive to quiet noise
-pygame.mixer.init()
+# --- 2. BACKGROUND INIT: TTS BACKEND ---
+
+def load_tts():
+    with profiler.step("import gtts"):
+        from gtts import gTTS
+    with profiler.step("import pygame"):
+        import pygame
+    with profiler.step("pygame.mixer.init"):
+        pygame.mixer.init()
+    return gTTS, pygame
+
+# --- 3. BACKGROUND INIT: TOOLS + AGENT ---
 
-# --- 2. DEFINE TOOLS ---
+def build_agent():
+    with profiler.step("import langchain_google_genai"):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+    with profiler.step("import langchain_core.tools"):
+        from langchain_core.tools import tool
+    with profiler.step("import langgraph.prebuilt"):
+        from langgraph.prebuilt import create_react_agent
 
-@tool
-def check_server_health(service_name: str):
-    """Checks the health status of a specific server or service."""
-    # We use sys.stdout.write to update line without newline spam
-    print(f"\n[⚡ TOOL] Pinging {service_name}...", end="\r")
-    time.sleep(1.5) 
-    statuses = ["Online 🟢", "Online 🟢", "Degraded 🟡", "Critical 🔴", "Maintenance 🔵"]
-    status = random.choice(statuses)
-    print(f"[⚡ TOOL] {service_name}: {status}          ") # Spaces clear the line
-    return f"The status of {service_name} is: {status}"
+    llm = ChatGoogleGenerativeAI(google_api_key=api_key, model=model_name)
 
-tools = [check_server_health]
+    @tool
+    def check_server_health(service_name: str):
+        """Checks the health status of a specific server or service."""
+        # We use sys.stdout.write to update line without newline spam
+        print(f"\n[⚡ TOOL] Pinging {service_name}...", end="\r")
+        time.sleep(1.5) 
+        statuses = ["Online 🟢", "Online 🟢", "Degraded 🟡", "Critical 🔴", "Maintenance 🔵"]
+        status = random.choice(statuses)
+        print(f"[⚡ TOOL] {service_name}: {status}          ") # Spaces clear the line
+        return f"The status of {service_name} is: {status}"
+
+    tools = [check_server_health]
+    with profiler.step("create_react_agent"):
+        return create_react_agent(llm, tools)
+
+tts_ready = profiler.background("tts backend (gtts + pygame)", load_tts)
+agent_ready = profiler.background("agent + tools (langchain + langgraph)", build_agent)
+
+# Initialize Audio (foreground: the mic has to come up first)
+with profiler.step("import speech_recognition"):
+    import speech_recognition as sr
+r = sr.Recognizer()
+r.dynamic_energy_threshold = False # Prevents background noise from adjusting sensitivity too much
+r.energy_threshold = 400 # Higher = less sensitive to quiet noise
 
-# --- 3. BUILD AGENT ---
-agent_executor = create_react_agent(llm, tools)
+# Fixed phrases (greeting, goodbye) are synthesized once and replayed from disk
+PHRASE_CACHE_DIR = "voice_cache"
+mic_opened = False
 
 # --- 4. HELPERS ---
 
@@ -56,13 +85,19 @@ def clear_screen():
     print("Model:  " + model_name)
     print("-----------------------------------------")
 
-def speak(text):
+def speak(text, cache=False):
     if not text or not text.strip(): return
     print(f"\n🤖 AI: {text}")
     try:
-        tts = gTTS(text=text, lang='en')
-        filename = "temp_voice_final.mp3"
-        tts.save(filename)
+        gTTS, pygame = tts_ready.result()   # instant once the background load has finished
+        if cache:
+            os.makedirs(PHRASE_CACHE_DIR, exist_ok=True)
+            filename = os.path.join(PHRASE_CACHE_DIR, hashlib.sha1(text.encode("utf-8")).hexdigest()[:16] + ".mp3")
+        else:
+            filename = "temp_voice_final.mp3"
+        if not (cache and os.path.exists(filename)):
+            tts = gTTS(text=text, lang='en')
+            tts.save(filename)
         pygame.mixer.music.load(filename)
         pygame.mixer.music.play()
         while pygame.mixer.music.get_busy():
@@ -72,7 +107,12 @@ def speak(text):
         print(f"Audio Error: {e}")
 
 def listen():
+    global mic_opened
     with sr.Microphone() as source:
+        if not mic_opened:
+            mic_opened = True
+            profiler.mark("mic ready")
+            profiler.report_when_done()   # once the background init has finished too
         sys.stdout.write("\r🎤 Listening...      ")
         sys.stdout.flush()
         
@@ -96,7 +136,9 @@ def listen():
 
 def main():
     clear_screen()
-    speak("Voice systems online. Ready for inspection.")
+    profiler.mark("banner shown")
+    speak("Voice systems online. Ready for inspection.", cache=True)
+    profiler.mark("greeting spoken")
     
     while True:
         user_text = listen()
@@ -104,11 +146,13 @@ def main():
         if user_text:
             # Handle Exit
             if any(word in user_text.lower() for word in ["exit", "stop", "quit", "terminate"]):
-                speak("Shutting down. Have a good evening.")
+                speak("Shutting down. Have a good evening.", cache=True)
                 break
             
             # Run Agent
             try:
+                agent_executor = agent_ready.result()   # normally built long before the first question
+                from langchain_core.messages import HumanMessage
                 inputs = {"messages": [HumanMessage(content=user_text)]}
                 response = agent_executor.invoke(inputs)
                 
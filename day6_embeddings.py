@@ -1,7 +1,7 @@
 import os
-import numpy as np
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from dotenv import load_dotenv
+from vector_index import VectorIndex
 
 # 1. Setup - Use the key you already created
 load_dotenv()  # Load environment variables from .env file
@@ -36,9 +36,13 @@ query_vector = embeddings.embed_query(query)
 # 5. The Math (Cosine Similarity)
 # This calculates how close the "angles" of the vectors are.
 # 1.0 = Identical meaning, 0.0 = Unrelated
-def cosine_similarity(a, b):
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+# Vectorised: normalise the documents ONCE, then one matrix multiply scores the
+# query against all of them (see bench_vector_index.py for the speedup).
+index = VectorIndex()
+index.add(doc_vectors)
+positions, scores = index.search([query_vector], k=len(documents))
+# search() returns best first; print in the original document order, as before
+score_of = dict(zip(positions[0].tolist(), scores[0].tolist()))
 
-for i, doc_vec in enumerate(doc_vectors):
-    score = cosine_similarity(query_vector, doc_vec)
-    print(f"Score: {score:.4f} | Sentence: {documents[i]}")
\ No newline at end of file
+for i in range(len(documents)):
+    print(f"Score: {score_of[i]:.4f} | Sentence: {documents[i]}")
\ No newline at end of file
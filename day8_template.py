@@ -2,14 +2,17 @@ import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
+from llm_cache import ResponseCache
 
 # 1. Setup the Brain
 # (We use the key directly here to keep it simple for now)
 load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
+# Same prompt + same model = same answer, so re-runs are served from ./llm_cache.sqlite3
 llm = ChatGoogleGenerativeAI(
     google_api_key=api_key, 
-    model="gemini-flash-latest"
+    model="gemini-flash-latest",
+    cache=ResponseCache.sqlite()
 )
 
 # 2. The "Form" (Prompt Template)
@@ -0,0 +1,210 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+# Disk-backed embedding cache shared by the ingest script and the OpsVision apps.
+# Key = (model, kind, sha256(text)). "kind" is document/query because Gemini
+# embeds the two with different task types, so the vectors are not interchangeable.
+
+CACHE_PATH = "./embedding_cache.sqlite3"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB (~170k vectors at 768 dims)
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def embed_queries(embeddings, texts):
+    """
+    Embed many search queries in ONE round trip.
+    Same vectors as calling embed_query() on each text (Gemini needs the RETRIEVAL_QUERY task type).
+    """
+    texts = list(texts)
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if isinstance(embeddings, GoogleGenerativeAIEmbeddings):
+        return embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+    # Models with no query/document distinction
+    return embeddings.embed_documents(texts)
+
+class CachedEmbeddings(Embeddings):
+    """
+    Drop-in wrapper around any LangChain Embeddings (e.g. GoogleGenerativeAIEmbeddings).
+    Vectors are stored as float32 blobs in SQLite, evicted least-recently-used
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, embeddings, path=CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, model_name=None):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, "model", type(embeddings).__name__)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        # One connection shared across threads (the ingest pipeline embeds concurrently)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, kind, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+
+    # --- LangChain interface ---
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts), "document", self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed([text], "query", lambda t: [self.embeddings.embed_query(t[0])])[0]
+
+    def embed_queries(self, texts):
+        """Batch version of embed_query: cached texts are free, the rest go out in one call"""
+        return self._embed(list(texts), "query", lambda t: embed_queries(self.embeddings, t))
+
+    # --- Cache management ---
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def invalidate(self, model_name=None):
+        """Drop every cached vector for a model (defaults to the wrapped one). Returns rows deleted."""
+        model_name = model_name or self.model_name
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model_name,))
+            self._conn.commit()
+            self._total_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Internals ---
+
+    def _embed(self, texts, kind, compute):
+        if not texts:
+            return []
+        hashes = [hash_text(t) for t in texts]
+        found = self._lookup(kind, hashes)
+
+        # Only send each unique missing text once
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+        miss_count = sum(1 for h in hashes if h not in found)
+        with self._lock:
+            self.hits += len(hashes) - miss_count
+            self.misses += miss_count
+
+        if missing:
+            vectors = [array("f", v) for v in compute(list(missing.values()))]
+            new_rows = dict(zip(missing.keys(), vectors))
+            self._store(kind, new_rows)
+            # Hand back the float32 values, so a miss and a later hit return identical vectors
+            found.update((h, v.tolist()) for h, v in new_rows.items())
+
+        return [list(found[h]) for h in hashes]
+
+    def _lookup(self, kind, hashes):
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock:
+            # SQLite caps bound parameters, so query in slices
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND kind = ? AND text_hash IN ({marks})",
+                    [self.model_name, kind, *part]).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+            if found:
+                # Touch for LRU
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND kind = ? AND text_hash = ?",
+                    [(now, self.model_name, kind, h) for h in found])
+                self._conn.commit()
+        return found
+
+    def _store(self, kind, rows):
+        now = time.time()
+        records = []
+        for text_hash, vector in rows.items():
+            blob = vector.tobytes()
+            records.append((self.model_name, kind, text_hash, blob, len(blob), now))
+        with self._lock:
+            for record in records:
+                # IGNORE: another thread may have stored the same text a moment ago
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (model, kind, text_hash, vector, nbytes, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", record)
+                if cur.rowcount:
+                    self._total_bytes += record[4]
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Caller holds the lock. Remove least-recently-used rows until we're under budget.
+        while self._total_bytes > self.max_bytes:
+            candidates = self._conn.execute(
+                "SELECT rowid, nbytes FROM embeddings ORDER BY last_used LIMIT 256").fetchall()
+            if not candidates:
+                self._total_bytes = 0
+                return
+            victims = []
+            for rowid, nbytes in candidates:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                victims.append((rowid,))
+                self._total_bytes -= nbytes
+            self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", victims)
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    import tempfile
+    from ingest_pipeline import FakeEmbeddings
+
+    fake = FakeEmbeddings(size=768, latency=0.05)
+    cache = CachedEmbeddings(fake, path=os.path.join(tempfile.mkdtemp(), "cache.sqlite3"))
+
+    items = ["Server", "Switch", "Ethernet Port"]
+    for scan in range(3):
+        start = time.perf_counter()
+        cache.embed_documents(items)
+        print(f"Scan {scan + 1}: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(cache.stats())
+    print(f"Invalidated {cache.invalidate()} rows")
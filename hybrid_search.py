@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+
+# Lexical (BM25) side of OpsVision's hybrid retrieval.
+# Dense embeddings are weakest on exact strings like "Catalyst 9300" or "C9300-48P",
+# which is exactly what an inverted index is best at. Results from both sides are
+# combined with reciprocal rank fusion (RRF), so the scores never need calibrating.
+
+BM25_PATH = "./chroma_db_opsvision_bm25.json"
+RRF_K = 60
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+def tokenize(text):
+    """Lowercase word tokens. Compound codes are kept whole AND split: c9300-48p -> c9300-48p, c9300, 48p"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+class BM25Index:
+    """Incremental BM25 over chunk IDs. add() replaces a chunk's text, remove() drops it."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_tf = {}                    # chunk_id -> {term: tf}
+        self.doc_len = {}                   # chunk_id -> token count
+        self.postings = defaultdict(dict)   # term -> {chunk_id: tf}
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.doc_tf)
+
+    def add(self, doc_id, text):
+        self.remove([doc_id])
+        tf = Counter(tokenize(text))
+        self.doc_tf[doc_id] = dict(tf)
+        self.doc_len[doc_id] = sum(tf.values())
+        self.total_len += self.doc_len[doc_id]
+        for term, count in tf.items():
+            self.postings[term][doc_id] = count
+
+    def remove(self, doc_ids):
+        for doc_id in doc_ids:
+            tf = self.doc_tf.pop(doc_id, None)
+            if tf is None:
+                continue
+            self.total_len -= self.doc_len.pop(doc_id)
+            for term in tf:
+                posting = self.postings[term]
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, query, k=10):
+        """[(chunk_id, score), ...] best first. Only touches chunks that share a term with the query."""
+        n = len(self.doc_tf)
+        if n == 0:
+            return []
+        avg_len = self.total_len / n
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+    # --- Persistence (postings are rebuilt on load, so only term counts are stored) ---
+
+    def save(self, path=BM25_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "docs": self.doc_tf}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=BM25_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        for doc_id, tf in data["docs"].items():
+            index.doc_tf[doc_id] = tf
+            index.doc_len[doc_id] = sum(tf.values())
+            index.total_len += index.doc_len[doc_id]
+            for term, count in tf.items():
+                index.postings[term][doc_id] = count
+        return index
+
+    @classmethod
+    def from_collection(cls, db, page_size=5000):
+        """Build from an existing Chroma store (for DBs ingested before BM25 existed)"""
+        index = cls()
+        collection = db._collection
+        for start in range(0, collection.count(), page_size):
+            page = collection.get(limit=page_size, offset=start, include=["documents"])
+            for doc_id, text in zip(page["ids"], page["documents"]):
+                index.add(doc_id, text or "")
+        return index
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse several best-first ID lists: score = sum(1 / (k + rank)). Returns IDs best first."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
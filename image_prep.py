@@ -0,0 +1,181 @@
+import io
+import os
+import time
+import base64
+import argparse
+from PIL import Image, ImageOps
+
+# Client-side image preprocessing before vision calls.
+# Phone photos are 4-12 MB and base64 adds another 33%, so on a slow site link the
+# upload dominates scan latency. Gemini downsamples large images anyway, so we:
+#   1. decode at reduced scale where the format allows it (JPEG draft mode: the
+#      full-resolution bitmap is never built)
+#   2. shrink to a max dimension (per use case, see IMAGE_PRESETS)
+#   3. apply the EXIF orientation, then re-encode WITHOUT any metadata (no GPS / camera serials)
+#   4. keep the original only if it is already smaller and has nothing to strip
+
+IMAGE_PRESETS = {
+    "fast": 1024,        # rack overviews on slow links
+    "inventory": 1536,   # default: identify equipment
+    "detail": 3072,      # read labels, serial numbers, port markings
+}
+DEFAULT_MAX_DIM = IMAGE_PRESETS["inventory"]
+DEFAULT_FORMAT = "WEBP"
+DEFAULT_QUALITY = 80
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+class PreparedImage:
+    def __init__(self, data, mime_type, original_bytes, size, original_size, seconds):
+        self.data = data
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.size = size
+        self.original_size = original_size
+        self.seconds = seconds
+
+    def base64(self):
+        return base64.b64encode(self.data).decode("utf-8")
+
+    @property
+    def saved_fraction(self):
+        return 1 - len(self.data) / self.original_bytes if self.original_bytes else 0.0
+
+    def stats(self):
+        return {
+            "original_bytes": self.original_bytes,
+            "sent_bytes": len(self.data),
+            "saved": self.saved_fraction,
+            "original_size": self.original_size,
+            "size": self.size,
+            "prep_seconds": self.seconds,
+        }
+
+    def summary(self):
+        return (f"📦 {format_bytes(self.original_bytes)} → {format_bytes(len(self.data))} "
+                f"({-self.saved_fraction:+.0%}), {self.original_size[0]}x{self.original_size[1]} → "
+                f"{self.size[0]}x{self.size[1]} in {self.seconds * 1000:.0f} ms")
+
+def format_bytes(n):
+    return f"{n / 1e6:.2f} MB" if n >= 1e6 else f"{n / 1e3:.1f} KB"
+
+def _source_size(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    return len(source.getbuffer()) if hasattr(source, "getbuffer") else None
+
+def prepare_image(source, max_dim=DEFAULT_MAX_DIM, format=DEFAULT_FORMAT, quality=DEFAULT_QUALITY):
+    """
+    source: a path, raw bytes, or a file-like object (e.g. a Streamlit UploadedFile).
+    Returns a PreparedImage ready to send to the vision model.
+    """
+    start = time.perf_counter()
+    if isinstance(source, (str, os.PathLike)):
+        # Read once: the small-and-clean passthrough below needs the original bytes again
+        with open(source, "rb") as f:
+            source = f.read()
+    original_bytes = _source_size(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)   # wraps, doesn't copy
+    elif hasattr(source, "seek"):
+        source.seek(0)
+
+    with Image.open(source) as img:
+        original_size = img.size
+        original_format = img.format
+        has_metadata = bool(img.info.get("exif") or img.info.get("icc_profile") or img.info.get("xmp"))
+        # JPEG: let the decoder skip straight to a 1/2, 1/4 or 1/8 scale bitmap
+        img.draft("RGB", (max_dim, max_dim))
+        img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        img = ImageOps.exif_transpose(img)   # small now, so this copy is cheap
+        if format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        out = io.BytesIO()
+        # No exif= / icc_profile= arguments: the re-encoded file carries no metadata
+        img.save(out, format=format, quality=quality, method=4) if format == "WEBP" else \
+            img.save(out, format=format, quality=quality, optimize=True)
+        size = img.size
+
+    data = out.getvalue()
+    mime_type = MIME_TYPES.get(format, f"image/{format.lower()}")
+    # Already small and clean: re-encoding would only cost quality
+    if original_bytes is not None and original_bytes <= len(data) and size == original_size \
+            and not has_metadata and original_format in MIME_TYPES:
+        source.seek(0)
+        data = source.read()
+        mime_type = MIME_TYPES[original_format]
+    return PreparedImage(data, mime_type, original_bytes or len(data), size, original_size,
+                         time.perf_counter() - start)
+
+# --- REPORT CLI ---
+# python image_prep.py photos/*.jpg --max-dim 1536 --mbps 5          (bytes + estimated upload time)
+# python image_prep.py photos/rack.jpg --vision                      (real end-to-end Gemini latency)
+# python image_prep.py                                               (self-check on generated samples)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report bytes saved / latency of image preprocessing")
+    parser.add_argument("paths", nargs="*", help="Images to report on (none: generated samples)")
+    parser.add_argument("--max-dim", type=int, default=DEFAULT_MAX_DIM)
+    parser.add_argument("--format", default=DEFAULT_FORMAT, choices=list(MIME_TYPES))
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY)
+    parser.add_argument("--mbps", type=float, default=5.0, help="Uplink speed for the upload estimate")
+    parser.add_argument("--vision", action="store_true", help="Also time a real vision call, raw vs prepared")
+    args = parser.parse_args()
+
+    def upload_seconds(n_bytes):
+        # base64 inflates the payload by 4/3
+        return n_bytes * 4 / 3 * 8 / (args.mbps * 1e6)
+
+    llm = None
+    if args.vision:
+        from dotenv import load_dotenv
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from opsvision_backend import analyze_image_bytes
+        load_dotenv()
+        llm = ChatGoogleGenerativeAI(google_api_key=os.getenv("GOOGLE_API_KEY"),
+                                     model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"))
+
+    if not args.paths:
+        # A big photo with EXIF (gets resized) and a tiny clean JPEG (passed through as-is),
+        # each fed as a path, as bytes and as a file-like object
+        import tempfile
+        workdir = tempfile.mkdtemp()
+        big = Image.effect_noise((4000, 3000), 40).convert("RGB")
+        exif = Image.Exif()
+        exif[0x0112] = 6   # orientation: rotate 90
+        big.save(os.path.join(workdir, "big_exif.jpg"), quality=90, exif=exif)
+        Image.effect_noise((64, 64), 60).convert("RGB").save(os.path.join(workdir, "small_clean.jpg"), quality=5)
+        args.paths = [os.path.join(workdir, name) for name in ("big_exif.jpg", "small_clean.jpg")]
+        for path in args.paths:
+            with open(path, "rb") as f:
+                raw = f.read()
+            results = [prepare_image(path, args.max_dim), prepare_image(raw, args.max_dim),
+                       prepare_image(io.BytesIO(raw), args.max_dim)]
+            assert len({(r.data, r.mime_type, r.size) for r in results}) == 1, path
+            if path.endswith("small_clean.jpg"):
+                assert results[0].data == raw, "small clean JPEG should be passed through untouched"
+            print(f"self-check {os.path.basename(path)}: path / bytes / file-like agree -> {results[0].size}")
+
+    print(f"--- max {args.max_dim}px, {args.format} q{args.quality}, {args.mbps:g} Mbps uplink ---")
+    total_in = total_out = 0
+    for path in args.paths:
+        prepared = prepare_image(path, args.max_dim, args.format, args.quality)
+        total_in += prepared.original_bytes
+        total_out += len(prepared.data)
+        print(f"{os.path.basename(path)}: {prepared.summary()} | upload "
+              f"{upload_seconds(prepared.original_bytes):.2f}s → {upload_seconds(len(prepared.data)):.2f}s")
+        if llm is not None:
+            with open(path, "rb") as f:
+                raw = f.read()
+            start = time.perf_counter()
+            analyze_image_bytes(llm, raw, Image.MIME.get(Image.open(path).format, "image/jpeg"))
+            raw_s = time.perf_counter() - start
+            start = time.perf_counter()
+            again = prepare_image(path, args.max_dim, args.format, args.quality)
+            analyze_image_bytes(llm, again.data, again.mime_type)
+            prep_s = time.perf_counter() - start
+            print(f"   end-to-end vision call: raw {raw_s:.2f}s | prepared {prep_s:.2f}s (incl. prep)")
+    if total_in:
+        print(f"--- TOTAL: {format_bytes(total_in)} → {format_bytes(total_out)} "
+              f"({total_out / total_in - 1:+.0%}) ---")
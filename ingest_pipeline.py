@@ -0,0 +1,150 @@
+import time
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from langchain_core.embeddings import Embeddings
+
+# Embedding stage for day21_ingest.py:
+# chunks -> fixed-size batches -> N embedding calls in flight -> bulk upsert into Chroma
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_CONCURRENCY = 4
+
+class ProgressCounter:
+    """Tracks chunks written and throughput (chunks/sec)"""
+
+    def __init__(self, total=None, label="Embedded"):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.batches = 0
+        self.start = time.perf_counter()
+
+    def update(self, n):
+        self.done += n
+        self.batches += 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def rate(self):
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def line(self):
+        total = f"/{self.total}" if self.total is not None else ""
+        return f"{self.label} {self.done}{total} chunks | {self.rate:.1f} chunks/sec"
+
+    def print(self, end="\r"):
+        print(self.line() + "   ", end=end, flush=True)
+
+def batched(items, batch_size):
+    """Group any iterable into lists of batch_size (works on generators, never loads it all)"""
+    it = iter(items)
+    while True:
+        batch = list(itertools.islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def make_chunk_id(source, text, ordinal=0):
+    """
+    Stable ID from the chunk's content, not its position: inserting a paragraph only adds
+    the chunks it changed, and every other chunk keeps its ID (and its vector).
+    ordinal tells identical chunks in the same file apart (2nd copy -> #1, ...).
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"{source}::{digest}" + (f"#{ordinal}" if ordinal else "")
+
+def upsert_vectors(db, ids, docs, vectors):
+    """Write pre-computed vectors straight into the Chroma collection (no re-embedding)"""
+    db._collection.upsert(
+        ids=ids,
+        embeddings=vectors,
+        documents=[d.page_content for d in docs],
+        metadatas=[d.metadata or None for d in docs],
+    )
+
+def embed_and_upsert(db, embeddings, items, batch_size=DEFAULT_BATCH_SIZE,
+                     max_concurrency=DEFAULT_CONCURRENCY, total=None, progress=None):
+    """
+    Embed (chunk_id, Document) pairs in batches with at most max_concurrency
+    embedding calls in flight, and upsert each batch as soon as it finishes.
+    Returns the ProgressCounter.
+    """
+    progress = progress or ProgressCounter(total=total)
+    already_done = progress.done
+
+    def embed_batch(batch):
+        ids = [chunk_id for chunk_id, _ in batch]
+        docs = [doc for _, doc in batch]
+        vectors = embeddings.embed_documents([d.page_content for d in docs])
+        return ids, docs, vectors
+
+    def drain(done):
+        # Chroma writes stay on this thread; only the network calls run in the pool
+        for future in done:
+            ids, docs, vectors = future.result()
+            upsert_vectors(db, ids, docs, vectors)
+            progress.update(len(ids))
+            progress.print()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        in_flight = set()
+        for batch in batched(items, batch_size):
+            # Bounded: don't read further ahead than the pool can work on
+            if len(in_flight) >= max_concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                drain(done)
+            in_flight.add(pool.submit(embed_batch, batch))
+        drain(in_flight)
+
+    if progress.done > already_done:
+        progress.print(end="\n")
+    return progress
+
+class FakeEmbeddings(Embeddings):
+    """
+    Offline stand-in for GoogleGenerativeAIEmbeddings.
+    Deterministic vectors + artificial per-call latency, so the pipeline can be
+    tested and benchmarked without an API key.
+    """
+
+    def __init__(self, size=768, latency=0.2):
+        self.size = size
+        self.latency = latency
+        self.calls = 0
+
+    def _vector(self, text):
+        seed = hashlib.sha256(text.encode("utf-8")).digest()
+        raw = (seed * (self.size // len(seed) + 1))[:self.size]
+        return [b / 255.0 - 0.5 for b in raw]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+# --- TEST BLOCK ---
+# Compares a serial pass against the concurrent pipeline using the fake embedder
+if __name__ == "__main__":
+    import tempfile
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+
+    docs = [Document(page_content=f"Manual chunk {i}: rack unit spec", metadata={"source": "bench.txt"})
+            for i in range(1000)]
+    items = [(f"bench.txt::{i}", d) for i, d in enumerate(docs)]
+
+    for concurrency in [1, 4, 8]:
+        fake = FakeEmbeddings(size=64, latency=0.1)
+        db = Chroma(persist_directory=tempfile.mkdtemp(), embedding_function=fake)
+        print(f"--- CONCURRENCY {concurrency} ---")
+        stats = embed_and_upsert(db, fake, items, batch_size=50,
+                                 max_concurrency=concurrency, total=len(items))
+        print(f"{stats.elapsed:.2f}s, {fake.calls} embedding calls, "
+              f"{db._collection.count()} vectors in DB")
@@ -0,0 +1,305 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import warnings
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+# Exact-match response cache for Gemini calls, shared by
+#   - LangChain chat models:   ChatGoogleGenerativeAI(..., cache=ResponseCache.sqlite())
+#   - the google.genai client: cached_generate_content(client, cache, model=..., contents=...)
+#                              (and cached_generate_content_stream() for token streaming)
+# Key = sha256(model + generation config + normalized contents). Normalized means
+# inline media (base64 data URLs, raw bytes) is replaced by its sha256, uploaded files
+# by their content hash, and leading/trailing whitespace is stripped, so the key is small
+# and the same image hits no matter how it was encoded. Whitespace INSIDE a prompt is kept:
+# code, tables and YAML that differ only in indentation are different questions.
+
+LLM_CACHE_PATH = "./llm_cache.sqlite3"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024   # SQLite backend
+DEFAULT_MAX_ENTRIES = 1000              # in-memory backend
+
+DATA_URL_RE = re.compile(r"data:([\w.+-]+/[\w.+-]+);base64,([A-Za-z0-9+/=]+)")
+
+_bypass = ContextVar("llm_cache_bypass", default=False)
+
+@contextmanager
+def skip_cache():
+    """Per-call opt-out: calls made inside this block neither read nor write the cache"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+def sha256(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def normalize_text(text):
+    """Strip surrounding whitespace and swap inline base64 media for its hash"""
+    text = DATA_URL_RE.sub(lambda m: f"media:{m.group(1)}:{sha256(m.group(2))}", text)
+    return text.strip()
+
+def make_key(model, contents, config=None):
+    return sha256(json.dumps([model, contents, config], sort_keys=True, default=str))
+
+# --- Backends: get/put raw strings, evict least-recently-used ---
+
+class MemoryBackend:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteBackend:
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, value):
+        nbytes = len(value.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT nbytes FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, nbytes, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, nbytes, time.time()))
+            self._total_bytes += nbytes - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _evict(self):
+        # Caller holds the lock
+        while self._total_bytes > self.max_bytes:
+            candidates = self._conn.execute(
+                "SELECT key, nbytes FROM responses ORDER BY last_used LIMIT 64").fetchall()
+            if not candidates:
+                self._total_bytes = 0
+                return
+            victims = []
+            for key, nbytes in candidates:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                victims.append((key,))
+                self._total_bytes -= nbytes
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+# --- The cache (LangChain BaseCache + google.genai helper) ---
+
+class ResponseCache(BaseCache):
+    """Exact-match response cache over a MemoryBackend or SQLiteBackend"""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def memory(cls, max_entries=DEFAULT_MAX_ENTRIES):
+        return cls(MemoryBackend(max_entries))
+
+    @classmethod
+    def sqlite(cls, path=LLM_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        return cls(SQLiteBackend(path, max_bytes))
+
+    def get(self, key):
+        if _bypass.get():
+            return None
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not _bypass.get():
+            self.backend.put(key, value)
+
+    # LangChain passes the serialized messages as `prompt` and the model + params as `llm_string`
+
+    def lookup(self, prompt, llm_string):
+        value = self.get(make_key(llm_string, normalize_text(prompt)))
+        if value is None:
+            return None
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            return loads(value)
+
+    def update(self, prompt, llm_string, return_val):
+        self.put(make_key(llm_string, normalize_text(prompt)), dumps(return_val))
+
+    def clear(self, **kwargs):
+        self.backend.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate,
+                "entries": len(self.backend)}
+
+def normalize_genai_contents(contents):
+    """JSON-able, media-hashed version of a generate_content `contents` argument"""
+    from google.genai import types
+
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    out = []
+    for item in contents:
+        if isinstance(item, str):
+            out.append(normalize_text(item))
+        elif isinstance(item, (bytes, bytearray, memoryview)):
+            out.append({"bytes": sha256(bytes(item))})
+        elif isinstance(item, types.File):
+            # Re-uploads of the same video get a new name but keep the same content hash
+            out.append({"file": item.sha256_hash or item.uri or item.name, "mime": item.mime_type})
+        elif isinstance(item, types.Part):
+            if item.inline_data is not None:
+                out.append({"bytes": sha256(item.inline_data.data), "mime": item.inline_data.mime_type})
+            elif item.text is not None:
+                out.append(normalize_text(item.text))
+            else:
+                out.append(item.model_dump(mode="json", exclude_none=True))
+        elif isinstance(item, types.Content):
+            out.append({"role": item.role, "parts": normalize_genai_contents(item.parts or [])})
+        else:
+            out.append(normalize_text(str(item)))
+    return out
+
+def cached_generate_content(client, cache, model, contents, config=None, use_cache=True):
+    """
+    client.models.generate_content() through a ResponseCache.
+    Returns a types.GenerateContentResponse either way (use_cache=False skips the cache).
+    """
+    from google.genai import types
+
+    if cache is None or not use_cache:
+        return client.models.generate_content(model=model, contents=contents, config=config)
+
+    config_json = config.model_dump(mode="json", exclude_none=True) if config is not None else None
+    key = make_key(model, normalize_genai_contents(contents), config_json)
+    cached = cache.get(key)
+    if cached is not None:
+        return types.GenerateContentResponse.model_validate_json(cached)
+
+    response = client.models.generate_content(model=model, contents=contents, config=config)
+    if response.text:  # don't pin blocked / empty answers
+        cache.put(key, response.model_dump_json(exclude_none=True))
+    return response
+
+def cached_generate_content_stream(client, cache, model, contents, config=None, use_cache=True):
+    """
+    Streaming version: yields response chunks from client.models.generate_content_stream().
+    A cache hit is yielded as a single chunk; a fully streamed answer is stored for next time.
+    """
+    from google.genai import types
+
+    if cache is None or not use_cache:
+        yield from client.models.generate_content_stream(model=model, contents=contents, config=config)
+        return
+
+    config_json = config.model_dump(mode="json", exclude_none=True) if config is not None else None
+    key = make_key(model, normalize_genai_contents(contents), config_json)
+    cached = cache.get(key)
+    if cached is not None:
+        yield types.GenerateContentResponse.model_validate_json(cached)
+        return
+
+    parts = []
+    for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+        if chunk.text:
+            parts.append(chunk.text)
+        yield chunk
+    if parts:
+        # Same shape generate_content() would have returned, so both paths share the entry
+        full = types.GenerateContentResponse(candidates=[types.Candidate(
+            content=types.Content(role="model", parts=[types.Part(text="".join(parts))]))])
+        cache.put(key, full.model_dump_json(exclude_none=True))
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    import tempfile
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from langchain_core.messages import HumanMessage
+
+    for cache in [ResponseCache.memory(),
+                  ResponseCache.sqlite(os.path.join(tempfile.mkdtemp(), "llm.sqlite3"))]:
+        llm = FakeListChatModel(responses=["Server, Switch, Cables", "Second answer"], cache=cache)
+        image = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk"
+        msg = HumanMessage(content=[
+            {"type": "text", "text": "Identify the equipment."},
+            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image}"}},
+        ])
+        print(type(cache.backend).__name__)
+        print("  1st:", llm.invoke([msg]).content)
+        print("  2nd:", llm.invoke([msg]).content, "(cached)")
+        with skip_cache():
+            print("  opt-out:", llm.invoke([msg]).content)
+        print(" ", cache.stats())
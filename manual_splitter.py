@@ -0,0 +1,270 @@
+import re
+from langchain_core.documents import Document
+
+# Structure-aware splitter for equipment manuals.
+# CharacterTextSplitter(500) cuts wherever the 500th character falls, which is often
+# the middle of a spec table (the values end up in a chunk without their header or
+# device name). This splitter parses the text into headings, tables, lists and
+# paragraphs first, then packs whole blocks into chunks sized in model tokens:
+#   - a new section starts a new chunk (unless the current one is still tiny)
+#   - tables are only split between rows, and every piece repeats the header row
+#   - lists are only split between items, paragraphs between sentences
+#   - each chunk carries its heading breadcrumb ("Catalyst 9300 > Specifications > Power")
+#     in its text (so it embeds with context) and in metadata["section"]
+
+DEFAULT_MAX_TOKENS = 200
+DEFAULT_MIN_TOKENS = 40
+
+TOKEN_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text):
+    """
+    Offline token estimate for Gemini-style subword tokenizers:
+    punctuation = 1, words = 1 per ~4 characters. Pass an exact counter
+    as ManualSplitter(length_function=...) if you have one.
+    """
+    return sum((len(piece) + 3) // 4 for piece in TOKEN_PIECE_RE.findall(text))
+
+# --- Line / block classification ---
+
+MD_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+)$")
+NUMBERED_HEADING_RE = re.compile(r"^(\d+(?:\.\d+)*)[.)]?\s+([A-Z].{0,78})$")
+KEYWORD_HEADING_RE = re.compile(r"^(?:section|chapter|appendix|part)\s+[\w.]+\b.{0,70}$", re.IGNORECASE)
+UNDERLINE_RE = re.compile(r"^(=+|-+)\s*$")
+LIST_ITEM_RE = re.compile(r"^\s*(?:[-*•+]|\d+[.)]|[a-zA-Z][.)])\s+\S")
+TABLE_ROW_RE = re.compile(r"\||\t|\S {2,}\S|^\s*[\w ()/.+-]{1,40}:\s+\S")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+
+def heading_level(line, next_line=""):
+    """Heading depth (1 = top) or 0 if the line is not a heading"""
+    line = line.strip()
+    if not line or len(line) > 80 or "|" in line or "\t" in line:
+        return 0
+    m = MD_HEADING_RE.match(line)
+    if m:
+        return len(m.group(1))
+    if UNDERLINE_RE.match(next_line.strip()) and next_line.strip():
+        return 1 if next_line.strip()[0] == "=" else 2
+    if line[-1] in ".;,":
+        return 0
+    m = NUMBERED_HEADING_RE.match(line)
+    if m:
+        # "3. Installation" is a heading, "1. Remove the cover" followed by "2. ..." is a list
+        number = m.group(1).split(".")[-1]
+        next_number = re.match(r"^\s*(\d+)[.)]\s", next_line)
+        continues_list = (next_line[:1].isspace() and next_line.strip()) or \
+            (next_number and int(next_number.group(1)) == int(number) + 1)
+        return m.group(1).count(".") + 1 if len(line.split()) <= 6 and not continues_list else 0
+    if KEYWORD_HEADING_RE.match(line):
+        return 1
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and line.upper() == line and len(line.split()) <= 8:
+        return 1
+    if line.endswith(":") and len(line.split()) <= 6 and not TABLE_ROW_RE.search(line[:-1] + " x"):
+        return 3
+    return 0
+
+def clean_heading(line):
+    m = MD_HEADING_RE.match(line.strip())
+    return (m.group(2) if m else line).strip().rstrip(":")
+
+def classify_block(lines):
+    """'table', 'list' or 'paragraph' for a run of non-blank lines"""
+    if len(lines) >= 2:
+        if sum(1 for l in lines if TABLE_ROW_RE.search(l)) >= 0.6 * len(lines):
+            return "table"
+        if LIST_ITEM_RE.match(lines[0]) and \
+                sum(1 for l in lines if LIST_ITEM_RE.match(l)) >= 0.5 * len(lines):
+            return "list"
+    elif LIST_ITEM_RE.match(lines[0]):
+        return "list"
+    return "paragraph"
+
+def parse_structure(text):
+    """
+    Yield (heading_path, kind, lines) blocks in document order.
+    heading_path is a tuple of heading titles; kind is heading/table/list/paragraph.
+    """
+    path = []   # [(level, title)]
+    block = []
+    lines = text.splitlines()
+    first_line = next((i for i, l in enumerate(lines) if l.strip()), 0)
+
+    def flush():
+        if block:
+            kind = classify_block(block)
+            yield tuple(t for _, t in path), kind, list(block)
+            block.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].rstrip()
+        next_line = lines[i + 1] if i + 1 < len(lines) else ""
+        if not line.strip():
+            yield from flush()
+            i += 1
+            continue
+        # Headings only start a block (a short line INSIDE a table or list is data)
+        level = heading_level(line, next_line) if not block or classify_block(block) == "paragraph" else 0
+        # A short first line is the document title ("Catalyst 9300 Manual"): the root of every path
+        is_title = i == first_line and len(line) <= 80 and line[-1] not in ".;,:" and not LIST_ITEM_RE.match(line)
+        if not level and not is_title:
+            block.append(line)
+            i += 1
+            continue
+        yield from flush()
+        level = 0 if is_title else level
+        while path and path[-1][0] >= level:
+            path.pop()
+        path.append((level, clean_heading(line)))
+        yield tuple(t for _, t in path), "heading", [line]
+        i += 2 if UNDERLINE_RE.match(next_line.strip()) and next_line.strip() else 1
+    yield from flush()
+
+# --- Splitting oversized blocks into units ---
+
+def block_units(kind, lines):
+    """Smallest pieces a block may be cut into (each a list of lines). Tables: [header, row, ...]"""
+    if kind == "table":
+        rows = [[l] for l in lines]
+        # A label row ("| Parameter | Value |") is the header; otherwise there is none
+        if len(rows) > 1 and not any(c.isdigit() for c in lines[0]):
+            return rows
+        return [[]] + rows
+    if kind == "list":
+        items = []
+        for l in lines:
+            if LIST_ITEM_RE.match(l) or not items:
+                items.append([l])
+            else:
+                items[-1].append(l)   # wrapped continuation of the previous item
+        return items
+    text = " ".join(l.strip() for l in lines)
+    return [[s] for s in SENTENCE_END_RE.split(text) if s]
+
+class ManualSplitter:
+    """Drop-in for CharacterTextSplitter.split_documents(), sized in tokens"""
+
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, min_tokens=DEFAULT_MIN_TOKENS,
+                 length_function=estimate_tokens, breadcrumbs=True):
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.length_function = length_function
+        self.breadcrumbs = breadcrumbs
+
+    @property
+    def signature(self):
+        """Changes whenever the chunking would (stored in the ingest manifest)"""
+        return f"manual-v2:{self.max_tokens}:{self.min_tokens}:{int(self.breadcrumbs)}"
+
+    def split_documents(self, docs):
+        chunks = []
+        for doc in docs:
+            for text, section in self._split(doc.page_content):
+                metadata = dict(doc.metadata)
+                metadata["section"] = section
+                chunks.append(Document(page_content=text, metadata=metadata))
+        return chunks
+
+    def split_text(self, text):
+        return [text for text, _ in self._split(text)]
+
+    def _crumb(self, path):
+        return " > ".join(path) if self.breadcrumbs and path else ""
+
+    def _split(self, text):
+        chunks = []     # (text, section)
+        blocks = []     # current chunk: [(kind, joiner, lines)]
+        path = ()       # heading path the current chunk belongs to
+        tokens = 0
+
+        def flush():
+            nonlocal blocks, tokens
+            if blocks:
+                parts = []
+                for i, (kind, joiner, lines) in enumerate(blocks):
+                    sep = "\n" if i and blocks[i - 1][0] == "heading" else "\n\n"
+                    parts.append((sep if parts else "") + joiner.join(lines))
+                body = "".join(parts).strip()
+                # The chunk's own heading is already in the text when it opens with it
+                opens_with_heading = blocks[0][0] == "heading"
+                prefix = self._crumb(path[:-1] if opens_with_heading else path)
+                chunks.append((f"{prefix}\n{body}" if prefix else body, self._crumb(path)))
+            blocks, tokens = [], 0
+
+        def begin(new_path):
+            nonlocal path, tokens
+            path = new_path
+            tokens = self.length_function(self._crumb(new_path))
+
+        def append(kind, joiner, lines, n):
+            nonlocal tokens
+            if not blocks:
+                begin(section)
+            blocks.append((kind, joiner, list(lines)))
+            tokens += n
+            return blocks[-1][2]
+
+        for section, kind, lines in parse_structure(text):
+            size = self.length_function("\n".join(lines))
+
+            if kind == "heading":
+                # New section: close the chunk unless it is still too small to stand alone
+                has_body = any(b[0] != "heading" for b in blocks)
+                if has_body and tokens >= self.min_tokens:
+                    flush()
+                append(kind, "\n", lines, size)
+                continue
+
+            if blocks and tokens + size <= self.max_tokens:
+                append(kind, "\n", lines, size)
+                continue
+            has_body = any(b[0] != "heading" for b in blocks)
+            if (has_body or not blocks) and size + self.length_function(self._crumb(section)) <= self.max_tokens:
+                flush()
+                append(kind, "\n", lines, size)
+                continue
+
+            # Oversized block, or pending headings that must not become a chunk of their own:
+            # pack its units, repeating a table's header row in every piece
+            joiner = " " if kind == "paragraph" else "\n"
+            units = block_units(kind, lines)
+            header = units.pop(0) if kind == "table" else []
+            header_size = self.length_function("\n".join(header)) if header else 0
+            piece = None
+            for unit in units:
+                unit_size = self.length_function(joiner.join(unit))
+                if piece is None or tokens + unit_size > self.max_tokens:
+                    # Headings alone are never flushed: they open the first piece even if it runs over
+                    has_body = any(b[0] != "heading" for b in blocks)
+                    if has_body and (piece is not None or tokens + header_size + unit_size > self.max_tokens):
+                        flush()
+                    piece = append(kind, joiner, header, header_size)
+                piece.extend(unit)
+                tokens += unit_size
+        flush()
+        return chunks
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    sample = """# Cisco Catalyst 9300 Manual
+
+1. Overview
+The Catalyst 9300 is a stackable enterprise access switch. It supports up to 8 switches per stack.
+
+2. Specifications
+| Parameter | Value |
+| Ports | 48x 1G RJ45 |
+| Uplinks | 4x 10G SFP+ |
+| Power supply | 715W AC |
+| Max PoE budget | 1800 W |
+
+3. Installation
+- Mount the switch in a 19-inch rack.
+- Connect the stack cables before powering on.
+- Insert the power supply until it clicks.
+"""
+    splitter = ManualSplitter(max_tokens=60, min_tokens=10)
+    for chunk in splitter.split_documents([Document(page_content=sample, metadata={"source": "c9300.txt"})]):
+        print(f"--- [{chunk.metadata['section']}] {estimate_tokens(chunk.page_content)} tokens ---")
+        print(chunk.page_content)
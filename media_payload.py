@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import base64
+import hashlib
+import binascii
+import argparse
+import mimetypes
+import subprocess
+
+# Media payloads for the audio / multimodal scripts (day16_audio.py, day18_jarvis.py).
+# The old pattern
+#     data = base64.b64encode(f.read()).decode('utf-8')          # raw + b64 bytes + b64 str
+#     {"image_url": {"url": f"data:{mime};base64,{data}"}}       # + the data URL
+# holds a recording in memory four times, and LangChain then regex-parses the URL and
+# base64-decodes it straight back to bytes. Instead, media_part() picks:
+#   - small files: a "media" part carrying the raw bytes (read once, no base64 on our side;
+#     the SDK encodes once when it serializes the request)
+#   - above inline_limit: a Files API upload, streamed from disk by the SDK, and the part
+#     just references the file URI. Handles are cached by content hash (upload_registry.
+#     UploadRegistry, shared with the video uploads), so the same recording is only
+#     uploaded once while the remote file is still alive.
+# iter_base64() streams base64 in fixed chunks off one reused memoryview buffer, for
+# callers that must produce the text themselves (e.g. writing a JSON request body to a socket).
+#
+# Benchmark: python media_payload.py --sizes 1 100 1000      (MB; peak RSS + build time per mode)
+
+INLINE_LIMIT = 14 * 1024 * 1024      # raw bytes; base64 (x4/3) must stay under Gemini's 20 MB request cap
+CHUNK_SIZE = 3 * 1024 * 1024         # multiple of 3: every chunk base64-encodes without padding
+HANDLE_CACHE_PATH = "./media_handles.sqlite3"
+EXPIRY_MARGIN = 3600                 # seconds; re-upload when a remote file is this close to expiring
+
+MIME_OVERRIDES = {".m4a": "audio/mp4"}   # Windows Voice Recorder files guess wrong
+
+def guess_mime_type(path, fallback="audio/mp3"):
+    ext = os.path.splitext(path)[1].lower()
+    return MIME_OVERRIDES.get(ext) or mimetypes.guess_type(path)[0] or fallback
+
+def _iter_chunks(source, chunk_size):
+    """Yield memoryview slices of ONE reused buffer (valid only until the next chunk)"""
+    f = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            n = f.readinto(view)
+            if not n:
+                break
+            yield view[:n]
+    finally:
+        if f is not source:
+            f.close()
+
+def file_sha256(source, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    for chunk in _iter_chunks(source, chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def iter_base64(source, chunk_size=CHUNK_SIZE):
+    """Base64 of a file/stream as a sequence of bytes chunks; peak memory ~2 chunks, not 4 files"""
+    chunk_size -= chunk_size % 3
+    for chunk in _iter_chunks(source, chunk_size):
+        yield binascii.b2a_base64(chunk, newline=False)
+
+_default_handles = None
+
+def _handle_cache():
+    """Process-wide upload registry for media: no local copies, refreshes re-read the original file"""
+    global _default_handles
+    if _default_handles is None:
+        from upload_registry import UploadRegistry, GenaiFilesAPI   # imports this module
+        _default_handles = UploadRegistry(GenaiFilesAPI(), path=HANDLE_CACHE_PATH, store_dir=None,
+                                          refresh_margin=EXPIRY_MARGIN)
+    return _default_handles
+
+def upload_media(path, mime_type=None, handles=None):
+    """Files API upload (skipped if this exact content is already up there). Returns the ACTIVE remote file."""
+    handles = handles if handles is not None else _handle_cache()
+    remote = handles.ensure(path, mime_type or guess_mime_type(path))
+    try:
+        return handles.wait_active(remote)
+    except ValueError:
+        raise ValueError(f"Files API processing failed for {path}")
+
+def media_part(path, mime_type=None, inline_limit=INLINE_LIMIT, handles=None):
+    """LangChain content part for a local media file: inline bytes when small, a Files API URI when large"""
+    mime_type = mime_type or guess_mime_type(path)
+    if os.path.getsize(path) <= inline_limit:
+        with open(path, "rb") as f:
+            # readall() sizes the buffer from fstat: one exact allocation, no base64 copy here
+            return {"type": "media", "mime_type": mime_type, "data": f.read()}
+    remote = upload_media(path, mime_type, handles=handles)
+    return {"type": "media", "mime_type": remote.mime_type, "file_uri": remote.uri}
+
+# --- BENCHMARK ---
+# Each (mode, size) runs in a fresh process so ru_maxrss is that mode's own peak.
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024   # bytes on macOS, KB on Linux
+
+def _measure(mode, path):
+    if mode == "files-api":
+        # Module imports (google.genai) are a one-off cost, not part of each reuse
+        from upload_registry import UploadRegistry, GenaiFilesAPI
+        from google.genai import types
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "legacy":
+        with open(path, "rb") as f:
+            data = base64.b64encode(f.read()).decode("utf-8")
+        part = {"type": "image_url", "image_url": {"url": f"data:{guess_mime_type(path)};base64,{data}"}}
+    elif mode == "chunked-b64":
+        with open(os.devnull, "wb") as sink:   # stands in for a streamed request body
+            for chunk in iter_base64(path):
+                sink.write(chunk)
+        part = None
+    elif mode == "media-inline":
+        part = media_part(path, inline_limit=float("inf"))
+    elif mode == "files-api":
+        # Network excluded: content hash + handle cache hit, i.e. the cost paid on every reuse
+        handles = UploadRegistry(GenaiFilesAPI(), path=None, store_dir=None)
+        digest = handles.digest(path)   # hashed once here; media_part() below reuses it via (size, mtime)
+        handles._put(digest, {"name": "files/bench", "uri": "https://example/files/bench",
+                              "mime_type": "audio/mp4", "state": "ACTIVE", "expires": None})
+        part = media_part(path, inline_limit=0, handles=handles)
+    seconds = time.perf_counter() - start
+    print(json.dumps({"seconds": seconds, "peak_mb": _peak_rss_mb(), "baseline_mb": baseline}))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak RSS / build time of media payload strategies")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000], help="Input sizes in MB")
+    parser.add_argument("--modes", nargs="+", default=["legacy", "chunked-b64", "media-inline", "files-api"])
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure(*args.measure)
+        sys.exit(0)
+
+    import tempfile
+    workdir = tempfile.mkdtemp()
+    print(f"{'size':>8} | {'mode':<13} | {'build time':>10} | {'peak RSS':>9} | {'over baseline':>13}")
+    for size_mb in args.sizes:
+        path = os.path.join(workdir, f"bench_{size_mb}mb.m4a")
+        with open(path, "wb") as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size_mb):
+                f.write(block)
+        for mode in args.modes:
+            proc = subprocess.run([sys.executable, __file__, "--measure", mode, path],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                reason = "killed (OOM?)" if proc.returncode < 0 else proc.stderr.strip().splitlines()[-1]
+                print(f"{size_mb:>6}MB | {mode:<13} | {reason}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{size_mb:>6}MB | {mode:<13} | {r['seconds']:>9.2f}s | {r['peak_mb']:>7.0f}MB | "
+                  f"{r['peak_mb'] - r['baseline_mb']:>11.0f}MB")
+        os.remove(path)
@@ -0,0 +1,172 @@
+import numpy as np
+from typing import Any, Optional
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from vector_index import normalize, top_k
+
+# Metadata pre-filtering for vector search.
+# One bitmap per (field, kind, value) answers Chroma-style filters ({"department": "IT"},
+# $eq / $ne / $in / $nin / $and / $or) with a few vectorised boolean ops, BEFORE any
+# vector is scored. Small candidate sets are then scored exactly, so a selective
+# filter can never come back with fewer than k hits the way HNSW-then-filter can.
+# Bitmaps are numpy bool rows (1 byte per vector per value): fine for the
+# low-cardinality fields we filter on (department, year, dept).
+# The value's kind is part of the key: Python hashes True == 1 == 1.0 alike, but Chroma keeps
+# booleans apart from numbers ({"active": 1} never matches True, while 1 and 1.0 are equal).
+
+# At or below this many candidates, skip the ANN index and score the subset exactly
+EXACT_THRESHOLD = 5000
+
+def _key(field, value):
+    kind = "bool" if isinstance(value, bool) else "str" if isinstance(value, str) else "number"
+    return field, kind, value
+
+class MetadataIndex:
+    """Bitmaps over row positions. Position i = the i-th ID in self.ids."""
+
+    def __init__(self, capacity=1024):
+        self.ids = []
+        self.bitmaps = {}   # (field, "bool" / "number" / "str", value) -> bool array
+        self._capacity = capacity
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _grow(self):
+        self._capacity *= 2
+        for key, bits in self.bitmaps.items():
+            grown = np.zeros(self._capacity, dtype=bool)
+            grown[:len(bits)] = bits
+            self.bitmaps[key] = grown
+
+    def add(self, doc_id, metadata):
+        position = len(self.ids)
+        if position >= self._capacity:
+            self._grow()
+        self.ids.append(doc_id)
+        for field, value in (metadata or {}).items():
+            if isinstance(value, (str, int, float, bool)):
+                key = _key(field, value)
+                bits = self.bitmaps.get(key)
+                if bits is None:
+                    bits = self.bitmaps[key] = np.zeros(self._capacity, dtype=bool)
+                bits[position] = True
+        return position
+
+    @classmethod
+    def from_documents(cls, docs):
+        index = cls(capacity=max(1024, len(docs)))
+        for doc in docs:
+            index.add(doc.id, doc.metadata)
+        return index
+
+    @classmethod
+    def from_collection(cls, db, page_size=5000):
+        """Index the metadata of an existing Chroma store (metadata only, no vectors are read)"""
+        collection = db._collection
+        index = cls(capacity=max(1024, collection.count()))
+        for start in range(0, collection.count(), page_size):
+            page = collection.get(limit=page_size, offset=start, include=["metadatas"])
+            for doc_id, meta in zip(page["ids"], page["metadatas"]):
+                index.add(doc_id, meta)
+        return index
+
+    # --- Filter resolution ---
+
+    def _value_mask(self, field, value):
+        bits = self.bitmaps.get(_key(field, value))
+        return bits[:len(self.ids)] if bits is not None else np.zeros(len(self.ids), dtype=bool)
+
+    def _field_mask(self, field, condition):
+        if not isinstance(condition, dict):
+            return self._value_mask(field, condition)
+        masks = []
+        for op, value in condition.items():
+            if op == "$eq":
+                masks.append(self._value_mask(field, value))
+            elif op == "$ne":
+                masks.append(~self._value_mask(field, value))
+            elif op == "$in":
+                masks.append(np.logical_or.reduce([self._value_mask(field, v) for v in value])
+                             if value else np.zeros(len(self.ids), dtype=bool))
+            elif op == "$nin":
+                masks.append(~np.logical_or.reduce([self._value_mask(field, v) for v in value])
+                             if value else np.ones(len(self.ids), dtype=bool))
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return np.logical_and.reduce(masks)
+
+    def mask(self, where):
+        """Boolean row mask for a Chroma-style filter"""
+        if not where:
+            return np.ones(len(self.ids), dtype=bool)
+        masks = []
+        for key, condition in where.items():
+            if key == "$and":
+                masks.append(np.logical_and.reduce([self.mask(c) for c in condition]))
+            elif key == "$or":
+                masks.append(np.logical_or.reduce([self.mask(c) for c in condition]))
+            else:
+                masks.append(self._field_mask(key, condition))
+        return np.logical_and.reduce(masks)
+
+    def positions(self, where):
+        return np.flatnonzero(self.mask(where))
+
+    def ids_matching(self, where):
+        return [self.ids[p] for p in self.positions(where)]
+
+def prefiltered_search(db, index, query, k=4, filter=None, exact_threshold=EXACT_THRESHOLD):
+    """
+    Filtered similarity search on a Chroma store:
+    resolve the filter with the bitmaps first, then
+      - small candidate set: fetch just those vectors and score them exactly
+      - large candidate set: let Chroma's HNSW search with the filter (plenty of matches survive)
+    """
+    if not filter:
+        return db.similarity_search(query, k=k)
+    candidate_ids = index.ids_matching(filter)
+    if not candidate_ids:
+        return []
+    if len(candidate_ids) > exact_threshold:
+        return db.similarity_search(query, k=k, filter=filter)
+
+    got = db._collection.get(ids=candidate_ids, include=["embeddings", "documents", "metadatas"])
+    query_vector = normalize(db.embeddings.embed_query(query))
+    positions, _ = top_k(query_vector @ normalize(got["embeddings"]).T, k)
+    return [
+        Document(id=got["ids"][p], page_content=got["documents"][p], metadata=got["metadatas"][p] or {})
+        for p in positions[0]
+    ]
+
+class PrefilteredRetriever(BaseRetriever):
+    """Drop-in for db.as_retriever(search_kwargs={"k": ..., "filter": ...}) using MetadataIndex"""
+
+    vectorstore: Any
+    index: Any
+    k: int = 4
+    filter: Optional[dict] = None
+    exact_threshold: int = EXACT_THRESHOLD
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return prefiltered_search(self.vectorstore, self.index, query, self.k, self.filter,
+                                  self.exact_threshold)
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    index = MetadataIndex()
+    rows = {"a": {"active": True, "year": 2024}, "b": {"active": 1, "year": 2024.0},
+            "c": {"active": 1.0, "year": "2024"}, "d": {"active": False, "year": 0}, "e": {"year": 1}}
+    for doc_id, meta in rows.items():
+        index.add(doc_id, meta)
+
+    # Same answers as Chroma's where= on the same rows: booleans never match numbers
+    checks = [({"active": True}, ["a"]), ({"active": 1}, ["b", "c"]), ({"active": 1.0}, ["b", "c"]),
+              ({"active": False}, ["d"]), ({"year": 0}, ["d"]), ({"year": True}, []),
+              ({"year": {"$in": [2024]}}, ["a", "b"]), ({"year": "2024"}, ["c"]),
+              ({"active": {"$ne": True}}, ["b", "c", "d", "e"]), ({"active": {"$nin": [1]}}, ["a", "d", "e"])]
+    for where, expected in checks:
+        got = index.ids_matching(where)
+        print(f"{str(where):<34} -> {got}")
+        assert got == expected, f"expected {expected}"
+    print("OK")
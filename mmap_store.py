@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+from datetime import datetime
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from vector_index import normalize, top_k
+from quantized_index import QuantizedIndex, quantized_path
+
+# Read-optimised export of a Chroma collection.
+# Every app process memory-maps the same files, so they share the OS page cache,
+# open in milliseconds and never deserialise the whole index onto the heap.
+#
+#   <export>/vectors.npy   float32 (N, dim), unit-normalised, opened with mmap
+#   <export>/ids.npy       fixed-width byte strings (N,)  - the ID table
+#   <export>/offsets.npy   int64 (N + 1,) byte offsets into docs.jsonl
+#   <export>/docs.jsonl    one {"page_content", "metadata"} JSON object per line
+#   <export>/meta.json     count, dim, source, export time
+#
+# <export> is a symlink to the latest export folder (see export_collection()).
+
+EXPORT_PATH = "./opsvision_index"
+EXPORT_PAGE = 5000      # rows pulled from Chroma per request while exporting
+SCAN_ROWS = 65536       # rows scored per block while searching (bounds RSS)
+KEEP_EXPORTS = 2        # the current export + the previous one (a reader may still be opening it)
+
+# Re-exporting while apps are serving: running MmapVectorStores hold the old vectors.npy
+# mapped and docs.jsonl open, so the files are never rewritten in place (truncating a
+# mapped file is a SIGBUS; rewriting docs.jsonl gives torn documents). Each export goes
+# to a new sibling folder (<export>.<timestamp>-xxxx), is fsynced, and <export> is a
+# symlink swapped over to it with os.replace(). Readers resolve the link once and keep the
+# old files (and their inodes) until they reopen; older exports are deleted.
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _write_export(db, folder, page_size):
+    collection = db._collection
+    count = collection.count()
+
+    ids, offsets = [], [0]
+    vectors = None
+    with open(os.path.join(folder, "docs.jsonl"), "wb") as docs_file:
+        for start in range(0, count, page_size):
+            page = collection.get(limit=page_size, offset=start,
+                                  include=["embeddings", "documents", "metadatas"])
+            batch = normalize(page["embeddings"])
+            if vectors is None:
+                # Written straight to disk: the export never holds the full matrix in RAM
+                vectors = np.lib.format.open_memmap(os.path.join(folder, "vectors.npy"), mode="w+",
+                                                    dtype=np.float32, shape=(count, batch.shape[1]))
+            vectors[start:start + len(batch)] = batch
+            for doc_id, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                line = json.dumps({"page_content": text, "metadata": meta or {}}).encode("utf-8") + b"\n"
+                docs_file.write(line)
+                offsets.append(offsets[-1] + len(line))
+                ids.append(doc_id)
+        docs_file.flush()
+        os.fsync(docs_file.fileno())
+
+    if vectors is None:
+        raise ValueError("Collection is empty, nothing to export.")
+    vectors.flush()
+    del vectors
+    np.save(os.path.join(folder, "ids.npy"), np.array([i.encode("utf-8") for i in ids]))
+    np.save(os.path.join(folder, "offsets.npy"), np.array(offsets, dtype=np.int64))
+    with open(os.path.join(folder, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": len(ids), "dim": int(batch.shape[1]),
+                   "source": getattr(db, "_persist_directory", None),
+                   # Microseconds: quantized codes are matched to an export by this stamp
+                   "exported_at": datetime.now().isoformat(sep=" ", timespec="microseconds")}, f, indent=2)
+    for name in ("vectors.npy", "ids.npy", "offsets.npy", "meta.json", ""):
+        _fsync(os.path.join(folder, name))
+    return len(ids)
+
+def _swap_in(folder, out_path):
+    """Point the out_path symlink at folder in one atomic step"""
+    parent = os.path.dirname(os.path.abspath(out_path))
+    if os.path.isdir(out_path) and not os.path.islink(out_path):
+        # Export from before the symlink layout: move it aside once so the link can take its name
+        os.rename(out_path, f"{out_path}.{time.strftime('%Y%m%d-%H%M%S')}-old")
+    link = f"{out_path}.link-{os.getpid()}"
+    os.symlink(os.path.basename(folder), link)
+    os.replace(link, out_path)
+    _fsync(parent)
+
+def _prune_exports(out_path, keep=KEEP_EXPORTS):
+    parent = os.path.dirname(os.path.abspath(out_path))
+    prefix = os.path.basename(os.path.abspath(out_path)) + "."
+    current = os.path.realpath(out_path)
+    folders = sorted((os.path.join(parent, name) for name in os.listdir(parent)
+                      if name.startswith(prefix) and os.path.isdir(os.path.join(parent, name))
+                      and not os.path.islink(os.path.join(parent, name))),
+                     key=os.path.getmtime, reverse=True)
+    for folder in [f for f in folders if os.path.realpath(f) != current][keep - 1:]:
+        # Processes that still map these files keep reading them until they reopen
+        shutil.rmtree(folder, ignore_errors=True)
+
+def export_collection(db, out_path=EXPORT_PATH, page_size=EXPORT_PAGE):
+    """Write a LangChain Chroma store out in the mmap format and swap it in. Returns the row count."""
+    parent = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(parent, exist_ok=True)
+    folder = tempfile.mkdtemp(prefix=f"{os.path.basename(os.path.abspath(out_path))}.{time.strftime('%Y%m%d-%H%M%S')}-",
+                              dir=parent)
+    try:
+        rows = _write_export(db, folder, page_size)
+        os.chmod(folder, 0o755)   # mkdtemp creates it private
+        _swap_in(folder, out_path)
+    except BaseException:
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+    _prune_exports(out_path)
+    return rows
+
+class MmapVectorStore(VectorStore):
+    """
+    Read-only store over an export_collection() folder, with Chroma's similarity_search signature.
+    Scores are cosine similarity (higher = better). Gemini vectors are unit length, so the
+    ranking matches Chroma's L2 search on the same collection.
+    quantization="int8" / "pq" searches the compressed codes (python quantized_index.py --index ...)
+    and re-ranks the best candidates against vectors.npy.
+    """
+
+    def __init__(self, path=EXPORT_PATH, embedding_function=None, quantization=None):
+        self.path = path
+        self.embedding_function = embedding_function
+        # Resolve the export symlink once: every file comes from the same export even if
+        # a re-export swaps the link while we open them
+        self.folder = os.path.realpath(path)
+        with open(os.path.join(self.folder, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        # mmap_mode="r": nothing is read until a search touches it
+        self.vectors = np.load(os.path.join(self.folder, "vectors.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(self.folder, "ids.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(self.folder, "offsets.npy"), mmap_mode="r")
+        self._docs_file = open(os.path.join(self.folder, "docs.jsonl"), "rb")
+        self._docs_lock = threading.Lock()  # Streamlit sessions share the handle
+        self.quantized = None
+        if quantization:
+            self.quantized = QuantizedIndex.load(quantized_path(self.folder, quantization), full_vectors=self.vectors,
+                                                meta=self.meta)
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def get_document(self, position):
+        """Read ONE document from docs.jsonl via the offset table"""
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        with self._docs_lock:
+            self._docs_file.seek(start)
+            raw = self._docs_file.read(end - start)
+        record = json.loads(raw)
+        return Document(id=self.ids[position].decode("utf-8"), page_content=record["page_content"],
+                        metadata=record["metadata"])
+
+    def get_by_ids(self, ids, /):
+        if not hasattr(self, "_positions"):
+            # Built on first use only; plain searches never need it
+            self._positions = {raw.decode("utf-8"): p for p, raw in enumerate(self.ids)}
+        return [self.get_document(self._positions[i]) for i in ids if i in self._positions]
+
+    def search(self, queries, k=4):
+        """(positions, scores) for a batch of query vectors, scanning the memmap in blocks"""
+        if self.quantized is not None:
+            return self.quantized.search(queries, k)
+        q = normalize(queries)
+        best_p = np.empty((q.shape[0], 0), dtype=np.int64)
+        best_s = np.empty((q.shape[0], 0), dtype=np.float32)
+        for start in range(0, len(self), SCAN_ROWS):
+            sims = q @ self.vectors[start:start + SCAN_ROWS].T
+            p, s = top_k(sims, k)
+            # Merge this block's winners with the running top-k
+            merged_s = np.concatenate([best_s, s], axis=1)
+            merged_p = np.concatenate([best_p, p + start], axis=1)
+            keep, best_s = top_k(merged_s, k)
+            best_p = np.take_along_axis(merged_p, keep, axis=1)
+        return best_p, best_s
+
+    def similarity_search_with_score_by_vectors(self, vectors, k=4):
+        positions, scores = self.search(vectors, k)
+        return [
+            [(self.get_document(int(p)), float(s)) for p, s in zip(row_p, row_s)]
+            for row_p, row_s in zip(positions, scores)
+        ]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        if filter:
+            raise ValueError("MmapVectorStore does not support metadata filters.")
+        vector = self.embedding_function.embed_query(query)
+        return self.similarity_search_with_score_by_vectors([vector], k)[0]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        if filter:
+            raise ValueError("MmapVectorStore does not support metadata filters.")
+        return [doc for doc, _ in self.similarity_search_with_score_by_vectors([embedding], k)[0]]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: min(max(score, 0.0), 1.0)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("MmapVectorStore is read-only. Re-run the export instead.")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Build a Chroma collection and use export_collection().")
+
+    def close(self):
+        self._docs_file.close()
+
+# --- EXPORT CLI ---
+if __name__ == "__main__":
+    from langchain_chroma import Chroma
+
+    parser = argparse.ArgumentParser(description="Export a Chroma DB to the mmap format")
+    parser.add_argument("--db", default="./chroma_db_opsvision")
+    parser.add_argument("--out", default=EXPORT_PATH)
+    args = parser.parse_args()
+
+    print(f"--- EXPORTING {args.db} -> {args.out} ---")
+    start = time.perf_counter()
+    rows = export_collection(Chroma(persist_directory=args.db), args.out)
+    print(f"--- SUCCESS: {rows} vectors in {time.perf_counter() - start:.2f}s ---")
+
+    start = time.perf_counter()
+    MmapVectorStore(args.out)
+    print(f"Cold open: {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,211 @@
+import os
+import base64
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+from embedding_cache import CachedEmbeddings, embed_queries
+from image_prep import DEFAULT_MAX_DIM, prepare_image
+from mmap_store import MmapVectorStore, EXPORT_PATH
+from hybrid_search import BM25Index, BM25_PATH, reciprocal_rank_fusion
+from resources import registry
+
+# Shared logic for the OpsVision scanners (day21_backend.py, day22_app.py, day23_opsvision.py)
+
+DB_PATH = "./chroma_db_opsvision"
+
+SCAN_PROMPT = """
+    Analyze this technical image. Return a comma-separated list of the 
+    top 3 distinct technical items visible. (e.g. Raspberry Pi, Ethernet Port, GPIO Pins)
+    """
+
+def analyze_image_bytes(llm, data, mime_type, prompt=SCAN_PROMPT, max_dim=DEFAULT_MAX_DIM):
+    """
+    Vision call: image bytes -> the model's comma-separated item list.
+    The image is downscaled to max_dim and stripped of EXIF first (max_dim=None: send as-is).
+    """
+    if max_dim is not None:
+        prepared = prepare_image(data, max_dim=max_dim)
+        data, mime_type = prepared.data, prepared.mime_type
+    base64_data = base64.b64encode(data).decode('utf-8')
+    msg = HumanMessage(content=[
+        {"type": "text", "text": prompt},
+        {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{base64_data}"}}
+    ])
+    response = llm.invoke([msg])
+    return response.content.strip()
+
+def open_manuals_db(embeddings, db_path=DB_PATH):
+    """
+    The manuals collection. Set OPSVISION_STORE=mmap in .env to serve from the
+    memory-mapped export (python mmap_store.py) instead of opening Chroma, and
+    OPSVISION_QUANTIZATION=int8 / pq to search its compressed codes.
+    """
+    if os.getenv("OPSVISION_STORE", "chroma").lower() == "mmap":
+        return MmapVectorStore(os.getenv("OPSVISION_INDEX_PATH", EXPORT_PATH), embedding_function=embeddings,
+                               quantization=os.getenv("OPSVISION_QUANTIZATION") or None)
+    return Chroma(persist_directory=db_path, embedding_function=embeddings)
+
+def open_lexical_index(path=BM25_PATH):
+    """The BM25 index day21_ingest.py keeps next to the DB, or None if it hasn't been built yet"""
+    return BM25Index.load(path) if os.path.exists(path) else None
+
+def _file_version(path):
+    """mtime of an on-disk index, None if it hasn't been built yet"""
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+def _db_status(db):
+    count = db._collection.count() if hasattr(db, "_collection") else len(db)
+    return f"{count} chunks"
+
+def _register_vision_cache(model_name, vision_prompt, max_dim):
+    # The image preset is part of the key: an answer from a 1024 px "fast" image must not be
+    # reused when the user switches to "detail" to read labels and serial numbers
+    from vision_cache import VisionCache, make_namespace
+    namespace = make_namespace(model_name, vision_prompt, max_dim)
+    key = f"vision_cache:{namespace}"
+    registry.register(key, lambda: VisionCache(namespace=namespace),
+                      check=lambda cache: f"{cache.stats()['entries']} images ({max_dim or 'full'} px)")
+    return key
+
+def opsvision_vision_cache(model_name, vision_prompt=SCAN_PROMPT, max_dim=DEFAULT_MAX_DIM):
+    """The shared vision result cache for one (model, prompt, image preset)"""
+    return registry.get(_register_vision_cache(model_name, vision_prompt, max_dim))
+
+def opsvision_resources(api_key, model_name, vision_prompt=SCAN_PROMPT, db_path=DB_PATH, max_dim=DEFAULT_MAX_DIM):
+    """
+    (llm, embeddings, db, lexical, vision_cache) for the OpsVision apps. Built once per
+    process via resources.registry (in parallel on the first call), then shared by every
+    Streamlit rerun and session. vision_cache is the one for images sent at max_dim.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+    from llm_cache import ResponseCache
+
+    store = os.getenv("OPSVISION_STORE", "chroma").lower()
+    keys = {
+        "llm": f"llm:{model_name}",
+        "embeddings": "embeddings:text-embedding-004",
+        "vision_cache": _register_vision_cache(model_name, vision_prompt, max_dim),
+    }
+    # Re-scanning the same photo returns the cached answer (keyed on the image hash, not the base64)
+    registry.register("response_cache", ResponseCache.sqlite,
+                      check=lambda cache: f"{cache.stats()['entries']} responses")
+    registry.register(keys["llm"], lambda: ChatGoogleGenerativeAI(
+        google_api_key=api_key, model=model_name, cache=registry.get("response_cache")))
+    # Cached on disk so repeat item names ("Server", "Switch") skip the API
+    registry.register(keys["embeddings"], lambda: CachedEmbeddings(
+        GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")))
+    open_db = lambda: open_manuals_db(registry.get(keys["embeddings"]), db_path)
+    if store == "mmap":
+        # The export is a snapshot: a re-export swaps in a new folder with a new meta.json, so its mtime
+        # is the version (the old store keeps serving its own files until it is dropped)
+        meta = os.path.join(os.getenv("OPSVISION_INDEX_PATH", EXPORT_PATH), "meta.json")
+        keys["db"] = registry.register_versioned(f"manuals_db:mmap:{db_path}", _file_version(meta), open_db,
+                                                 check=_db_status)
+    else:
+        # Chroma reads a re-ingest through the same client
+        keys["db"] = f"manuals_db:{store}:{db_path}"
+        registry.register(keys["db"], open_db, check=_db_status)
+    # Keyword index for exact part numbers: reloaded when day21_ingest.py rewrites it, and not
+    # cached at all until it exists (so hybrid search turns on without a restart)
+    lexical_version = _file_version(BM25_PATH)
+    if lexical_version is not None:
+        keys["lexical"] = registry.register_versioned(f"lexical_index:{BM25_PATH}", lexical_version,
+                                                      open_lexical_index,
+                                                      check=lambda index: f"{len(index)} chunks")
+    registry.warm(list(keys.values()))
+    return tuple(registry.get(keys[name]) if name in keys else None
+                 for name in ("llm", "embeddings", "db", "lexical", "vision_cache"))
+
+def vector_search_items(db, items, k=1):
+    """Dense side only: ONE embedding call + ONE multi-vector query for all items"""
+    vectors = embed_queries(db.embeddings, items)
+
+    # In-process stores (NumpyVectorStore, MmapVectorStore) have their own batch search
+    if hasattr(db, "similarity_search_with_score_by_vectors"):
+        return [[doc for doc, _ in hits] for hits in db.similarity_search_with_score_by_vectors(vectors, k)]
+
+    result = db._collection.query(
+        query_embeddings=vectors,
+        n_results=k,
+        include=["documents", "metadatas"],
+    )
+
+    matches = []
+    for ids, texts, metas in zip(result["ids"], result["documents"], result["metadatas"]):
+        matches.append([
+            Document(id=doc_id, page_content=text, metadata=meta or {})
+            for doc_id, text, meta in zip(ids, texts, metas)
+        ])
+    return matches
+
+def expand_context(db, docs, window=1):
+    """
+    Parent context on demand: widen each hit with up to `window` neighbouring chunks
+    on each side, as long as they belong to the same manual section.
+    Neighbours are followed through the prev_id / next_id links day21_ingest.py stores:
+    one get_by_ids() call per step outwards, for all hits together.
+    """
+    # Per hit: [chunks before (nearest first), chunks after, next id left, next id right]
+    walks = [[[], [], doc.metadata.get("prev_id"), doc.metadata.get("next_id")] for doc in docs]
+    for _ in range(window):
+        wanted = list(dict.fromkeys(i for walk in walks for i in walk[2:] if i))
+        if not wanted:
+            break
+        fetched = {n.id: n for n in db.get_by_ids(wanted)}
+        for doc, walk in zip(docs, walks):
+            for side, link in ((0, "prev_id"), (1, "next_id")):
+                part = fetched.get(walk[2 + side])
+                if part is not None and part.metadata.get("section") == doc.metadata.get("section"):
+                    walk[side].append(part)
+                    walk[2 + side] = part.metadata.get(link)
+                else:
+                    walk[2 + side] = None
+
+    expanded = []
+    for doc, (before, after, _, _) in zip(docs, walks):
+        if not before and not after:
+            expanded.append(doc)
+            continue
+        parts = []
+        for part in before[::-1] + [doc] + after:
+            text = part.page_content
+            # Continuation chunks open with the section breadcrumb: keep it once
+            if parts and text.split("\n", 1)[0] == doc.metadata.get("section"):
+                text = text.split("\n", 1)[-1]
+            parts.append(text)
+        expanded.append(Document(id=doc.id, page_content="\n".join(parts),
+                                 metadata={**doc.metadata, "context_window": window}))
+    return expanded
+
+def search_items(db, items, k=1, lexical=None, fetch_k=10, context_window=0):
+    """
+    Look up every detected item at once: ONE embedding call + ONE Chroma query,
+    instead of a similarity_search() round trip per item.
+    With a BM25 index (open_lexical_index()), the top fetch_k of both sides are
+    fused with reciprocal rank fusion, so exact model numbers still hit.
+    context_window > 0 widens every hit with its neighbouring chunks (expand_context()).
+    Returns a list of [Document, ...] (best match first), in the same order as items.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if context_window:
+        # Every item's hits in ONE expand_context() call (one get_by_ids() per step, not per item)
+        hits = search_items(db, items, k, lexical, fetch_k)
+        flat = iter(expand_context(db, [doc for docs in hits for doc in docs], context_window))
+        return [[next(flat) for _ in docs] for docs in hits]
+    if lexical is None:
+        return vector_search_items(db, items, k)
+
+    dense = vector_search_items(db, items, fetch_k)
+    known = {doc.id: doc for docs in dense for doc in docs}
+    fused = []
+    for item, docs in zip(items, dense):
+        lexical_ids = [doc_id for doc_id, _ in lexical.search(item, fetch_k)]
+        fused.append(reciprocal_rank_fusion([[d.id for d in docs], lexical_ids])[:k])
+
+    # Lexical-only winners still need their text: one more local read for all of them
+    missing = list({doc_id for ids in fused for doc_id in ids if doc_id not in known})
+    if missing:
+        known.update((doc.id, doc) for doc in db.get_by_ids(missing))
+    return [[known[doc_id] for doc_id in ids if doc_id in known] for ids in fused]
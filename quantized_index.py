@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from vector_index import normalize, top_k
+
+# Compressed vector codes for the manuals collection.
+#   int8: one signed byte per dimension (4x smaller than float32)
+#   pq:   product quantization, one byte per sub-vector (e.g. 768 dims / 8 = 96 bytes, 32x smaller)
+# The codes only pick candidates. The top (k * rerank) are re-scored with the exact
+# float32 vectors, which can stay on disk (the mmap export) because only a few rows are read.
+
+SCORE_ROWS = 65536  # code rows decoded / scored per block
+EXPORT_CHECK = ("count", "dim", "exported_at")   # meta.json fields saved with the codes
+
+class ScalarQuantizer:
+    """Symmetric per-dimension int8: x ~= codes * scale"""
+
+    mode = "int8"
+
+    def __init__(self, scale=None):
+        self.scale = scale
+
+    def fit(self, vectors):
+        peak = np.abs(vectors).max(axis=0)
+        peak[peak == 0] = 1.0
+        self.scale = (peak / 127.0).astype(np.float32)
+        return self
+
+    def encode(self, vectors):
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, queries, codes):
+        # Fold the scale into the queries so the codes are only cast, never rescaled
+        return (queries * self.scale) @ codes.astype(np.float32).T
+
+    def arrays(self):
+        return {"scale": self.scale}
+
+    @property
+    def nbytes(self):
+        return self.scale.nbytes
+
+def kmeans(x, k, iters=20, seed=0):
+    """Plain Lloyd's k-means (enough for PQ codebooks)"""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=len(x) < k)].copy()
+    for _ in range(iters):
+        dists = (x ** 2).sum(1)[:, None] - 2 * x @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        assign = dists.argmin(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+class ProductQuantizer:
+    """Split vectors into m sub-vectors, each stored as the index of its nearest of 256 centroids"""
+
+    mode = "pq"
+
+    def __init__(self, m=None, codebooks=None, train_size=20000, iters=20):
+        self.m = m
+        self.codebooks = codebooks  # (m, 256, dim // m)
+        self.train_size = train_size
+        self.iters = iters
+
+    def fit(self, vectors):
+        dim = vectors.shape[1]
+        self.m = self.m or max(1, dim // 8)
+        if dim % self.m:
+            raise ValueError(f"dim {dim} is not divisible by m={self.m}")
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), self.train_size), replace=False)]
+        sub = dim // self.m
+        self.codebooks = np.stack([
+            kmeans(np.asarray(sample[:, j * sub:(j + 1) * sub], dtype=np.float32), 256, self.iters)
+            for j in range(self.m)
+        ]).astype(np.float32)
+        return self
+
+    def encode(self, vectors):
+        sub = self.codebooks.shape[2]
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            x = vectors[:, j * sub:(j + 1) * sub]
+            c = self.codebooks[j]
+            dists = -2 * x @ c.T + (c ** 2).sum(1)[None, :]
+            codes[:, j] = dists.argmin(axis=1)
+        return codes
+
+    def scores(self, queries, codes):
+        # Asymmetric scoring: per query, a (m, 256) table of sub-vector dot products,
+        # then each stored vector's score is m table lookups.
+        sub = self.codebooks.shape[2]
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        cols = np.arange(self.m)[None, :]
+        for i, q in enumerate(queries):
+            table = np.einsum("jcd,jd->jc", self.codebooks, q.reshape(self.m, sub))
+            out[i] = table[cols, codes].sum(axis=1)
+        return out
+
+    def arrays(self):
+        return {"codebooks": self.codebooks}
+
+    @property
+    def nbytes(self):
+        return self.codebooks.nbytes
+
+class QuantizedIndex:
+    """Approximate search over codes + exact float32 re-rank of the top candidates"""
+
+    def __init__(self, quantizer, codes, full_vectors=None, rerank=4):
+        self.quantizer = quantizer
+        self.codes = codes
+        self.full_vectors = full_vectors  # any (N, dim) array, typically a read-only memmap
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, vectors, mode="int8", full_vectors=None, rerank=4, **options):
+        quantizer = ScalarQuantizer() if mode == "int8" else ProductQuantizer(**options)
+        quantizer.fit(vectors)
+        codes = np.concatenate([quantizer.encode(np.asarray(vectors[s:s + SCORE_ROWS], dtype=np.float32))
+                                for s in range(0, len(vectors), SCORE_ROWS)])
+        return cls(quantizer, codes, full_vectors=full_vectors, rerank=rerank)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def memory_bytes(self):
+        """What has to live in RAM: codes + quantizer tables (the float32 vectors can stay on disk)"""
+        return self.codes.nbytes + self.quantizer.nbytes
+
+    def search(self, queries, k=4):
+        """(positions, scores) per query, best first"""
+        q = normalize(queries)
+        n_candidates = k * self.rerank if self.full_vectors is not None else k
+        best_p = np.empty((len(q), 0), dtype=np.int64)
+        best_s = np.empty((len(q), 0), dtype=np.float32)
+        for start in range(0, len(self.codes), SCORE_ROWS):
+            sims = self.quantizer.scores(q, self.codes[start:start + SCORE_ROWS])
+            p, s = top_k(sims, n_candidates)
+            merged_p = np.concatenate([best_p, p + start], axis=1)
+            keep, best_s = top_k(np.concatenate([best_s, s], axis=1), n_candidates)
+            best_p = np.take_along_axis(merged_p, keep, axis=1)
+
+        if self.full_vectors is None:
+            return best_p, best_s
+
+        # Exact re-rank: only these few rows of the float32 matrix are touched
+        positions = np.empty((len(q), min(k, best_p.shape[1])), dtype=np.int64)
+        scores = np.empty(positions.shape, dtype=np.float32)
+        for i, candidates in enumerate(best_p):
+            order = np.argsort(candidates)  # sorted reads are friendlier to a memmap
+            rows = np.asarray(self.full_vectors[candidates[order]], dtype=np.float32)
+            p, s = top_k((rows @ q[i])[None, :], k)
+            positions[i], scores[i] = candidates[order][p[0]], s[0]
+        return positions, scores
+
+    def save(self, path, meta=None):
+        """meta: the export's meta.json, so load() can tell when the codes are out of date"""
+        meta = meta or {}
+        np.savez(path, mode=self.quantizer.mode, codes=self.codes, rerank=self.rerank,
+                 **{key: str(meta.get(key, "")) for key in EXPORT_CHECK},
+                 **self.quantizer.arrays())
+
+    @classmethod
+    def load(cls, path, full_vectors=None, rerank=None, meta=None):
+        """
+        meta: the current export's meta.json. Codes built for another export (different
+        count / dim / export time) would point at the wrong rows, so they are refused.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No quantized codes at {path}. Build them: python quantized_index.py --index <export>")
+        data = np.load(path)
+        if meta is not None:
+            stored = {key: str(data[key]) if key in data else None for key in EXPORT_CHECK}
+            current = {key: str(meta.get(key, "")) for key in EXPORT_CHECK}
+            if stored != current:
+                raise ValueError(f"{path} was built for another export ({stored}, current: {current}). "
+                                 f"Rebuild it: python quantized_index.py --index <export>")
+        if full_vectors is not None and len(full_vectors) != len(data["codes"]):
+            raise ValueError(f"{path} has {len(data['codes'])} codes for {len(full_vectors)} vectors. Rebuild it.")
+        mode = str(data["mode"])
+        if mode == "int8":
+            quantizer = ScalarQuantizer(scale=data["scale"])
+        else:
+            quantizer = ProductQuantizer(m=data["codes"].shape[1], codebooks=data["codebooks"])
+        return cls(quantizer, data["codes"], full_vectors=full_vectors,
+                   rerank=int(data["rerank"]) if rerank is None else rerank)
+
+def quantized_path(export_path, mode):
+    return os.path.join(export_path, f"quantized_{mode}.npz")
+
+def evaluate(index, exact_vectors, queries, k=5):
+    """Memory, latency and recall@k of index vs exact float32 search"""
+    exact = normalize(exact_vectors)
+    q = normalize(queries)
+    truth, _ = top_k(q @ exact.T, k)
+
+    start = time.perf_counter()
+    found, _ = index.search(q, k)
+    latency_ms = (time.perf_counter() - start) * 1000 / len(q)
+
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return {
+        "memory_mb": index.memory_bytes / 1e6,
+        "float32_mb": exact.nbytes / 1e6,
+        "latency_ms": latency_ms,
+        f"recall@{k}": float(recall),
+    }
+
+# --- BUILD / REPORT CLI ---
+# python quantized_index.py --index ./opsvision_index --mode pq           (build from an mmap export)
+# python quantized_index.py --synthetic 100000 --mode int8 pq             (numbers without an export)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build quantized codes and report recall/latency/memory")
+    parser.add_argument("--index", help="mmap export folder (python mmap_store.py)")
+    parser.add_argument("--synthetic", type=int, help="Use N clustered random vectors instead")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--mode", nargs="+", default=["int8", "pq"], choices=["int8", "pq"])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 4, 10])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    meta = None
+    if args.index:
+        # One export folder throughout, even if a re-export swaps the link meanwhile
+        args.index = os.path.realpath(args.index)
+        with open(os.path.join(args.index, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(os.path.join(args.index, "vectors.npy"), mmap_mode="r")
+    else:
+        # Clustered data behaves more like real embeddings than pure noise
+        n = args.synthetic or 50000
+        centers = rng.standard_normal((256, args.dim), dtype=np.float32)
+        vectors = normalize(centers[rng.integers(0, 256, n)] +
+                            0.6 * rng.standard_normal((n, args.dim), dtype=np.float32))
+    picks = rng.choice(len(vectors), args.queries, replace=len(vectors) < args.queries)
+    queries = np.asarray(vectors[picks]) + 0.05 * rng.standard_normal((args.queries, vectors.shape[1]))
+
+    print(f"--- {len(vectors)} vectors x {vectors.shape[1]} dims ---")
+    print(f"{'mode':>5} | {'rerank':>6} | {'RAM MB':>8} | {'f32 MB':>8} | {'ms/query':>9} | recall@{args.k}")
+    for mode in args.mode:
+        start = time.perf_counter()
+        index = QuantizedIndex.build(vectors, mode=mode, full_vectors=vectors)
+        build_s = time.perf_counter() - start
+        for rerank in args.rerank:
+            index.rerank = rerank
+            r = evaluate(index, vectors, queries, args.k)
+            print(f"{mode:>5} | {rerank:>6} | {r['memory_mb']:>8.1f} | {r['float32_mb']:>8.1f} | "
+                  f"{r['latency_ms']:>9.2f} | {r[f'recall@{args.k}']:.3f}")
+        if args.index:
+            index.rerank = args.rerank[-1]
+            index.save(quantized_path(args.index, mode), meta=meta)
+            print(f"Saved {quantized_path(args.index, mode)} (built in {build_s:.1f}s)")
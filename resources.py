@@ -0,0 +1,188 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Process-wide registry of expensive shared objects (model clients, DB handles, caches).
+# Streamlit re-executes the whole app script on every widget click, but imported modules
+# stay loaded, so whatever this registry holds is built ONCE per process and shared by
+# every rerun and every browser session. Each entry has its own lock: two sessions asking
+# for the same resource at once build it once, while different resources build in parallel
+# (warm()). health() / stats() report what is built, how long it took and how often it was reused.
+#
+#   llm = registry.get(f"llm:{model}", lambda: ChatGoogleGenerativeAI(model=model))
+#
+# Resources loaded from files that an ingest run rewrites (BM25 index, mmap export) use
+# register_versioned() with the file's mtime, so a rebuilt index is picked up on the next
+# rerun, and a missing one is simply not cached.
+#
+# Why not st.cache_resource (day13_app.py still uses it for its one-off setup)? The same
+# objects are needed outside Streamlit (bulk_scan.py, VideoIntelligence, benchmarks), the
+# OpsVision set is built in parallel rather than one after another on the first rerun, and
+# the apps show per-resource health (build time, reuse, chunk counts) in the sidebar.
+#
+# Benchmark: python bench_rerun.py
+
+logger = logging.getLogger("resources")
+
+class _Entry:
+    def __init__(self, key, factory, check):
+        self.key = key
+        self.factory = factory
+        self.check = check
+        self.lock = threading.Lock()
+        self.value = None
+        self.ready = False
+        self.building = False
+        self.error = None
+        self.build_seconds = None
+        self.created = None
+        self.hits = 0
+
+class ResourceRegistry:
+    def __init__(self, max_warm_workers=8):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._warm_pool = ThreadPoolExecutor(max_workers=max_warm_workers, thread_name_prefix="warm")
+
+    def register(self, key, factory, check=None):
+        """
+        Declare how to build `key` (no-op if already registered).
+        check(value) -> short status string, used by health(); raise if unhealthy.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(key, factory, check)
+            return entry
+
+    def register_versioned(self, key, version, factory, check=None):
+        """
+        register() for something loaded from a file that can be rewritten underneath us:
+        each version (e.g. the file's mtime) is its own entry and older versions are dropped.
+        Returns the versioned key to get() / warm().
+        """
+        versioned = f"{key}@{version}"
+        with self._lock:
+            for stale in [k for k in self._entries if k.startswith(f"{key}@") and k != versioned]:
+                del self._entries[stale]
+        self.register(versioned, factory, check)
+        return versioned
+
+    def get(self, key, factory=None, check=None):
+        """The shared instance of `key`, built on first use (factory optional if registered)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            if factory is None:
+                raise KeyError(f"Resource {key!r} is not registered")
+            entry = self.register(key, factory, check)
+        return self._obtain(entry, count=True)
+
+    def _obtain(self, entry, count):
+        if entry.ready:
+            entry.hits += count
+            return entry.value
+        with entry.lock:
+            if entry.ready:          # built by another thread while we waited
+                entry.hits += count
+                return entry.value
+            entry.building = True
+            start = time.perf_counter()
+            try:
+                entry.value = entry.factory()
+            except Exception as e:
+                entry.error = f"{type(e).__name__}: {e}"
+                logger.warning(f"[{entry.key}] build failed: {entry.error}")
+                raise
+            finally:
+                entry.building = False
+            entry.build_seconds = time.perf_counter() - start
+            entry.created = time.time()
+            entry.error = None
+            entry.ready = True
+            logger.info(f"[{entry.key}] built in {entry.build_seconds:.2f}s")
+            return entry.value
+
+    def warm(self, keys=None, wait=True):
+        """Build the given (default: all registered) resources in parallel. Failures are kept for health()."""
+        keys = list(self._entries) if keys is None else keys
+        keys = [key for key in keys if not self._entries[key].ready]
+        futures = [self._warm_pool.submit(self._warm_one, key) for key in keys]
+        if wait:
+            for future in futures:
+                future.result()
+        return futures
+
+    def _warm_one(self, key):
+        try:
+            self._obtain(self._entries[key], count=False)   # warming isn't reuse
+        except Exception:
+            pass
+
+    def health(self):
+        """One row per resource: status, build time, reuse count, check() detail"""
+        rows = []
+        for key, entry in list(self._entries.items()):
+            status = "ready" if entry.ready else "building" if entry.building else \
+                "failed" if entry.error else "not built"
+            detail = entry.error or ""
+            if entry.ready and entry.check is not None:
+                try:
+                    detail = entry.check(entry.value)
+                except Exception as e:
+                    status, detail = "unhealthy", f"{type(e).__name__}: {e}"
+            rows.append({
+                "resource": key,
+                "status": status,
+                "build_s": round(entry.build_seconds, 3) if entry.build_seconds is not None else None,
+                "reused": entry.hits,
+                "age_s": round(time.time() - entry.created) if entry.created else None,
+                "detail": detail,
+            })
+        return rows
+
+    def stats(self):
+        entries = list(self._entries.values())
+        return {
+            "resources": len(entries),
+            "ready": sum(e.ready for e in entries),
+            "failed": sum(bool(e.error) for e in entries),
+            "reused": sum(e.hits for e in entries),
+            "build_seconds": sum(e.build_seconds or 0.0 for e in entries),
+        }
+
+    def clear(self, key=None):
+        """Forget built instances (all, or one) so the next get() rebuilds them"""
+        for k in ([key] if key is not None else list(self._entries)):
+            entry = self._entries.get(k)
+            if entry is None:
+                continue
+            with entry.lock:
+                entry.value, entry.ready, entry.error = None, False, None
+                entry.build_seconds, entry.created, entry.hits = None, None, 0
+
+registry = ResourceRegistry()
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    def slow_client():
+        time.sleep(0.5)
+        return object()
+
+    registry.register("client:a", slow_client)
+    registry.register("client:b", slow_client, check=lambda c: "pong")
+    registry.register("broken", lambda: 1 / 0)
+
+    start = time.perf_counter()
+    registry.warm()
+    print(f"--- warmed 3 resources in {time.perf_counter() - start:.2f}s (parallel) ---")
+
+    # 8 "sessions" hitting the same resource at once: built once, reused after
+    threads = [threading.Thread(target=registry.get, args=("client:a",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for row in registry.health():
+        print(row)
+    print(registry.stats())
@@ -0,0 +1,111 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Async scan pipeline for OpsVision: vision -> (warm-up) -> per-item lookups -> follow-ups.
+# Every stage is a plain blocking function (Gemini / Chroma calls) run on worker threads,
+# with bounded concurrency and timeouts:
+#   - vision_timeout:  the scan fails fast if the vision call hangs (nothing to look up without it)
+#   - lookup_timeout:  per item; a slow item is marked "timeout" and the rest still come back
+#   - scan_timeout:    overall deadline; lookups still pending are cancelled and marked "cancelled"
+# Python can't kill a running thread, so a timed-out call finishes in the background
+# and its result is discarded. The calls run on a module-level pool rather than asyncio's
+# default executor, because asyncio.run() waits for the default executor before returning.
+
+DEFAULT_MAX_CONCURRENCY = 8
+VISION_TIMEOUT = 60.0
+LOOKUP_TIMEOUT = 10.0
+SCAN_TIMEOUT = 90.0
+
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="scan")
+
+def _run(fn, *args):
+    return asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+def parse_items(text):
+    """'Server, Switch, Cables' -> ['Server', 'Switch', 'Cables']"""
+    return [x.strip() for x in text.split(",") if x.strip()]
+
+async def scan_async(image, detect, lookup, prepare=None, followup=None,
+                     max_concurrency=DEFAULT_MAX_CONCURRENCY, vision_timeout=VISION_TIMEOUT,
+                     lookup_timeout=LOOKUP_TIMEOUT, scan_timeout=SCAN_TIMEOUT):
+    """
+    detect(image) -> [item, ...]         the vision call
+    prepare(items)                       optional batch warm-up (e.g. ONE embedding call for all items)
+    lookup(item) -> [Document, ...]      per-item retrieval
+    followup(item, docs) -> [Document]   optional extra lookup on the hits (e.g. expand_context)
+    Returns {"items", "matches" (docs or None per item), "status" (per item), "timings" (seconds)}
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    # 1. Vision
+    items = await asyncio.wait_for(_run(detect, image), vision_timeout)
+    timings["vision"] = time.perf_counter() - start
+
+    # 2. Warm-up: best effort, the lookups still work (just slower) without it
+    if prepare is not None and items:
+        stage_start = time.perf_counter()
+        try:
+            await asyncio.wait_for(_run(prepare, items), lookup_timeout)
+        except Exception:
+            pass
+        timings["prepare"] = time.perf_counter() - stage_start
+
+    # 3. Lookups + follow-ups, each item on its own, at most max_concurrency at once
+    semaphore = asyncio.Semaphore(max_concurrency)
+    item_times = [None] * len(items)
+
+    async def run_item(i, item):
+        async with semaphore:
+            item_start = time.perf_counter()
+            docs = await asyncio.wait_for(_run(lookup, item), lookup_timeout)
+            if followup is not None and docs:
+                docs = await asyncio.wait_for(_run(followup, item, docs), lookup_timeout)
+            item_times[i] = time.perf_counter() - item_start
+            return docs
+
+    stage_start = time.perf_counter()
+    tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+    matches, status = [None] * len(items), ["ok"] * len(items)
+    if tasks:
+        remaining = max(0.0, scan_timeout - (time.perf_counter() - start))
+        _, pending = await asyncio.wait(tasks, timeout=remaining)
+        for task in pending:
+            task.cancel()
+        for i, task in enumerate(tasks):
+            if task in pending:
+                status[i] = "cancelled"
+            elif isinstance(task.exception(), asyncio.TimeoutError):
+                status[i] = "timeout"
+            elif task.exception() is not None:
+                status[i] = f"error: {task.exception()}"
+            else:
+                matches[i] = task.result()
+    timings["lookups"] = time.perf_counter() - stage_start
+    done_times = [t for t in item_times if t is not None]
+    timings["slowest_lookup"] = max(done_times) if done_times else 0.0
+    timings["total"] = time.perf_counter() - start
+    return {"items": items, "matches": matches, "status": status, "timings": timings}
+
+def scan(image, detect, lookup, **options):
+    """Blocking entry point (Streamlit scripts have no running event loop)"""
+    return asyncio.run(scan_async(image, detect, lookup, **options))
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    import random
+
+    def fake_vision(image):
+        time.sleep(0.5)
+        return parse_items("Server, Switch, Ethernet Port, Mystery Box")
+
+    def fake_lookup(item):
+        # One item is pathologically slow
+        time.sleep(3.0 if item == "Mystery Box" else random.uniform(0.05, 0.2))
+        return [f"Manual for {item}"]
+
+    result = scan("rack.jpg", fake_vision, fake_lookup, lookup_timeout=1.0)
+    for item, docs, status in zip(result["items"], result["matches"], result["status"]):
+        print(f"{item:>14} | {status:>8} | {docs}")
+    print({stage: round(seconds, 2) for stage, seconds in result["timings"].items()})
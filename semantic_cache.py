@@ -0,0 +1,207 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from vector_index import normalize
+
+# Semantic answer cache for the RAG chat apps.
+# A cached answer is reused when a new question
+#   1. retrieves exactly the same context (same chunk IDs + text), AND
+#   2. has an embedding within `threshold` cosine similarity of the cached question.
+# (1) means a paraphrase can never pick up an answer built from different documents,
+# (2) catches "Can I work from home?" vs "Is remote work allowed?".
+# Every entry also records the corpus fingerprint it was answered against: when the
+# knowledge base changes, sync_corpus() drops everything answered from the old one.
+
+ANSWER_CACHE_PATH = "./answer_cache.sqlite3"
+DEFAULT_THRESHOLD = 0.90
+DEFAULT_TTL = 24 * 3600       # seconds
+DEFAULT_MAX_ENTRIES = 2000
+
+def fingerprint_documents(docs):
+    """Order-independent hash of a set of Documents (ID, text and metadata)"""
+    parts = sorted(
+        json.dumps([doc.id or "", doc.page_content, doc.metadata or {}], sort_keys=True, default=str)
+        for doc in docs
+    )
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+class SemanticCache:
+    """
+    Disk-backed (SQLite) answer cache with a similarity threshold,
+    TTL expiry and least-recently-used eviction past max_entries.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, threshold=DEFAULT_THRESHOLD, ttl=DEFAULT_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, namespace="default"):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.corpus = ""
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0   # seconds of generation skipped by hits
+
+        # Streamlit serves each session from its own thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                namespace TEXT NOT NULL,
+                corpus TEXT NOT NULL,
+                context TEXT NOT NULL,
+                question TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_context ON answers (namespace, context)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers (last_used)")
+        self._conn.commit()
+
+    # --- Invalidation ---
+
+    def sync_corpus(self, corpus_fingerprint):
+        """Declare the current knowledge base. Entries answered from any other version are deleted."""
+        with self._lock:
+            self.corpus = corpus_fingerprint
+            cur = self._conn.execute("DELETE FROM answers WHERE namespace = ? AND corpus != ?",
+                                     (self.namespace, corpus_fingerprint))
+            self._conn.commit()
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM answers WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+            return cur.rowcount
+
+    # --- Lookup / store ---
+
+    def lookup(self, vector, context, threshold=None):
+        """
+        Best cached answer for this question vector + context fingerprint, or None.
+        threshold overrides self.threshold for this call only (the cache is shared by every session).
+        """
+        threshold = self.threshold if threshold is None else threshold
+        query = normalize(vector)[0]
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl,))
+            rows = self._conn.execute(
+                "SELECT rowid, vector, answer, latency FROM answers "
+                "WHERE namespace = ? AND corpus = ? AND context = ?",
+                (self.namespace, self.corpus, context)).fetchall()
+
+            best = None
+            if rows:
+                vectors = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob, _, _ in rows])
+                sims = normalize(vectors) @ query
+                i = int(sims.argmax())
+                if sims[i] >= threshold:
+                    best = rows[i]
+
+            if best is None:
+                self.misses += 1
+                self._conn.commit()
+                return None
+            rowid, _, answer, latency = best
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE rowid = ?", (now, rowid))
+            self._conn.commit()
+            self.hits += 1
+            self.latency_saved += latency
+            return answer
+
+    def store(self, question, vector, context, answer, latency):
+        now = time.time()
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (namespace, corpus, context, question, vector, answer, latency, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, self.corpus, context, question, blob, answer, latency, now, now))
+            self._evict()
+            self._conn.commit()
+
+    def get_or_generate(self, question, vector, docs, generate, threshold=None):
+        """
+        Return (answer, cached). On a miss, generate() is called and its answer
+        (a string) is stored along with how long it took.
+        """
+        context = fingerprint_documents(docs)
+        answer = self.lookup(vector, context, threshold)
+        if answer is not None:
+            return answer, True
+        start = time.perf_counter()
+        answer = generate()
+        self.store(question, vector, context, answer, time.perf_counter() - start)
+        return answer, False
+
+    # --- Reporting ---
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers WHERE namespace = ?",
+                                         (self.namespace,)).fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "latency_saved_s": self.latency_saved,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        # Caller holds the lock
+        count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM answers WHERE rowid IN (SELECT rowid FROM answers ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,))
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from langchain_core.documents import Document
+
+    cache = SemanticCache(path=os.path.join(tempfile.mkdtemp(), "answers.sqlite3"), threshold=0.9)
+    docs = [Document(id="1", page_content="Employees can work remotely on Fridays.")]
+    cache.sync_corpus(fingerprint_documents(docs))
+
+    def slow_llm():
+        time.sleep(0.2)
+        return "Yes, on Fridays."
+
+    rng = np.random.default_rng(0)
+    question = rng.standard_normal(64)
+    paraphrase = question + 0.1 * rng.standard_normal(64)   # cosine ~0.99
+    unrelated = rng.standard_normal(64)
+
+    print(cache.get_or_generate("Can I work from home?", question, docs, slow_llm))
+    print(cache.get_or_generate("Is remote work allowed?", paraphrase, docs, slow_llm))
+    print(cache.get_or_generate("What are the hours?", unrelated, docs, slow_llm))
+
+    # Knowledge base edited -> old answers are gone
+    docs = [Document(id="1", page_content="Remote work is no longer allowed.")]
+    print(f"Invalidated {cache.sync_corpus(fingerprint_documents(docs))} entries")
+    print(cache.get_or_generate("Can I work from home?", question, docs, slow_llm))
+    print(cache.stats())
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+import importlib
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Startup-time profiling for the voice agent (day29_voice_final.py).
+#   In the app:  profiler = StartupProfiler("day29")
+#                with profiler.step("mic"): ...                 # timed init step, foreground
+#                agent = profiler.background("agent", build)   # timed init step on a worker thread
+#                profiler.mark("greeting spoken")              # a milestone (seconds since start)
+#                profiler.report_when_done()                   # writes the report once the background work finishes
+#   Per import:  python startup_profile.py [module ...]          (each module cold, in a fresh interpreter,
+#                                                                  via -X importtime; defaults to day29's imports)
+
+REPORT_PATH = "./startup_report.json"
+DAY29_IMPORTS = ["speech_recognition", "gtts", "pygame", "dotenv", "langchain_google_genai",
+                 "langchain_core.tools", "langchain_core.messages", "langgraph.prebuilt"]
+
+class StartupProfiler:
+    def __init__(self, name, report_path=REPORT_PATH):
+        self.name = name
+        self.report_path = report_path
+        self.start = time.perf_counter()
+        self.steps = []       # {"name", "thread", "start", "seconds", "error"}
+        self.marks = []       # {"name", "at"}
+        self._futures = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="startup")
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def step(self, name):
+        return _Step(self, name)
+
+    def import_module(self, name):
+        """importlib.import_module, timed as its own step"""
+        with self.step(f"import {name}"):
+            return importlib.import_module(name)
+
+    def background(self, name, fn, *args):
+        """Run fn(*args) on a worker thread as a timed step. Returns a Future (.result() waits)."""
+        def run():
+            with self.step(name):
+                return fn(*args)
+        future = self._pool.submit(run)
+        self._futures.append(future)
+        return future
+
+    def mark(self, name):
+        with self._lock:
+            self.marks.append({"name": name, "at": round(self.elapsed(), 3)})
+
+    def _record(self, name, started, seconds, error):
+        with self._lock:
+            self.steps.append({"name": name, "thread": threading.current_thread().name,
+                               "start": round(started - self.start, 3), "seconds": round(seconds, 3),
+                               "error": error})
+
+    def report(self):
+        with self._lock:
+            return {"name": self.name, "total_s": round(self.elapsed(), 3),
+                    "steps": sorted(self.steps, key=lambda s: s["start"]), "marks": list(self.marks)}
+
+    def write_report(self, path=None):
+        report = self.report()
+        with open(path or self.report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def report_when_done(self, path=None):
+        """Write the report in the background once every background() step has finished"""
+        futures = list(self._futures)
+
+        def finish():
+            wait(futures)
+            self.write_report(path)
+        threading.Thread(target=finish, name="startup-report", daemon=True).start()
+
+class _Step:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        error = f"{exc_type.__name__}: {exc}" if exc_type else None
+        self.profiler._record(self.name, self.started, time.perf_counter() - self.started, error)
+        return False
+
+def format_report(report):
+    lines = [f"--- {report['name']}: {report['total_s']:.2f}s profiled ---",
+             f"{'step':<32} | {'thread':<16} | {'start s':>7} | {'took s':>7}"]
+    for s in report["steps"]:
+        lines.append(f"{s['name']:<32} | {s['thread']:<16} | {s['start']:>7.2f} | {s['seconds']:>7.2f}"
+                     + (f"  ERROR {s['error']}" if s["error"] else ""))
+    for m in report["marks"]:
+        lines.append(f"* {m['name']} at {m['at']:.2f}s")
+    return "\n".join(lines)
+
+def profile_import(module):
+    """Cold import in a fresh interpreter: (total seconds, [(cumulative s, submodule)] heaviest first)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise ImportError(proc.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"  (nested imports come first, indented)
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = line.replace("import time:", "|", 1).split("|")
+        rows.append((int(cumulative_us) / 1e6, name[1:].rstrip()))   # drop the separator space
+    # The requested module is the last unindented row; its own imports are the indented rows just before it
+    ends = [i for i, (_, name) in enumerate(rows) if name == module]
+    end = ends[-1] if ends else len(rows) - 1
+    start = end
+    while start > 0 and rows[start - 1][1].startswith("  "):
+        start -= 1
+    total = rows[end][0] if rows else 0.0
+    return total, sorted(((sec, name.strip()) for sec, name in rows[start:end]), reverse=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import cost per module (+ day29 report viewer)")
+    parser.add_argument("modules", nargs="*", default=DAY29_IMPORTS)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest submodules to show per import")
+    parser.add_argument("--report", default=REPORT_PATH, help="Also print this startup report if it exists")
+    parser.add_argument("--out", default="./startup_imports.txt")
+    args = parser.parse_args()
+
+    lines = [f"--- COLD IMPORT COST ({sys.executable}) ---"]
+    total = 0.0
+    for module in args.modules:
+        try:
+            seconds, rows = profile_import(module)
+        except ImportError as e:
+            lines.append(f"{module:<28} not importable: {e}")
+            continue
+        total += seconds
+        lines.append(f"{module:<28} {seconds:>6.2f}s")
+        for sub_seconds, name in rows[:args.top]:
+            lines.append(f"    {name:<36} {sub_seconds:>6.2f}s")
+    lines.append(f"--- SUM {total:.2f}s (shared dependencies counted once per module) ---")
+    if os.path.exists(args.report):
+        with open(args.report, "r", encoding="utf-8") as f:
+            lines.append(format_report(json.load(f)))
+
+    text = "\n".join(lines)
+    print(text)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
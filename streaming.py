@@ -0,0 +1,69 @@
+import time
+import logging
+
+# Token streaming helpers for the chat UIs (day13_app.py, day25_app.py, day26_recall.py).
+# StreamTimer wraps any stream of chunks (LangChain AIMessageChunk, google.genai
+# responses, plain strings), yields their text for st.write_stream(), and records
+# time-to-first-token (TTFT) + total time, which is what the user actually feels.
+
+logger = logging.getLogger("streaming")
+
+def chunk_text(chunk):
+    """Text of one streamed chunk, whatever produced it"""
+    if isinstance(chunk, str):
+        return chunk
+    text = getattr(chunk, "text", None)
+    if callable(text) and not isinstance(text, str):   # older langchain-core: AIMessageChunk.text()
+        text = text()
+    if text is None:
+        content = getattr(chunk, "content", "")
+        text = content if isinstance(content, str) else ""
+    return text or ""
+
+class StreamTimer:
+    """Iterate to stream text; afterwards .text, .ttft and .total hold the results"""
+
+    def __init__(self, chunks, label="llm"):
+        self.chunks = chunks
+        self.label = label
+        self.text = ""
+        self.ttft = None
+        self.total = None
+
+    def __iter__(self):
+        start = time.perf_counter()
+        parts = []
+        for chunk in self.chunks:
+            text = chunk_text(chunk)
+            if not text:
+                continue
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - start
+            parts.append(text)
+            yield text
+        self.total = time.perf_counter() - start
+        self.text = "".join(parts)
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        logger.info(f"[{self.label}] ttft={ttft} total={self.total:.2f}s chars={len(self.text)}")
+
+    def summary(self):
+        if self.total is None:
+            return ""
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        return f"⏱️ First token {ttft} · Full answer {self.total:.2f}s"
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    def fake_llm():
+        time.sleep(0.3)             # time to first token
+        for word in "Employees can work remotely on Fridays.".split():
+            time.sleep(0.05)
+            yield word + " "
+
+    timer = StreamTimer(fake_llm(), label="test")
+    for piece in timer:
+        print(piece, end="", flush=True)
+    print()
+    print(timer.summary())
@@ -0,0 +1,475 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import mimetypes
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from media_payload import file_sha256
+from video_jobs import poll_until_active, backoff_delays
+
+# Content-addressed registry of Files API uploads: the one cache for "is this exact content
+# already uploaded?" (Recall / VideoIntelligence videos, and media_payload's large audio).
+# Key: backend + sha256 of the local file. Value: the remote file's name, uri, state and
+# expiry, plus (optionally) a local copy to re-upload from. So:
+#   - the same content uploaded again (another session, another user) is reused at once,
+#     with no upload and no processing wait
+#   - a handle close to expiry (Gemini deletes uploads after 48 h) is still used, and
+#     re-uploaded in the background so the next request gets a fresh one
+#   - an expired / failed / unknown handle is uploaded synchronously
+# Records are grouped per backend (GenaiFilesAPI "gemini", LocalFilesAPI "local:<dir>"), so
+# a test double can never hand its local:// handles to a real session.
+# Local copies (store_dir) are what lets a background refresh re-upload after the original
+# temp file is gone. They are deleted when their handle expires or is forgotten, and the
+# directory is capped at max_store_bytes (least recently used copies go first; a handle
+# without a copy just gets re-uploaded synchronously once it expires). store_dir=None keeps
+# no copies: refreshes re-read the original path instead.
+# Records live in SQLite like the other caches, one row per (backend, digest): every app
+# process shares the file, and a write only touches its own row (no last-writer-wins).
+
+REGISTRY_PATH = "./video_uploads.sqlite3"
+STORE_DIR = "./video_uploads"           # local copies, named by content hash
+MAX_STORE_BYTES = 2 * 1024 ** 3
+REFRESH_MARGIN = 6 * 3600               # refresh in the background this long before expiry
+MIN_VALIDITY = 15 * 60                  # below this, don't hand the handle out at all
+POLL_SECONDS = 2.0
+DIGEST_LOCKS = 64                       # striped: one in-flight upload per content, bounded memory
+
+class GenaiFilesAPI:
+    """google-genai Files API: upload / get / File objects for generate_content"""
+
+    backend = "gemini"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        # Built on first real call: a registry that only serves cached handles needs no key
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        return self._client
+
+    def upload(self, path, mime_type=None):
+        config = {"mime_type": mime_type} if mime_type else None
+        return self.client.files.upload(file=path, config=config)
+
+    def get(self, name):
+        return self.client.files.get(name=name)
+
+    def to_file(self, record):
+        from google.genai import types
+        expires = record.get("expires")
+        return types.File(
+            name=record["name"], uri=record["uri"], mime_type=record["mime_type"],
+            sha256_hash=record.get("sha256_hash"), state=types.FileState(record["state"]),
+            expiration_time=datetime.fromtimestamp(expires, tz=timezone.utc) if expires else None,
+        )
+
+class _State:
+    def __init__(self, name):
+        self.name = name
+
+class LocalFile:
+    """What LocalFilesAPI hands out; quacks like types.File for the registry and wait loops"""
+
+    def __init__(self, name, uri, mime_type, state, expiration_time, sha256_hash=None):
+        self.name = name
+        self.uri = uri
+        self.mime_type = mime_type
+        self.state = _State(state)
+        self.expiration_time = expiration_time
+        self.sha256_hash = sha256_hash
+
+class LocalFilesAPI:
+    """
+    Offline stand-in for the Files API: "uploads" copy into `root`, stay PROCESSING for
+    processing_seconds, then ACTIVE until ttl runs out. Counts uploads for tests.
+    """
+
+    def __init__(self, root=None, processing_seconds=0.0, ttl=48 * 3600):
+        self.root = root or tempfile.mkdtemp(prefix="files_api_")
+        self.backend = f"local:{os.path.abspath(self.root)}"
+        self.processing_seconds = processing_seconds
+        self.ttl = ttl
+        self.uploads = 0
+        self._files = {}   # name -> (ready_at, expires_at, mime_type)
+        self._lock = threading.Lock()
+
+    def upload(self, path, mime_type=None):
+        with self._lock:
+            self.uploads += 1
+            name = f"files/local-{self.uploads}"
+        shutil.copyfile(path, os.path.join(self.root, name.split("/")[-1]))
+        now = time.time()
+        with self._lock:
+            self._files[name] = (now + self.processing_seconds, now + self.ttl,
+                                 mime_type or mimetypes.guess_type(path)[0] or "video/mp4")
+        return self.get(name)
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._files:
+                raise FileNotFoundError(f"{name} not found")
+            ready_at, expires_at, mime_type = self._files[name]
+        state = "PROCESSING" if time.time() < ready_at else "ACTIVE"
+        return LocalFile(name, f"local://{name}", mime_type, state,
+                         datetime.fromtimestamp(expires_at, tz=timezone.utc))
+
+    def to_file(self, record):
+        expires = record.get("expires")
+        return LocalFile(record["name"], record["uri"], record["mime_type"], record["state"],
+                         datetime.fromtimestamp(expires, tz=timezone.utc) if expires else None,
+                         record.get("sha256_hash"))
+
+class UploadRegistry:
+    """(backend, content sha256) -> remote file record, persisted in SQLite (path=None: in memory)"""
+
+    def __init__(self, files_api, path=REGISTRY_PATH, store_dir=STORE_DIR, max_store_bytes=MAX_STORE_BYTES,
+                 refresh_margin=REFRESH_MARGIN, min_validity=MIN_VALIDITY, poll_seconds=POLL_SECONDS):
+        self.files_api = files_api
+        self.path = path
+        self.store_dir = store_dir
+        self.max_store_bytes = max_store_bytes
+        self.refresh_margin = refresh_margin
+        self.min_validity = min_validity
+        self.poll_seconds = poll_seconds
+        self.hits = 0
+        self.uploads = 0
+        self.refreshes = 0
+        self.backend = files_api.backend
+        self._refreshing = set()
+        self._digest_locks = [threading.Lock() for _ in range(DIGEST_LOCKS)]
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-refresh")
+        # Streamlit sessions and the job loop use it from different threads
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                backend TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                record TEXT NOT NULL,
+                PRIMARY KEY (backend, digest)
+            )
+        """)
+        # abs path -> (size, mtime_ns, sha256): skip re-hashing an unchanged file
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS digests (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.prune_expired()
+
+    # --- Public API ---
+
+    def digest(self, path):
+        """sha256 of a local file, memoized by (size, mtime) so unchanged files aren't re-read"""
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            known = self._conn.execute("SELECT size, mtime_ns, sha256 FROM digests WHERE path = ?",
+                                       (key,)).fetchone()
+        if known and known[:2] == (st.st_size, st.st_mtime_ns):
+            return known[2]
+        digest = file_sha256(path)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO digests (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                               (key, st.st_size, st.st_mtime_ns, digest))
+            self._conn.commit()
+        return digest
+
+    def ensure(self, path, mime_type=None):
+        """Remote file for this local file's content: reused if still valid, else uploaded now"""
+        return self._ensure(self.digest(path), lambda digest: self._store_local(digest, path=path), mime_type)
+
+    def ensure_bytes(self, data, suffix=".mp4", mime_type=None):
+        """Same, for in-memory content (e.g. uploaded_file.getbuffer()); only written to disk on a miss"""
+        digest = hashlib.sha256(data).hexdigest()
+        return self._ensure(digest, lambda d: self._store_local(d, data=data, suffix=suffix), mime_type)
+
+    def wait_active(self, remote, timeout=None):
+        """Block (with backoff) until an upload leaves PROCESSING, recording each new state"""
+        kwargs = {"timeout": timeout} if timeout else {}
+        try:
+            remote = poll_until_active(self.files_api.get, remote, on_poll=self.update, **kwargs)
+        finally:
+            self.update(remote)
+        return remote
+
+    def update(self, digest_or_file, remote_file=None):
+        """Record a new remote state (e.g. PROCESSING -> ACTIVE after a wait)"""
+        if remote_file is None:
+            remote_file = digest_or_file
+            digest = self.digest_for(remote_file.name)
+            if digest is None:
+                return
+        else:
+            digest = digest_or_file
+        self._merge(digest, self._record_from(remote_file))
+
+    def record(self, digest):
+        """The stored record for this content on this backend, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM uploads WHERE backend = ? AND digest = ?",
+                                     (self.backend, digest)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records(self):
+        """{digest: record} for this backend"""
+        with self._lock:
+            rows = self._conn.execute("SELECT digest, record FROM uploads WHERE backend = ?",
+                                      (self.backend,)).fetchall()
+        return {digest: json.loads(record) for digest, record in rows}
+
+    def digest_for(self, name):
+        return next((d for d, r in self.records().items() if r["name"] == name), None)
+
+    def forget(self, digest):
+        """Drop a handle and the local copy kept for it"""
+        record = self.record(digest)
+        if record is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads WHERE backend = ? AND digest = ?", (self.backend, digest))
+            self._conn.commit()
+        self._delete_copy(record)
+
+    def prune_expired(self):
+        """Forget handles the remote side has already deleted, and their local copies"""
+        expired = [d for d, r in self.records().items() if self._remaining(r) <= 0]
+        for digest in expired:
+            self.forget(digest)
+        return len(expired)
+
+    def refresh_expiring(self):
+        """Queue a background re-upload for every handle inside the refresh margin"""
+        digests = [d for d, r in self.records().items() if self._remaining(r) < self.refresh_margin]
+        for digest in digests:
+            self._schedule_refresh(digest)
+        return len(digests)
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM uploads WHERE backend = ?",
+                                         (self.backend,)).fetchone()[0]
+            return {"entries": entries, "hits": self.hits, "uploads": self.uploads,
+                    "refreshes": self.refreshes, "refreshing": len(self._refreshing),
+                    "store_bytes": sum(size for _, size, _ in self._store_files())}
+
+    # --- Internals ---
+
+    def _ensure(self, digest, store_local, mime_type):
+        # Two sessions with the same new video: the second waits for the first upload, then reuses it.
+        # (A fixed set of locks picked by hash: unrelated content rarely shares one, and nothing piles up.)
+        digest_lock = self._digest_locks[int(digest[:8], 16) % len(self._digest_locks)]
+        with digest_lock:
+            record = self.record(digest)
+            if record is not None and record["state"] != "FAILED":
+                remaining = self._remaining(record)
+                if remaining >= self.min_validity:
+                    with self._lock:
+                        self.hits += 1
+                    self._touch(record)
+                    if remaining < self.refresh_margin:
+                        self._schedule_refresh(digest)
+                    return self.files_api.to_file(record)
+            local_path, temporary = store_local(digest)
+            try:
+                remote = self.files_api.upload(local_path, mime_type)
+                size = os.path.getsize(local_path)
+            finally:
+                if temporary:
+                    os.remove(local_path)
+            with self._lock:
+                self.uploads += 1
+            self._put(digest, {**self._record_from(remote), "size": size,
+                               "local_path": None if temporary else os.path.abspath(local_path)})
+            self._evict_store()
+            return remote
+
+    def _store_local(self, digest, path=None, data=None, suffix=".mp4"):
+        """
+        Where to upload from: (path, temporary). With a store_dir, a content-named copy that
+        background refreshes can re-upload after the original is gone; without one, the
+        original path, or a temp file deleted right after the upload.
+        """
+        if path is not None:
+            if self.store_dir is None:
+                return path, False
+            suffix = os.path.splitext(path)[1] or suffix
+        if self.store_dir is None:
+            fd, tmp = tempfile.mkstemp(suffix=suffix)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return tmp, True
+        os.makedirs(self.store_dir, exist_ok=True)
+        target = os.path.join(self.store_dir, digest + suffix)
+        if not os.path.exists(target):
+            tmp = f"{target}.tmp"
+            if path is not None:
+                shutil.copyfile(path, tmp)
+            else:
+                with open(tmp, "wb") as f:
+                    f.write(data)
+            os.replace(tmp, target)
+        return target, False
+
+    def _owns(self, local_path):
+        return bool(self.store_dir and local_path) and \
+            os.path.dirname(os.path.abspath(local_path)) == os.path.abspath(self.store_dir)
+
+    def _touch(self, record):
+        # Copies are evicted least-recently-used first, by mtime
+        if self._owns(record.get("local_path")) and os.path.exists(record["local_path"]):
+            os.utime(record["local_path"])
+
+    def _delete_copy(self, record):
+        local_path = record.get("local_path")
+        if not self._owns(local_path):
+            return
+        with self._lock:
+            # Same content may still be registered on another backend
+            rows = self._conn.execute("SELECT record FROM uploads").fetchall()
+        if any(json.loads(row[0]).get("local_path") == local_path for row in rows):
+            return
+        if os.path.exists(local_path):
+            os.remove(local_path)
+
+    def _store_files(self):
+        if not self.store_dir or not os.path.isdir(self.store_dir):
+            return []
+        return [(e.path, e.stat().st_size, e.stat().st_mtime) for e in os.scandir(self.store_dir)
+                if e.is_file() and not e.name.endswith(".tmp")]
+
+    def _evict_store(self):
+        files = sorted(self._store_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.max_store_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def _schedule_refresh(self, digest):
+        with self._lock:
+            if digest in self._refreshing:
+                return
+            self._refreshing.add(digest)
+        self._pool.submit(self._refresh, digest)
+
+    def _refresh(self, digest):
+        try:
+            record = self.record(digest) or {}
+            local_path = record.get("local_path")
+            if not local_path or not os.path.exists(local_path):
+                return   # nothing to re-upload from; the next ensure() after expiry uploads synchronously
+            remote = self.files_api.upload(local_path, record.get("mime_type"))
+            remote = poll_until_active(self.files_api.get, remote, delays=backoff_delays(self.poll_seconds))
+            with self._lock:
+                self.refreshes += 1
+            self._merge(digest, self._record_from(remote))
+        except Exception as e:
+            print(f"Background refresh failed for {digest[:12]}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(digest)
+
+    @staticmethod
+    def _record_from(remote):
+        expires = remote.expiration_time.timestamp() if getattr(remote, "expiration_time", None) else None
+        return {"name": remote.name, "uri": remote.uri, "mime_type": remote.mime_type,
+                "sha256_hash": getattr(remote, "sha256_hash", None),
+                "state": remote.state.name if remote.state else "ACTIVE", "expires": expires,
+                "updated": time.time()}
+
+    @staticmethod
+    def _remaining(record):
+        return record["expires"] - time.time() if record.get("expires") else float("inf")
+
+    def _put(self, digest, record):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO uploads (backend, digest, record) VALUES (?, ?, ?)",
+                               (self.backend, digest, json.dumps(record)))
+            self._conn.commit()
+
+    def _merge(self, digest, fields):
+        # Read-modify-write in one IMMEDIATE transaction: another process updating the same
+        # row waits for us instead of overwriting our fields with its stale copy
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT record FROM uploads WHERE backend = ? AND digest = ?",
+                                         (self.backend, digest)).fetchone()
+                record = {**(json.loads(row[0]) if row else {}), **fields}
+                self._conn.execute("INSERT OR REPLACE INTO uploads (backend, digest, record) VALUES (?, ?, ?)",
+                                   (self.backend, digest, json.dumps(record)))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    workdir = tempfile.mkdtemp()
+    registry_path = os.path.join(workdir, "registry.sqlite3")
+    store_dir = os.path.join(workdir, "store")
+    video = os.path.join(workdir, "meeting.mp4")
+    with open(video, "wb") as f:
+        f.write(os.urandom(2 * 1024 * 1024))
+
+    api = LocalFilesAPI(processing_seconds=0.2)
+    registry = UploadRegistry(api, path=registry_path, store_dir=store_dir)
+
+    first = registry.ensure(video)
+    print(f"1st session: {first.name} ({first.state.name}), uploads={api.uploads}")
+    registry.wait_active(first)
+
+    # Another user, another session (fresh registry object, same file): reused, no upload
+    registry = UploadRegistry(api, path=registry_path, store_dir=store_dir, poll_seconds=0.1)
+    with open(video, "rb") as f:
+        second = registry.ensure_bytes(f.read())
+    print(f"2nd session: {second.name} ({second.state.name}), uploads={api.uploads}")
+
+    # Same file, different backend (the real API): the local handle is not visible to it
+    other = UploadRegistry(LocalFilesAPI(), path=registry_path, store_dir=store_dir)
+    print(f"other backend sees {other.stats()['entries']} entries")
+
+    # Handle close to expiry: still served, refreshed in the background
+    digest = registry.digest_for(second.name)
+    registry._merge(digest, {"expires": time.time() + 3600})
+    third = registry.ensure(video)
+    time.sleep(0.5)
+    print(f"near expiry: served {third.name}, refreshed to {registry.record(digest)['name']}, "
+          f"uploads={api.uploads}")
+
+    # Two processes sharing the file: neither one's write wipes out the other's records
+    other_video = os.path.join(workdir, "standup.mp4")
+    with open(other_video, "wb") as f:
+        f.write(os.urandom(1024 * 1024))
+    process_a = UploadRegistry(api, path=registry_path, store_dir=store_dir)
+    process_b = UploadRegistry(api, path=registry_path, store_dir=store_dir)
+    process_b.ensure(other_video)
+    process_a.update(third)
+    print(f"shared file: A sees {process_a.stats()['entries']} entries, B sees {process_b.stats()['entries']}")
+    process_b.forget(process_b.digest(other_video))
+
+    # Expired: pruned on the next start, local copy deleted with it
+    registry._merge(digest, {"expires": time.time() - 1})
+    registry = UploadRegistry(api, path=registry_path, store_dir=store_dir)
+    print(f"after expiry: entries={registry.stats()['entries']}, store files={len(os.listdir(store_dir))}")
+
+    # Store cap: 3 x 2 MB videos into a 5 MB store keeps the 2 most recent copies
+    registry = UploadRegistry(api, path=None, store_dir=store_dir, max_store_bytes=5 * 1024 * 1024)
+    for _ in range(3):
+        registry.ensure_bytes(os.urandom(2 * 1024 * 1024))
+    print(f"capped store: {len(os.listdir(store_dir))} copies, {registry.stats()['store_bytes'] / 1e6:.1f} MB")
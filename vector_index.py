@@ -0,0 +1,216 @@
+import uuid
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# In-process vector search with NumPy.
+# All vectors are normalised ONCE on insert and kept in one contiguous float32
+# matrix, so cosine similarity for a whole batch of queries is a single matrix
+# multiply, and top-k is argpartition (O(n)) instead of a full sort.
+
+# Max query x vector scores materialised at once (~128 MB of float32)
+SCORE_BLOCK = 32_000_000
+# Filtered searches with few candidate rows copy just those rows and score them;
+# past ~30% of the index, copying costs more than a masked scan of everything
+SUBSET_ROWS = 65536
+SUBSET_FRACTION = 0.3
+
+def normalize(vectors):
+    """Rows scaled to unit length (float32). Zero vectors stay zero."""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def top_k(scores, k):
+    """Indices + scores of the k best columns per row, best first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+class VectorIndex:
+    """Growable matrix of unit vectors + string IDs. Adding an existing ID overwrites it."""
+
+    def __init__(self, dim=None, capacity=1024):
+        self.dim = dim
+        self.ids = []
+        self.positions = {}
+        self._matrix = None if dim is None else np.empty((capacity, dim), dtype=np.float32)
+        self._capacity = capacity
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def vectors(self):
+        """View (no copy) of the live rows"""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:len(self.ids)]
+
+    def _reserve(self, extra):
+        needed = len(self.ids) + extra
+        if self._matrix is not None and needed <= self._matrix.shape[0]:
+            return
+        # Double the capacity so incremental adds are amortised O(1)
+        capacity = max(self._capacity, needed, 2 * (0 if self._matrix is None else self._matrix.shape[0]))
+        grown = np.empty((capacity, self.dim), dtype=np.float32)
+        if self._matrix is not None:
+            grown[:len(self.ids)] = self.vectors
+        self._matrix = grown
+
+    def add(self, vectors, ids=None):
+        """Insert (or overwrite) vectors. Returns their IDs."""
+        matrix = normalize(vectors)
+        if matrix.shape[0] == 0:
+            return []
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim vectors, got {matrix.shape[1]}")
+        ids = list(ids) if ids is not None else [uuid.uuid4().hex for _ in range(matrix.shape[0])]
+
+        # Same ID twice in one batch: the last one wins (dict keeps first-seen order, last value)
+        last_row = {vid: row for row, vid in enumerate(ids)}
+        new_rows = []
+        for vid, row in last_row.items():
+            if vid in self.positions:
+                self._matrix[self.positions[vid]] = matrix[row]
+            else:
+                new_rows.append(row)
+        if new_rows:
+            self._reserve(len(new_rows))
+            start = len(self.ids)
+            self._matrix[start:start + len(new_rows)] = matrix[new_rows]
+            for offset, row in enumerate(new_rows):
+                self.positions[ids[row]] = start + offset
+                self.ids.append(ids[row])
+        return ids
+
+    def remove(self, ids):
+        """Delete by ID (compacts the matrix). Returns the positions that were kept, in order."""
+        drop = {self.positions[i] for i in ids if i in self.positions}
+        keep = [p for p in range(len(self.ids)) if p not in drop]
+        if drop:
+            self._matrix[:len(keep)] = self.vectors[keep]
+            self.ids = [self.ids[p] for p in keep]
+            self.positions = {vid: p for p, vid in enumerate(self.ids)}
+        return keep
+
+    def search(self, queries, k=4, mask=None):
+        """
+        Top-k cosine matches for a batch of query vectors.
+        mask (bool per row, e.g. from MetadataIndex) restricts the search to matching rows.
+        Returns (positions, scores), both shaped (n_queries, k).
+        """
+        q = normalize(queries)
+        n = len(self.ids)
+        if n == 0:
+            return np.empty((q.shape[0], 0), dtype=np.int64), np.empty((q.shape[0], 0), dtype=np.float32)
+        if mask is not None:
+            candidates = np.flatnonzero(mask)
+            if len(candidates) <= min(SUBSET_ROWS, SUBSET_FRACTION * n):
+                # Selective filter: exact scores over just the matching rows
+                positions, scores = top_k(q @ self.vectors[candidates].T, k)
+                return candidates[positions], scores
+            k = min(k, len(candidates))
+        positions = np.empty((q.shape[0], min(k, n)), dtype=np.int64)
+        scores = np.empty((q.shape[0], min(k, n)), dtype=np.float32)
+        # Score queries in blocks so a big batch against 1M vectors doesn't allocate GBs
+        block = max(1, SCORE_BLOCK // max(n, 1))
+        for start in range(0, q.shape[0], block):
+            sims = q[start:start + block] @ self.vectors.T
+            if mask is not None:
+                # Broad filter: score everything, but non-matching rows can never win
+                sims[:, ~mask] = -np.inf
+            positions[start:start + block], scores[start:start + block] = top_k(sims, k)
+        return positions, scores
+
+class NumpyVectorStore(VectorStore):
+    """
+    Drop-in replacement for LangChain's InMemoryVectorStore backed by VectorIndex.
+    Usage: NumpyVectorStore(embeddings), then add_documents() / as_retriever() as usual.
+    """
+
+    def __init__(self, embedding):
+        self.embedding = embedding
+        self.index = VectorIndex()
+        self.docs = []  # parallel to index positions
+        self._metadata_index = None  # built on the first filtered search
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def add_texts(self, texts, metadatas=None, *, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+        ids = self.index.add(vectors, ids=ids)
+        self._metadata_index = None
+        for vid, text, meta in zip(ids, texts, metadatas):
+            doc = Document(id=vid, page_content=text, metadata=meta or {})
+            position = self.index.positions[vid]
+            if position < len(self.docs):
+                self.docs[position] = doc
+            else:
+                self.docs.append(doc)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if ids:
+            keep = self.index.remove(ids)
+            self.docs = [self.docs[p] for p in keep]
+            self._metadata_index = None
+
+    def get_by_ids(self, ids, /):
+        return [self.docs[self.index.positions[i]] for i in ids if i in self.index.positions]
+
+    @property
+    def metadata_index(self):
+        if self._metadata_index is None:
+            from metadata_index import MetadataIndex  # metadata_index imports this module
+            self._metadata_index = MetadataIndex.from_documents(self.docs)
+        return self._metadata_index
+
+    def similarity_search_with_score_by_vectors(self, vectors, k=4, filter=None):
+        """Batch API: one matrix multiply for all query vectors. filter = Chroma-style metadata filter."""
+        if len(self.index) == 0:
+            return [[] for _ in vectors]
+        mask = self.metadata_index.mask(filter) if filter else None
+        positions, scores = self.index.search(vectors, k, mask=mask)
+        return [
+            [(self.docs[p], float(s)) for p, s in zip(row_p, row_s)]
+            for row_p, row_s in zip(positions, scores)
+        ]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        vector = self.embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vectors([vector], k, filter)[0]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vectors([embedding], k, filter)[0]]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities (higher = better), not distances.
+        # Clamp: float32 rounding can give 1.0000001, and unrelated text can go below 0.
+        return lambda score: min(max(score, 0.0), 1.0)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, *, ids=None, **kwargs):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
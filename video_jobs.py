@@ -0,0 +1,312 @@
+import time
+import random
+import asyncio
+import itertools
+import threading
+
+# Background upload + processing for Recall (VideoIntelligence).
+# Gemini needs a few seconds to minutes to process a video before it can be queried.
+# The old loops polled files.get every 2 s on the caller's thread, which in Streamlit is
+# the script thread: the page froze until the video was ACTIVE, and only one video could
+# be in flight. Here:
+#   - backoff_delays(): status polls back off exponentially with jitter (fewer calls on long
+#     videos, no lock-step polling when many jobs start together)
+#   - VideoJobManager runs jobs on its own asyncio loop thread; submit() returns a job id at
+#     once, status() is a cheap snapshot the UI can read on every rerun, cancel() stops a job
+#   - at most max_concurrent jobs upload/process at a time; the rest wait in the queue
+#   - stats(): queue depth (now and peak) and per-stage durations
+#   - the manager lives as long as the server: callers forget() a job once they have its
+#     result, and finished jobs nobody came back for are dropped after FINISHED_TTL
+# Uploads go through UploadRegistry, so a video that is already uploaded skips straight
+# to the processing check (usually ACTIVE on the first poll).
+
+INITIAL_DELAY = 1.0
+MAX_DELAY = 15.0
+BACKOFF_FACTOR = 1.6
+PROCESSING_TIMEOUT = 30 * 60
+MAX_CONCURRENT = 3
+FINISHED_TTL = 15 * 60
+
+FINAL_STAGES = ("ready", "failed", "cancelled")
+
+def backoff_delays(initial=INITIAL_DELAY, factor=BACKOFF_FACTOR, max_delay=MAX_DELAY, jitter=0.5):
+    """Endless delays: initial, initial*factor, ... capped at max_delay, each scaled down by up to `jitter`"""
+    delay = initial
+    while True:
+        yield delay * (1 - jitter * random.random())
+        delay = min(delay * factor, max_delay)
+
+def _state(remote):
+    return remote.state.name if remote.state else "ACTIVE"
+
+def poll_until_active(get, video_file, timeout=PROCESSING_TIMEOUT, delays=None, on_poll=None):
+    """
+    Blocking version for scripts: re-fetch with get(name) until the file leaves PROCESSING.
+    Returns the ACTIVE file; raises ValueError if processing FAILED, TimeoutError after `timeout`.
+    """
+    delays = delays or backoff_delays()
+    deadline = time.monotonic() + timeout
+    while _state(video_file) == "PROCESSING":
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{video_file.name} still PROCESSING after {timeout:.0f}s")
+        time.sleep(next(delays))
+        video_file = get(video_file.name)
+        if on_poll:
+            on_poll(video_file)
+    if _state(video_file) == "FAILED":
+        raise ValueError("Video processing failed.")
+    return video_file
+
+async def wait_until_active(get, video_file, timeout=PROCESSING_TIMEOUT, delays=None, on_poll=None):
+    """Same as poll_until_active, for asyncio code: the blocking get() runs in a worker thread"""
+    delays = delays or backoff_delays()
+    async with asyncio.timeout(timeout):
+        while _state(video_file) == "PROCESSING":
+            await asyncio.sleep(next(delays))
+            video_file = await asyncio.to_thread(get, video_file.name)
+            if on_poll:
+                on_poll(video_file)
+    if _state(video_file) == "FAILED":
+        raise ValueError("Video processing failed.")
+    return video_file
+
+class VideoJob:
+    def __init__(self, job_id, label, path=None, data=None, suffix=".mp4"):
+        self.id = job_id
+        self.label = label
+        self.path = path
+        self.data = data
+        self.suffix = suffix
+        self.stage = "queued"
+        self.file = None
+        self.error = None
+        self.polls = 0
+        self.created = time.time()
+        self.finished = None         # time.monotonic() when it reached a final stage
+        self.durations = {}          # stage -> seconds spent in it
+        self._stage_started = time.perf_counter()
+        self._future = None
+
+    @property
+    def done(self):
+        return self.stage in FINAL_STAGES
+
+    def snapshot(self):
+        durations = dict(self.durations)
+        if not self.done:
+            durations[self.stage] = time.perf_counter() - self._stage_started
+        return {"id": self.id, "label": self.label, "stage": self.stage, "done": self.done,
+                "file": self.file.name if self.file is not None else None, "error": self.error,
+                "polls": self.polls, "durations": durations, "elapsed": sum(durations.values())}
+
+class VideoJobManager:
+    """
+    Thread-safe front end (submit / status / cancel / result) over an asyncio loop that
+    runs in a daemon thread. `uploads` is an UploadRegistry; its files_api does the polling.
+    """
+
+    def __init__(self, uploads, max_concurrent=MAX_CONCURRENT, timeout=PROCESSING_TIMEOUT,
+                 initial_delay=INITIAL_DELAY, max_delay=MAX_DELAY, finished_ttl=FINISHED_TTL):
+        self.uploads = uploads
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.finished_ttl = finished_ttl
+        self.peak_queue = 0
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._slots = None
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True, name="video-jobs")
+        self._thread.start()
+
+    # --- Public API (call from any thread) ---
+
+    def submit(self, path=None, data=None, suffix=".mp4", label=None):
+        """Queue a local file (path) or in-memory video (data); returns the job id immediately"""
+        if (path is None) == (data is None):
+            raise ValueError("Pass exactly one of path / data")
+        with self._lock:
+            self._evict_finished()
+            job_id = f"job-{next(self._ids)}"
+            job = VideoJob(job_id, label or path or job_id, path=path, data=data, suffix=suffix)
+            self._jobs[job_id] = job
+            self.peak_queue = max(self.peak_queue, self._count("queued"))
+        job._future = asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+        # Cancelled before the loop even started it: _run never sees the CancelledError
+        job._future.add_done_callback(lambda f: f.cancelled() and self._enter(job, "cancelled"))
+        return job_id
+
+    def status(self, job_id):
+        """Non-blocking snapshot: stage, file name, error, polls, per-stage seconds"""
+        with self._lock:
+            return self._jobs[job_id].snapshot()
+
+    def jobs(self):
+        with self._lock:
+            return [job.snapshot() for job in self._jobs.values()]
+
+    def file(self, job_id):
+        """The ACTIVE remote file once the job is ready, else None"""
+        with self._lock:
+            job = self._jobs[job_id]
+            return job.file if job.stage == "ready" else None
+
+    def result(self, job_id, timeout=None):
+        """Block until the job finishes; returns the ACTIVE file or raises its error"""
+        return self._jobs[job_id]._future.result(timeout)
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job. An upload already on the wire finishes in its worker
+        thread (and stays in the registry for next time), but the job stops there.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+        return job._future.cancel()
+
+    def forget(self, job_id):
+        """Drop a finished job and its result/error (call once the result has been picked up)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.done:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            per_stage = {}
+            for job in jobs:
+                for stage, seconds in job.durations.items():
+                    per_stage.setdefault(stage, []).append(seconds)
+            return {
+                "queued": self._count("queued"),
+                "running": self._count("uploading") + self._count("processing"),
+                "peak_queue": self.peak_queue,
+                **{stage: self._count(stage) for stage in FINAL_STAGES},
+                "stage_seconds": {stage: {"mean": sum(s) / len(s), "max": max(s), "n": len(s)}
+                                  for stage, s in per_stage.items()},
+            }
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            if not job.done:
+                job._future.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    # --- Internals (event loop thread) ---
+
+    def _evict_finished(self):
+        # Caller holds the lock
+        cutoff = time.monotonic() - self.finished_ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished is not None and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _count(self, stage):
+        # Caller holds the lock
+        return sum(job.stage == stage for job in self._jobs.values())
+
+    def _enter(self, job, stage):
+        with self._lock:
+            if job.done:
+                return
+            now = time.perf_counter()
+            job.durations[job.stage] = now - job._stage_started
+            job.stage = stage
+            job._stage_started = now
+            if job.done:
+                job.finished = time.monotonic()
+
+    async def _run(self, job):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        try:
+            async with self._slots:
+                self._enter(job, "uploading")
+                if job.path is not None:
+                    remote = await asyncio.to_thread(self.uploads.ensure, job.path)
+                else:
+                    remote = await asyncio.to_thread(self.uploads.ensure_bytes, job.data, job.suffix)
+                    job.data = None   # the registry has its own copy now
+
+                self._enter(job, "processing")
+                def on_poll(_):
+                    job.polls += 1
+                delays = backoff_delays(self.initial_delay, max_delay=self.max_delay)
+                try:
+                    remote = await wait_until_active(self.uploads.files_api.get, remote,
+                                                     timeout=self.timeout, delays=delays, on_poll=on_poll)
+                finally:
+                    self.uploads.update(remote)
+            job.file = remote
+            self._enter(job, "ready")
+            return remote
+        except asyncio.CancelledError:
+            self._enter(job, "cancelled")
+            raise
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            self._enter(job, "failed")
+            raise
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from upload_registry import LocalFilesAPI, UploadRegistry
+
+    workdir = tempfile.mkdtemp()
+    videos = []
+    for i in range(6):
+        path = os.path.join(workdir, f"clip_{i}.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(512 * 1024))
+        videos.append(path)
+
+    # Each "video" takes 3 s to process. Old way: one at a time, 2 s fixed polls
+    api = LocalFilesAPI(processing_seconds=3.0)
+    start = time.perf_counter()
+    polls = 0
+    for path in videos[:5]:
+        vf = api.upload(path)
+        while vf.state.name == "PROCESSING":
+            time.sleep(2)
+            polls += 1
+            vf = api.get(vf.name)
+    print(f"sequential, fixed 2 s polls : 5 videos in {time.perf_counter() - start:5.1f}s, {polls} polls")
+
+    uploads = UploadRegistry(api, path=None, store_dir=os.path.join(workdir, "store"))
+    manager = VideoJobManager(uploads, max_concurrent=3, initial_delay=0.5, max_delay=4.0)
+    start = time.perf_counter()
+    ids = [manager.submit(path=p) for p in videos]
+    print(f"submitted {len(ids)} jobs in {(time.perf_counter() - start) * 1000:.1f} ms -> {manager.stats()['queued']} queued")
+    manager.cancel(ids[-1])
+    time.sleep(0.2)
+    print("status while running:", {s['id']: s['stage'] for s in manager.jobs()})
+    for job_id in ids[:-1]:
+        manager.result(job_id)
+    print(f"job manager, 3 concurrent   : 5 videos in {time.perf_counter() - start:5.1f}s, "
+          f"{sum(s['polls'] for s in manager.jobs())} polls")
+    stats = manager.stats()
+    print(f"ready={stats['ready']} cancelled={stats['cancelled']} peak queue={stats['peak_queue']}")
+    for stage, s in stats["stage_seconds"].items():
+        print(f"  {stage:<10} mean {s['mean']:5.2f}s  max {s['max']:5.2f}s  (n={s['n']})")
+
+    # Same videos again: already uploaded and ACTIVE, no upload and no wait
+    before = api.uploads
+    start = time.perf_counter()
+    again = manager.submit(path=videos[0])
+    manager.result(again)
+    print(f"resubmit known video        : {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"new uploads={api.uploads - before}")
+    manager.forget(again)
+    manager.finished_ttl = 0
+    last = manager.submit(path=videos[1])   # evicts every job that already finished
+    print(f"after forget + TTL          : {len(manager.jobs())} job(s) kept")
+    manager.result(last)
+    manager.shutdown()
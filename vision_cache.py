@@ -0,0 +1,316 @@
+import io
+import time
+import sqlite3
+import hashlib
+import threading
+from itertools import combinations
+import numpy as np
+from PIL import Image, ImageOps
+
+# Vision-result cache for repeat photos (OpsVision).
+# Technicians re-photograph the same rack, and Streamlit reruns re-submit the same upload.
+# An exact byte hash misses the re-photograph (and any re-encode), so entries are keyed
+# on a 64-bit perceptual hash of the image instead, and a lookup returns the nearest
+# cached result within `threshold` differing bits (Hamming distance).
+#
+# Lookups use multi-index hashing (HammingIndex): the 64 bits are split into 4 16-bit
+# blocks, each with its own hash table. Two hashes within r bits must agree on some block
+# to within r // 4 bits (pigeonhole), so a query only probes a handful of buckets and
+# checks the few candidates found there, instead of scanning every cached image.
+#
+# Results are stored per namespace (model + prompt): a different question about the same
+# photo is a different entry.
+
+VISION_CACHE_PATH = "./vision_cache.sqlite3"
+DEFAULT_THRESHOLD = 6          # bits out of 64; 0 = identical hash only
+DEFAULT_METHOD = "dhash"       # or "phash" (DCT based, more robust to brightness/contrast, slower)
+DEFAULT_MAX_ENTRIES = 500_000
+HASH_BITS = 64
+
+def make_namespace(*parts):
+    """Short stable key for e.g. (model_name, prompt)"""
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+def _open_small(source, size):
+    """Grayscale image about `size` on the short side; JPEG decodes straight at reduced scale"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif hasattr(source, "seek"):
+        source.seek(0)
+    with Image.open(source) as img:
+        img.draft("L", (size * 4, size * 4))
+        img = ImageOps.exif_transpose(img.convert("L"))
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return img
+
+def dhash(source, hash_size=8):
+    """Difference hash: is each pixel brighter than its right neighbour? (hash_size**2 bits)"""
+    img = _open_small(source, hash_size).resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = np.asarray(img, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+def _dct_matrix(n):
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+_DCT32 = _dct_matrix(32)
+
+def phash(source, hash_size=8):
+    """DCT hash: low-frequency coefficients above/below their median"""
+    img = _open_small(source, 32).resize((32, 32), Image.Resampling.LANCZOS)
+    pixels = np.asarray(img, dtype=np.float64)
+    low = (_DCT32 @ pixels @ _DCT32.T)[:hash_size, :hash_size].flatten()
+    bits = low > np.median(low[1:])   # the DC term would skew the median
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+HASH_FUNCTIONS = {"dhash": dhash, "phash": phash}
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+class HammingIndex:
+    """Multi-index hashing over 64-bit ints: id -> hash, searchable by Hamming radius"""
+
+    def __init__(self, blocks=4, bits=HASH_BITS):
+        self.blocks = blocks
+        self.block_bits = bits // blocks
+        self.mask = (1 << self.block_bits) - 1
+        self.tables = [{} for _ in range(blocks)]
+        self.hashes = {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _parts(self, h):
+        return [(h >> (i * self.block_bits)) & self.mask for i in range(self.blocks)]
+
+    def add(self, key, h):
+        self.hashes[key] = h
+        for table, part in zip(self.tables, self._parts(h)):
+            table.setdefault(part, set()).add(key)
+
+    def remove(self, key):
+        h = self.hashes.pop(key, None)
+        if h is None:
+            return
+        for table, part in zip(self.tables, self._parts(h)):
+            bucket = table.get(part)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table[part]
+
+    def _neighbours(self, part, radius):
+        yield part
+        for r in range(1, radius + 1):
+            for positions in combinations(range(self.block_bits), r):
+                flipped = part
+                for p in positions:
+                    flipped ^= 1 << p
+                yield flipped
+
+    def search(self, h, radius):
+        """[(distance, key), ...] within radius, nearest first"""
+        sub_radius = radius // self.blocks
+        candidates = set()
+        for table, part in zip(self.tables, self._parts(h)):
+            for probe in self._neighbours(part, sub_radius):
+                bucket = table.get(probe)
+                if bucket:
+                    candidates |= bucket
+        found = [(hamming(h, self.hashes[key]), key) for key in candidates]
+        return sorted((d, key) for d, key in found if d <= radius)
+
+def _to_sql(h):
+    # SQLite integers are signed 64-bit
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+def _from_sql(v):
+    return v + (1 << 64) if v < 0 else v
+
+class VisionCache:
+    """
+    Disk-backed (SQLite) vision results keyed by perceptual hash, with an in-memory
+    HammingIndex for near-duplicate lookups and least-recently-used eviction past max_entries.
+    """
+
+    def __init__(self, path=VISION_CACHE_PATH, threshold=DEFAULT_THRESHOLD, namespace="default",
+                 method=DEFAULT_METHOD, max_entries=DEFAULT_MAX_ENTRIES):
+        if method not in HASH_FUNCTIONS:
+            raise ValueError(f"Unknown hash method {method!r}, expected one of {list(HASH_FUNCTIONS)}")
+        self.path = path
+        self.threshold = threshold
+        self.method = method
+        # Hashes from different methods aren't comparable
+        self.namespace = f"{method}:{namespace}"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+        self.index = HammingIndex()
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vision_results (
+                namespace TEXT NOT NULL,
+                hash INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vision_namespace ON vision_results (namespace, last_used)")
+        self._conn.commit()
+        for rowid, h in self._conn.execute("SELECT rowid, hash FROM vision_results WHERE namespace = ?",
+                                           (self.namespace,)):
+            self.index.add(rowid, _from_sql(h))
+
+    def image_hash(self, source):
+        """source: path, bytes or file-like (e.g. a Streamlit UploadedFile)"""
+        return HASH_FUNCTIONS[self.method](source)
+
+    def lookup(self, h, threshold=None):
+        """(result, distance) of the nearest cached image within threshold bits, or None"""
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            matches = self.index.search(h, threshold)
+            if not matches:
+                self.misses += 1
+                return None
+            distance, rowid = matches[0]
+            result, latency = self._conn.execute(
+                "SELECT result, latency FROM vision_results WHERE rowid = ?", (rowid,)).fetchone()
+            self._conn.execute("UPDATE vision_results SET last_used = ? WHERE rowid = ?", (time.time(), rowid))
+            self._conn.commit()
+            self.hits += 1
+            self.latency_saved += latency
+            return result, distance
+
+    def store(self, h, result, latency=0.0):
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO vision_results (namespace, hash, result, latency, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (self.namespace, _to_sql(h), result, latency, now, now))
+            self.index.add(cur.lastrowid, h)
+            self._evict()
+            self._conn.commit()
+
+    def get_or_analyze(self, source, analyze, threshold=None):
+        """
+        Return (result, distance). distance is None on a miss, in which case
+        analyze() (the vision call, returning a string) is run and its result stored.
+        threshold overrides self.threshold for this call (e.g. one session's slider).
+        """
+        h = self.image_hash(source)
+        cached = self.lookup(h, threshold)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        result = analyze()
+        self.store(h, result, time.perf_counter() - start)
+        return result, None
+
+    def clear(self):
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM vision_results WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+            self.index = HammingIndex()
+            return cur.rowcount
+
+    # --- Reporting ---
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "latency_saved_s": self.latency_saved,
+            "entries": len(self.index),
+            "threshold": self.threshold,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        # Caller holds the lock
+        excess = len(self.index) - self.max_entries
+        if excess <= 0:
+            return
+        rows = self._conn.execute(
+            "SELECT rowid FROM vision_results WHERE namespace = ? ORDER BY last_used LIMIT ?",
+            (self.namespace, excess)).fetchall()
+        self._conn.executemany("DELETE FROM vision_results WHERE rowid = ?", rows)
+        for (rowid,) in rows:
+            self.index.remove(rowid)
+
+# --- TEST BLOCK ---
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+
+    # 1. Near-duplicates hash close, different images don't
+    rng = np.random.default_rng(0)
+    base = Image.fromarray((rng.random((60, 80)) * 255).astype("uint8")).resize((1600, 1200)).convert("RGB")
+    other = Image.fromarray((rng.random((60, 80)) * 255).astype("uint8")).resize((1600, 1200)).convert("RGB")
+
+    def jpeg(img, quality=90):
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=quality)
+        return buf.getvalue()
+
+    for method, fn in HASH_FUNCTIONS.items():
+        h = fn(jpeg(base))
+        print(f"--- {method} ---")
+        print("re-encoded q40: ", hamming(h, fn(jpeg(base, 40))), "bits")
+        print("resized 50%:    ", hamming(h, fn(jpeg(base.resize((800, 600))))), "bits")
+        print("brighter:       ", hamming(h, fn(jpeg(base.point(lambda p: min(255, p + 20))))), "bits")
+        print("different image:", hamming(h, fn(jpeg(other))), "bits")
+
+    # 2. Cache round trip
+    cache = VisionCache(path=os.path.join(tempfile.mkdtemp(), "vision.sqlite3"), namespace="test")
+
+    def slow_vision():
+        time.sleep(0.2)
+        return "Server, Switch, Cables"
+
+    print(cache.get_or_analyze(jpeg(base), slow_vision))          # miss
+    print(cache.get_or_analyze(jpeg(base, 40), slow_vision))      # hit, re-photographed
+    print(cache.stats())
+
+    # 3. Index speed at scale vs a linear scan
+    n = 300_000
+    index = HammingIndex()
+    hashes = [random.getrandbits(64) for _ in range(n)]
+    for i, h in enumerate(hashes):
+        index.add(i, h)
+    queries = [hashes[random.randrange(n)] ^ (1 << random.randrange(64)) for _ in range(200)]
+    array = np.array(hashes, dtype=np.uint64)
+
+    start = time.perf_counter()
+    for q in queries:
+        index.search(q, DEFAULT_THRESHOLD)
+    indexed = (time.perf_counter() - start) / len(queries)
+
+    start = time.perf_counter()
+    for q in queries[:20]:
+        x = array ^ np.uint64(q)
+        np.unpackbits(x.view(np.uint8)).reshape(n, 64).sum(axis=1)
+    linear = (time.perf_counter() - start) / 20
+    print(f"--- {n} hashes, radius {DEFAULT_THRESHOLD}: index {indexed * 1000:.2f} ms/query, "
+          f"linear scan {linear * 1000:.1f} ms/query ---")